@@ -104,6 +104,7 @@ def includeme(config):
     config.include('.authentication')
     config.include('.evolution')
     config.include('.events')
+    config.include('.authorization')
     config.include('.content')
     config.include('.changelog')
     config.include('.graph')
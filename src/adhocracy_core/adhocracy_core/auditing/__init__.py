@@ -1,12 +1,17 @@
 """Log which user modifies resources in additional 'audit' database."""
+from collections.abc import Iterator
+from heapq import merge
 import transaction
 import substanced.util
 
+from persistent import Persistent
 from pyramid.traversal import resource_path
 from pyramid.request import Request
 from pyramid.response import Response
 from BTrees.OOBTree import OOBTree
+from BTrees.OOBTree import OOTreeSet
 from datetime import datetime
+from datetime import timedelta
 from logging import getLogger
 from adhocracy_core.utils import get_user
 from adhocracy_core.sheets.principal import IUserBasic
@@ -36,6 +41,8 @@ class AuditLog(OOBTree):
        audit.items(min=january, max=february)
        ...
 
+    Entries added at the same time get keys that differ by one
+    microsecond, so no entry is overridden.
     """
 
     def add(self,
@@ -43,11 +50,72 @@ class AuditLog(OOBTree):
             resource_path: str,
             user_name: str,
             user_path: str) -> None:
-        """Add an auditlog entry to the audit log."""
-        self[datetime.utcnow()] = AuditlogEntry(name,
-                                                resource_path,
-                                                user_name,
-                                                user_path)
+        """Add an auditlog entry to the audit log.
+
+        :returns: the key of the new entry
+        """
+        key = self._get_unique_key(datetime.utcnow())
+        self[key] = AuditlogEntry(name,
+                                  resource_path,
+                                  user_name,
+                                  user_path)
+        return key
+
+    def _get_unique_key(self, key: datetime) -> datetime:
+        while key in self:
+            key += timedelta(microseconds=1)
+        return key
+
+
+class AuditLogIndex(Persistent):
+    """Secondary indexes for the keys of :class:`AuditLog` entries.
+
+    The keys are stored per resource path (`resources`) and per user path
+    (`users`) to allow queries without scanning the whole auditlog.
+    """
+
+    def __init__(self):
+        """Initialize self."""
+        self.resources = OOBTree()
+        self.users = OOBTree()
+
+    def index(self, key: datetime, entry: AuditlogEntry):
+        """Add the auditlog `key` for `entry`."""
+        self._add(self.resources, entry.resource_path, key)
+        self._add(self.users, entry.user_path, key)
+
+    def _add(self, tree: OOBTree, path: str, key: datetime):
+        if path not in tree:
+            tree[path] = OOTreeSet()
+        tree[path].add(key)
+
+    def keys(self, path='', user_path='', min=None, max=None,
+             excludemin=False) -> Iterator:
+        """Iterate sorted keys of entries matching all given filters.
+
+        :param path: resource path, entries of descendants are included
+        :param user_path: user path
+        """
+        kwargs = {'min': min, 'max': max, 'excludemin': excludemin}
+        user_keys = self.users.get(user_path, OOTreeSet()) if user_path\
+            else None
+        if not path:
+            return iter(user_keys.keys(**kwargs))
+        path_keys = merge(*[x.keys(**kwargs) for x in
+                            self._get_descendant_trees(path)])
+        if user_keys is None:
+            return path_keys
+        return (x for x in path_keys if x in user_keys)
+
+    def _get_descendant_trees(self, path: str) -> Iterator:
+        prefix = path.rstrip('/') + '/'
+        if path in self.resources:
+            yield self.resources[path]
+        for key, tree in self.resources.items(min=prefix):
+            if not key.startswith(prefix):
+                break
+            if key != path:
+                yield tree
 
 
 def get_auditlog(context: IResource) -> AuditLog:
@@ -55,33 +123,96 @@ def get_auditlog(context: IResource) -> AuditLog:
     return substanced.util.get_auditlog(context)
 
 
-def set_auditlog(context: IResource) -> None:
-    """Set an auditlog for the context."""
+def get_auditlog_index(context: IResource) -> AuditLogIndex:
+    """Return the auditlog index or None."""
+    root = _get_audit_root(context)
+    if root is not None:
+        return root.get('auditlog_index', None)
+
+
+def _get_audit_root(context: IResource) -> dict:
     conn = context._p_jar
+    if conn is None:
+        return None
     try:
         connection = conn.get_connection('audit')
     except KeyError:
+        return None
+    return connection.root()
+
+
+def set_auditlog(context: IResource) -> None:
+    """Set an auditlog and auditlog index for the context.
+
+    Existing auditlog entries are added to a missing index.
+    """
+    root = _get_audit_root(context)
+    if root is None:
         return
-    root = connection.root()
-    if 'auditlog' in root:
-        return
-    auditlog = AuditLog()
-    root['auditlog'] = auditlog
+    if 'auditlog' not in root:
+        root['auditlog'] = AuditLog()
+    if 'auditlog_index' not in root:
+        index = AuditLogIndex()
+        for key, entry in root['auditlog'].items():
+            index.index(key, entry)
+        root['auditlog_index'] = index
 
 
 def log_auditevent(context: IResource,
                    name: AuditlogAction,
                    user_name: str,
-                   user_path: str) -> None:
+                   user_path: str,
+                   path: str=None) -> None:
     """Add an auditlog entry for `context` to the audit database.
 
     The audit database is created if missing. If the `zodbconn.uri.audit`
     value is not specified in the config, auditing does not happen.
+
+    :param path: resource path to log, defaults to the `context` path
     """
     auditlog = get_auditlog(context)
-    path = resource_path(context)
+    if path is None:
+        path = resource_path(context)
     if auditlog is not None:
-        auditlog.add(name, path, user_name, user_path)
+        key = auditlog.add(name, path, user_name, user_path)
+        index = get_auditlog_index(context)
+        if index is not None:
+            index.index(key, auditlog[key])
+
+
+def query_auditlog(context: IResource, path='', user_path='', min=None,
+                   max=None, excludemin=False) -> Iterator:
+    """Iterate (key, entry) tuples of the auditlog ordered by date.
+
+    :param path: only entries for this resource path and descendants
+    :param user_path: only entries for this user path
+    :param min: minimal date
+    :param max: maximal date
+    :param excludemin: exclude entries with key `min`, to continue
+                       iterating after the last seen entry.
+    """
+    auditlog = get_auditlog(context)
+    if auditlog is None:
+        return
+    index = get_auditlog_index(context)
+    if index is None or not (path or user_path):
+        for key, entry in auditlog.items(min=min, max=max,
+                                         excludemin=excludemin):
+            if _matches(entry, path, user_path):
+                yield key, entry
+        return
+    for key in index.keys(path=path, user_path=user_path, min=min, max=max,
+                          excludemin=excludemin):
+        yield key, auditlog[key]
+
+
+def _matches(entry: AuditlogEntry, path: str, user_path: str) -> bool:
+    if user_path and entry.user_path != user_path:
+        return False
+    if path and not (entry.resource_path == path or
+                     entry.resource_path.startswith(path.rstrip('/') + '/')):
+        return False
+    return True
 
 
 def audit_resources_changes_callback(request: Request,
@@ -89,13 +220,15 @@ def audit_resources_changes_callback(request: Request,
     """Add auditlog entries to the auditlog when the resources are changed.
 
     This is a :term:`response- callback` that run after a request has
-    finished. To store the audit entry it adds an additional transaction.
+    finished. To store the audit entries it adds one additional transaction.
     """
     registry = request.registry
     changelog_metadata = registry.changelog.values()
     user_name, user_path = _get_user_info(request)
-    for meta in changelog_metadata:
-        _log_change(request.context, user_name, user_path, meta)
+    logged = [_log_change(request.context, user_name, user_path, meta)
+              for meta in changelog_metadata]
+    if any(logged):
+        transaction.commit()
 
 
 def _get_user_info(request: Request) -> (str, str):
@@ -113,17 +246,19 @@ def _get_user_info(request: Request) -> (str, str):
 def _log_change(context: IResource,
                 user_name: str,
                 user_path: str,
-                change: ChangelogMetadata) -> None:
+                change: ChangelogMetadata) -> bool:
     data_changed = change.created or change.modified
     visibility_changed = change.visibility in [VisibilityChange.concealed,
                                                VisibilityChange.revealed]
     if data_changed or visibility_changed:
-        action_name = _get_entry_name(change),
+        action_name = _get_entry_name(change)
         log_auditevent(context,
                        action_name,
                        user_name=user_name,
-                       user_path=user_path)
-        transaction.commit()
+                       user_path=user_path,
+                       path=resource_path(change.resource))
+        return True
+    return False
 
 
 def _get_entry_name(change) -> str:
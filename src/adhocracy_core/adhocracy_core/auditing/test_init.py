@@ -7,6 +7,7 @@ from pytest import fixture
 from pytest import mark
 from adhocracy_core.interfaces import ChangelogMetadata
 from adhocracy_core.interfaces import VisibilityChange
+from adhocracy_core.interfaces import AuditlogAction
 
 
 @fixture()
@@ -104,20 +105,62 @@ def test_audit_resource_changes_callback(registry, request_, changelog,
 
     request_.registry = registry
     changelog = registry.changelog
-    set_auditlog(request_.context)
+    context = request_.context
+    set_auditlog(context)
+    context['child'] = testing.DummyResource()
 
     changelog['/blublu'] \
         = changelog['/blublu']._replace(resource=testing.DummyResource())
     changelog['/'] = changelog['/']._replace(resource=context, created=True)
-    changelog['/blabla'] \
-        = changelog['/blabla']._replace(resource=context, modified=True)
+    changelog['/child'] = changelog['/child']._replace(
+        resource=context['child'], modified=True)
     registry.changelog = changelog
 
     response = Mock()
     audit_resources_changes_callback(request_, response)
 
-    all_entries = get_auditlog(request_.context).values()
+    all_entries = get_auditlog(context).values()
     assert len(all_entries) == 2
+    assert [x.resource_path for x in all_entries] == ['/', '/child']
+    assert [x.name for x in all_entries] == [AuditlogAction.created,
+                                             AuditlogAction.modified]
+
+
+@mark.usefixtures('integration')
+def test_audit_resource_changes_callback_commit_once(registry, request_,
+                                                     changelog,
+                                                     mock_get_user_info,
+                                                     monkeypatch):
+    from adhocracy_core import auditing
+    from . import audit_resources_changes_callback
+    from . import set_auditlog
+    mock_transaction = Mock()
+    monkeypatch.setattr(auditing, 'transaction', mock_transaction)
+    request_.registry = registry
+    set_auditlog(request_.context)
+    changelog = registry.changelog
+    context = request_.context
+    changelog['/'] = changelog['/']._replace(resource=context, created=True)
+    changelog['/blabla'] \
+        = changelog['/blabla']._replace(resource=context, modified=True)
+
+    audit_resources_changes_callback(request_, Mock())
+
+    assert mock_transaction.commit.call_count == 1
+
+
+@mark.usefixtures('integration')
+def test_audit_resource_changes_callback_no_commit_if_unchanged(
+        registry, request_, mock_get_user_info, monkeypatch):
+    from adhocracy_core import auditing
+    from . import audit_resources_changes_callback
+    mock_transaction = Mock()
+    monkeypatch.setattr(auditing, 'transaction', mock_transaction)
+    request_.registry = registry
+
+    audit_resources_changes_callback(request_, Mock())
+
+    assert not mock_transaction.commit.called
 
 
 @mark.usefixtures('integration')
@@ -189,6 +232,20 @@ class TestAuditlog:
         assert value.user_name == user_name
         assert value.user_path == user_path
 
+    def test_add_same_time(self, inst, monkeypatch):
+        from datetime import datetime
+        from adhocracy_core import auditing
+        now = datetime(2015, 1, 1)
+        mock_datetime = Mock()
+        mock_datetime.utcnow.return_value = now
+        monkeypatch.setattr(auditing, 'datetime', mock_datetime)
+        inst.add('created', '/resource1', 'user1', '/user1')
+        inst.add('modified', '/resource1', 'user1', '/user1')
+        keys = list(inst.keys())
+        assert len(keys) == 2
+        assert keys[0] == now
+        assert [x.name for x in inst.values()] == ['created', 'modified']
+
 
 class TestSetAuditlog:
 
@@ -196,6 +253,7 @@ class TestSetAuditlog:
     def mock_auditlog(self, monkeypatch):
         from adhocracy_core import auditing
         mock = Mock(spec=auditing.AuditLog)
+        mock.return_value.items.return_value = []
         monkeypatch.setattr(auditing, 'AuditLog', mock)
         return mock
 
@@ -214,7 +272,8 @@ class TestSetAuditlog:
         context = Mock()
         mocked_conn = Mock()
         mocked_auditconn = Mock()
-        mocked_auditconn.root.return_value = {'auditlog': Mock()}
+        mocked_auditconn.root.return_value = {'auditlog': Mock(),
+                                              'auditlog_index': Mock()}
         mocked_conn.get_connection.return_value = mocked_auditconn
         context._p_jar = mocked_conn
         return context
@@ -235,6 +294,137 @@ class TestSetAuditlog:
         set_auditlog(context)
         assert mock_auditlog.called is False
 
+    def test_set_auditlog_index_existing_entries(self, context_emptyroot):
+        from . import AuditLog
+        from . import get_auditlog_index
+        from . import set_auditlog
+        auditlog = AuditLog()
+        key = auditlog.add('created', '/resource', 'user', '/user')
+        context_emptyroot._p_jar.get_connection().root.return_value = \
+            {'auditlog': auditlog}
+        set_auditlog(context_emptyroot)
+        index = get_auditlog_index(context_emptyroot)
+        assert list(index.keys(path='/resource')) == [key]
+
+
+class TestAuditlogIndex:
+
+    @fixture
+    def inst(self):
+        from . import AuditLogIndex
+        return AuditLogIndex()
+
+    @fixture
+    def keys(self, inst):
+        from datetime import datetime
+        from adhocracy_core.interfaces import AuditlogEntry
+        entries = [('/', '/user1'),
+                   ('/a', '/user1'),
+                   ('/a/b', '/user2'),
+                   ('/a2', '/user2'),
+                   ('/a', '/user2'),
+                   ]
+        keys = []
+        for minute, (path, user_path) in enumerate(entries):
+            key = datetime(2015, 1, 1, 0, minute)
+            inst.index(key, AuditlogEntry('created', path, '', user_path))
+            keys.append(key)
+        return keys
+
+    def test_create(self, inst):
+        from persistent import Persistent
+        assert isinstance(inst, Persistent)
+        assert len(inst.resources) == 0
+        assert len(inst.users) == 0
+
+    def test_keys_path_with_descendants(self, inst, keys):
+        assert list(inst.keys(path='/a')) == [keys[1], keys[2], keys[4]]
+
+    def test_keys_path_root(self, inst, keys):
+        assert list(inst.keys(path='/')) == keys
+
+    def test_keys_path_missing(self, inst, keys):
+        assert list(inst.keys(path='/x')) == []
+
+    def test_keys_user_path(self, inst, keys):
+        assert list(inst.keys(user_path='/user2')) == [keys[2], keys[3],
+                                                       keys[4]]
+
+    def test_keys_user_path_missing(self, inst, keys):
+        assert list(inst.keys(user_path='/user3')) == []
+
+    def test_keys_path_and_user_path(self, inst, keys):
+        assert list(inst.keys(path='/a', user_path='/user2')) == [keys[2],
+                                                                  keys[4]]
+
+    def test_keys_min_max(self, inst, keys):
+        assert list(inst.keys(path='/', min=keys[1], max=keys[3])) ==\
+            keys[1:4]
+
+    def test_keys_exclude_min(self, inst, keys):
+        assert list(inst.keys(path='/', min=keys[1], excludemin=True)) ==\
+            keys[2:]
+
+
+class TestQueryAuditlog:
+
+    @fixture
+    def context(self, context):
+        from . import set_auditlog
+        set_auditlog(context)
+        return context
+
+    def call_fut(self, *args, **kwargs):
+        from . import query_auditlog
+        return query_auditlog(*args, **kwargs)
+
+    def _log(self, context, path, user_path=''):
+        from . import log_auditevent
+        log_auditevent(context, 'created', '', user_path, path=path)
+
+    def test_no_auditlog(self, context, monkeypatch):
+        from adhocracy_core import auditing
+        monkeypatch.setattr(auditing, 'get_auditlog', lambda x: None)
+        assert list(self.call_fut(context)) == []
+
+    def test_all(self, context):
+        self._log(context, '/a')
+        self._log(context, '/b')
+        result = list(self.call_fut(context))
+        assert [x.resource_path for k, x in result] == ['/a', '/b']
+
+    def test_path(self, context):
+        self._log(context, '/a')
+        self._log(context, '/b')
+        self._log(context, '/a/c')
+        result = list(self.call_fut(context, path='/a'))
+        assert [x.resource_path for k, x in result] == ['/a', '/a/c']
+
+    def test_user_path(self, context):
+        self._log(context, '/a', user_path='/user1')
+        self._log(context, '/b', user_path='/user2')
+        result = list(self.call_fut(context, user_path='/user2'))
+        assert [x.resource_path for k, x in result] == ['/b']
+
+    def test_path_without_index(self, context):
+        from . import get_auditlog_index
+        self._log(context, '/a')
+        self._log(context, '/a2')
+        self._log(context, '/a/c', user_path='/user1')
+        del context._p_jar.get_connection().root()['auditlog_index']
+        assert get_auditlog_index(context) is None
+        result = list(self.call_fut(context, path='/a', user_path='/user1'))
+        assert [x.resource_path for k, x in result] == ['/a/c']
+
+    def test_min_exclude_min(self, context):
+        from . import get_auditlog
+        self._log(context, '/a')
+        self._log(context, '/a')
+        first = get_auditlog(context).minKey()
+        result = list(self.call_fut(context, path='/a', min=first,
+                                    excludemin=True))
+        assert len(result) == 1
+
 
 def test_get_auditlog(context, monkeypatch):
     from . import get_auditlog
@@ -275,6 +465,15 @@ class TestAddAuditEvent:
         self.call_fut(context, 'created', 'user1', '/user1')
         assert mock_auditlog.add.called is False
 
+    def test_add_to_index(self, context):
+        from . import get_auditlog_index
+        from . import set_auditlog
+        set_auditlog(context)
+        self.call_fut(context, 'created', 'user1', '/user1')
+        index = get_auditlog_index(context)
+        assert len(list(index.keys(path='/'))) == 1
+        assert len(list(index.keys(user_path='/user1'))) == 1
+
     def test_add_if_auditlog(self, context, mock_auditlog,
                              mock_get_auditlog):
         mock_get_auditlog.return_value = mock_auditlog
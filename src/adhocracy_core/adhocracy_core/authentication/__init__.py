@@ -1,20 +1,31 @@
 """Authentication with support for token http headers."""
-import hashlib
+from base64 import urlsafe_b64decode
+from base64 import urlsafe_b64encode
 from datetime import datetime
+import hashlib
+import hmac
+import json
+import time
 
 from colander import Invalid
 from persistent.dict import PersistentDict
 from pyramid.authentication import CallbackAuthenticationPolicy
 from pyramid.interfaces import IAuthenticationPolicy
+from pyramid.registry import Registry
 from pyramid.request import Request
+from pyramid.traversal import find_resource
+from pyramid.traversal import find_root
 from pyramid.traversal import resource_path
 from pyramid.security import Everyone
 from pyramid.settings import asbool
+from pyramid.threadlocal import get_current_registry
 from zope.interface import implementer
 from zope.interface import Interface
 from zope.component import ComponentLookupError
 from substanced.stats import statsd_timer
+from substanced.util import find_service
 
+from adhocracy_core.exceptions import ConfigurationError
 from adhocracy_core.interfaces import ITokenManger
 from adhocracy_core.interfaces import IRolesUserLocator
 from adhocracy_core.schema import Resource
@@ -95,6 +106,13 @@ class TokenMangerAnnotationStorage:
 
             del self.token_to_user_id_timestamp[token]
 
+    def delete_user_tokens(self, userid: str):
+        """Delete all authentication tokens of `userid`."""
+        all = self.token_to_user_id_timestamp.items()
+        tokens = [t for t, (u, date) in all if u == userid]
+        for token in tokens:
+            self.delete_token(token)
+
     def delete_expired_tokens(self, timeout: float):
         all = self.token_to_user_id_timestamp.items()
         expired = [t for t, (u, date) in all if self._is_expired(date,
@@ -103,6 +121,153 @@ class TokenMangerAnnotationStorage:
             self.delete_token(token)
 
 
+@implementer(ITokenManger)
+class TokenMangerSignedTokens:
+    """Manage self-contained authentication tokens signed with HMAC.
+
+    The token contains the userid, the creation time and the revocation
+    generation of the user, signed with :attr:`hashalg` and the secret.
+    Creating and validating tokens does not write to the database.
+    The revocation state (generation and signatures of deleted tokens) is
+    stored on the user resource. The user is loaded anyway to authenticate
+    the `X-User-Path` header, so validating a token reads no other object
+    and logging out only writes to the user.
+
+    Constructor arguments:
+
+    :param context: the root object to find the users.
+    :param secret: the secret to sign tokens, defaults to the
+                   `substanced.secret` setting.
+    :raises adhocracy_core.exceptions.ConfigurationError: if the secret is
+                                                          missing or empty.
+    """
+
+    hashalg = 'sha512'
+    """Hash algorithm to sign tokens, not chosen by the client."""
+
+    revoked_key = '_tokenmanager_revoked'
+    generation_key = '_tokenmanager_generation'
+
+    def __init__(self, context, secret: str=None):
+        """Initialize self."""
+        self.context = context
+        if secret is None:
+            settings = get_current_registry().settings or {}
+            secret = settings.get('substanced.secret', '')
+        if not secret:
+            raise ConfigurationError('Signed authentication tokens require'
+                                     ' the setting `substanced.secret`.')
+        self.secret = secret
+
+    def create_token(self, userid: str, secret='', hashalg='sha512') -> str:
+        """Create authentication token for user_id.
+
+        :param secret:  ignored, the token is signed with the secret passed
+                        to the constructor.
+        :param hashalg: ignored, the token is signed with :attr:`hashalg`.
+        """
+        user = self._find_user(userid)
+        data = [userid, time.time(), self._get_generation(user)]
+        payload = urlsafe_b64encode(json.dumps(data).encode()).rstrip(b'=')
+        return payload.decode() + '.' + self._sign(payload)
+
+    def _sign(self, payload: bytes) -> str:
+        return hmac.new(self.secret.encode('UTF-8', 'replace'), payload,
+                        self.hashalg).hexdigest()
+
+    def _find_user(self, userid: str) -> object:
+        try:
+            return find_resource(self.context, userid)
+        except KeyError:
+            return None
+
+    def _get_generation(self, user) -> int:
+        return getattr(user, self.generation_key, 0)
+
+    def _get_revoked(self, user) -> dict:
+        return getattr(user, self.revoked_key, None) or {}
+
+    def _parse_token(self, token: str) -> list:
+        """Return userid, creation time and generation of a valid token.
+
+        :raises KeyError: if the token is malformed or the signature is wrong
+        """
+        try:
+            payload, signature = token.encode('ascii').split(b'.')
+            expected = self._sign(payload)
+            if not hmac.compare_digest(expected, signature.decode()):
+                raise KeyError(token)
+            padding = b'=' * (-len(payload) % 4)
+            data = json.loads(urlsafe_b64decode(payload + padding).decode())
+            userid, created, generation = data
+        except (ValueError, TypeError, AttributeError):
+            raise KeyError(token)
+        return userid, created, generation
+
+    def get_user_id(self, token: str, timeout: float=None) -> str:
+        """Get user_id for authentication token.
+
+        :param timeout:  Maximum number of seconds which a newly create token
+                        will be considered valid.
+                        The `None` value is allowed to disable the timeout.
+        :returns: user id for this token
+        :raises KeyError: if the token is invalid, expired or revoked.
+        """
+        userid, created, generation = self._parse_token(token)
+        if self._is_expired(created, timeout):
+            raise KeyError(token)
+        user = self._find_user(userid)
+        if user is None or generation != self._get_generation(user):
+            raise KeyError(token)
+        if self._get_signature(token) in self._get_revoked(user):
+            raise KeyError(token)
+        return userid
+
+    def _get_signature(self, token: str) -> str:
+        return token.rpartition('.')[2]
+
+    def _is_expired(self, created: float, timeout: float=None) -> bool:
+        if timeout is None:
+            return False
+        return time.time() - created >= timeout
+
+    def delete_token(self, token: str):
+        """Add authentication token to the revocation list of the user."""
+        try:
+            userid, created, generation = self._parse_token(token)
+        except KeyError:
+            return
+        user = self._find_user(userid)
+        if user is None or generation != self._get_generation(user):
+            return
+        revoked = dict(self._get_revoked(user))
+        revoked[self._get_signature(token)] = created
+        setattr(user, self.revoked_key, revoked)
+
+    def delete_user_tokens(self, userid: str):
+        """Revoke all authentication tokens of `userid`."""
+        user = self._find_user(userid)
+        if user is None:
+            return
+        setattr(user, self.generation_key, self._get_generation(user) + 1)
+        if self._get_revoked(user):
+            setattr(user, self.revoked_key, {})
+
+    def delete_expired_tokens(self, timeout: float):
+        """Remove expired tokens from the revocation lists of all users."""
+        users = find_service(self.context, 'principals', 'users')
+        if users is None:
+            return
+        for user in users.values():
+            revoked = self._get_revoked(user)
+            if not revoked:
+                continue
+            valid = {s: created for s, created in revoked.items()
+                     if not self._is_expired(created, timeout)}
+            if len(valid) < len(revoked):
+                setattr(user, self.revoked_key, valid)
+
+
 def get_tokenmanager(request: Request, **kwargs) -> ITokenManger:
     """Adapter request.root to ITokenmanager and return it.
 
@@ -117,6 +282,19 @@ def get_tokenmanager(request: Request, **kwargs) -> ITokenManger:
         return None
 
 
+def delete_user_tokens(user, registry: Registry=None):
+    """Delete all authentication tokens of `user`.
+
+    This is called if the user password is changed or reset, to log out
+    all sessions of the user.
+    """
+    if registry is None:
+        registry = get_current_registry()
+    tokenmanager = registry.queryAdapter(find_root(user), ITokenManger)
+    if tokenmanager is not None:
+        tokenmanager.delete_user_tokens(resource_path(user))
+
+
 def _get_raw_x_user_headers(request: Request) -> tuple:
     """Return not validated tuple with the X-User-Path/Token values."""
     user_url = request.headers.get('X-User-Path', '')
@@ -238,8 +416,9 @@ class TokenHeaderAuthenticationPolicy(CallbackAuthenticationPolicy):
     def forget(self, request):
         tokenmanager = self.get_tokenmanager(request)
         if tokenmanager:
-            token = _get_x_user_headers(request)[0]
-            tokenmanager.delete_token(token)
+            token = _get_x_user_headers(request)[1]
+            if token is not None:
+                tokenmanager.delete_token(token)
         return {}
 
     def effective_principals(self, request: Request) -> list:
@@ -260,9 +439,24 @@ class TokenHeaderAuthenticationPolicy(CallbackAuthenticationPolicy):
         return principals
 
 
+token_managers = {'annotation': TokenMangerAnnotationStorage,
+                  'signed': TokenMangerSignedTokens,
+                  }
+"""Mapping `adhocracy.token_manager` setting to token manager class."""
+
+
 def includeme(config):
-    """Register the TokenManger adapter."""
-    config.registry.registerAdapter(TokenMangerAnnotationStorage,
+    """Register the TokenManger adapter.
+
+    The setting `adhocracy.token_manager` selects the implementation,
+    `annotation` (default) or `signed`.
+    """
+    settings = config.registry.settings
+    name = settings.get('adhocracy.token_manager', 'annotation')
+    if name == 'signed' and not settings.get('substanced.secret'):
+        raise ConfigurationError('Signed authentication tokens require the'
+                                 ' setting `substanced.secret`.')
+    config.registry.registerAdapter(token_managers[name],
                                     required=(Interface,),
                                     provided=ITokenManger,
                                     )
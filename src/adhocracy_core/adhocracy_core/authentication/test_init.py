@@ -77,6 +77,14 @@ class TokenManagerUnitTest(unittest.TestCase):
         inst.delete_token(self.token)
         assert self.token not in inst.token_to_user_id_timestamp
 
+    def test_delete_user_tokens(self):
+        inst = self.make_one(self.context)
+        token = inst.create_token(self.userid)
+        other = inst.create_token('/principals/user/2')
+        inst.delete_user_tokens(self.userid)
+        assert token not in inst.token_to_user_id_timestamp
+        assert other in inst.token_to_user_id_timestamp
+
     def test_delete_expired_tokens_delete_token_if_expired(self):
         inst = self.make_one(self.context)
         inst.token_to_user_id_timestamp[self.token] = (self.userid, self.timestamp)
@@ -98,6 +106,155 @@ class TokenManagerUnitTest(unittest.TestCase):
         assert not inst.delete_token.called
 
 
+class TestTokenManagerSignedTokens:
+
+    @pytest.fixture
+    def context(self, pool, service):
+        pool['principals'] = service
+        service['users'] = testing.DummyResource()
+        return pool
+
+    @pytest.fixture
+    def user(self, context):
+        user = testing.DummyResource()
+        context['principals']['users']['0000001'] = user
+        return user
+
+    @pytest.fixture
+    def inst(self, context):
+        from adhocracy_core.authentication import TokenMangerSignedTokens
+        return TokenMangerSignedTokens(context, secret='secret')
+
+    @pytest.fixture
+    def userid(self, user):
+        return '/principals/users/0000001'
+
+    def test_create(self, inst):
+        from adhocracy_core.interfaces import ITokenManger
+        from zope.interface.verify import verifyObject
+        assert verifyObject(ITokenManger, inst)
+
+    def test_create_secret_from_settings(self, context, config):
+        from adhocracy_core.authentication import TokenMangerSignedTokens
+        config.registry.settings['substanced.secret'] = 'settings'
+        assert TokenMangerSignedTokens(context).secret == 'settings'
+
+    def test_create_raise_if_no_secret(self, context, config):
+        from adhocracy_core.authentication import TokenMangerSignedTokens
+        from adhocracy_core.exceptions import ConfigurationError
+        config.registry.settings['substanced.secret'] = ''
+        with pytest.raises(ConfigurationError):
+            TokenMangerSignedTokens(context)
+        with pytest.raises(ConfigurationError):
+            TokenMangerSignedTokens(context, secret='')
+
+    def test_create_token_no_database_write(self, inst, context, user,
+                                            userid):
+        inst.create_token(userid)
+        assert inst.revoked_key not in user.__dict__
+        assert inst.generation_key not in user.__dict__
+        assert inst.revoked_key not in context.__dict__
+
+    def test_create_token_second_time(self, inst, userid):
+        assert inst.create_token(userid) != inst.create_token(userid)
+
+    def test_create_token_ignore_client_hashalg(self, inst, userid):
+        from base64 import urlsafe_b64decode
+        import json
+        token = inst.create_token(userid, hashalg='md5')
+        payload, signature = token.split('.')
+        padding = '=' * (-len(payload) % 4)
+        data = json.loads(urlsafe_b64decode(payload + padding).decode())
+        assert len(data) == 3
+        assert len(signature) == 128  # sha512
+
+    def test_get_user_id(self, inst, userid):
+        token = inst.create_token(userid)
+        assert inst.get_user_id(token) == userid
+
+    def test_get_user_id_wrong_signature(self, inst, userid):
+        token = inst.create_token(userid)
+        with pytest.raises(KeyError):
+            inst.get_user_id(token[:-1] + 'x')
+
+    def test_get_user_id_wrong_secret(self, inst, context, userid):
+        from adhocracy_core.authentication import TokenMangerSignedTokens
+        other = TokenMangerSignedTokens(context, secret='other')
+        with pytest.raises(KeyError):
+            inst.get_user_id(other.create_token(userid))
+
+    def test_get_user_id_malformed_token(self, inst):
+        for token in ['', 'wrong_token', 'a.b', 'ä.b']:
+            with pytest.raises(KeyError):
+                inst.get_user_id(token)
+
+    def test_get_user_id_passed_timeout(self, inst, userid):
+        token = inst.create_token(userid)
+        with pytest.raises(KeyError):
+            inst.get_user_id(token, timeout=0)
+
+    def test_get_user_id_user_removed(self, inst, context, userid):
+        token = inst.create_token(userid)
+        del context['principals']['users']['0000001']
+        with pytest.raises(KeyError):
+            inst.get_user_id(token)
+
+    def test_delete_token(self, inst, userid):
+        token = inst.create_token(userid)
+        other = inst.create_token(userid)
+        inst.delete_token(token)
+        with pytest.raises(KeyError):
+            inst.get_user_id(token)
+        assert inst.get_user_id(other) == userid
+
+    def test_delete_token_store_revoked_at_user(self, inst, context, user,
+                                                userid):
+        inst.delete_token(inst.create_token(userid))
+        assert len(getattr(user, inst.revoked_key)) == 1
+        assert inst.revoked_key not in context.__dict__
+
+    def test_delete_token_wrong_token(self, inst, user):
+        inst.delete_token('wrong_token')
+        assert getattr(user, inst.revoked_key, None) is None
+
+    def test_delete_user_tokens(self, inst, user, userid):
+        token = inst.create_token(userid)
+        inst.delete_token(inst.create_token(userid))
+        inst.delete_user_tokens(userid)
+        with pytest.raises(KeyError):
+            inst.get_user_id(token)
+        assert inst.get_user_id(inst.create_token(userid)) == userid
+        assert getattr(user, inst.revoked_key) == {}
+
+    def test_delete_expired_tokens(self, inst, user, userid):
+        token = inst.create_token(userid)
+        inst.delete_token(token)
+        inst.delete_expired_tokens(1000)
+        assert len(getattr(user, inst.revoked_key)) == 1
+        inst.delete_expired_tokens(0)
+        assert len(getattr(user, inst.revoked_key)) == 0
+
+
+@pytest.mark.parametrize('name,class_name',
+                         [(None, 'TokenMangerAnnotationStorage'),
+                          ('signed', 'TokenMangerSignedTokens')])
+def test_includeme_register_token_manager(config, name, class_name):
+    from adhocracy_core.interfaces import ITokenManger
+    config.registry.settings['substanced.secret'] = 'secret'
+    if name is not None:
+        config.registry.settings['adhocracy.token_manager'] = name
+    config.include('adhocracy_core.authentication')
+    inst = config.registry.getAdapter(testing.DummyResource(), ITokenManger)
+    assert inst.__class__.__name__ == class_name
+
+
+def test_includeme_raise_if_signed_tokens_without_secret(config):
+    from adhocracy_core.exceptions import ConfigurationError
+    config.registry.settings['adhocracy.token_manager'] = 'signed'
+    with pytest.raises(ConfigurationError):
+        config.include('adhocracy_core.authentication')
+
+
 class TokenHeaderAuthenticationPolicy(unittest.TestCase):
 
     def make_one(self, secret, **kw):
@@ -311,7 +468,34 @@ class TokenHeaderAuthenticationPolicy(unittest.TestCase):
         inst = self.make_one('', get_tokenmanager=lambda x: tokenmanager)
         self.request.headers = self.token_and_user_id_headers
         assert inst.forget(self.request) == {}
-        assert tokenmanager.delete_token.is_called
+        tokenmanager.delete_token.assert_called_with(self.token)
+
+    def test_forget_delete_token_not_user_path(self):
+        """Regression: forget deleted the X-User-Path instead of the token."""
+        from . import TokenMangerAnnotationStorage
+        tokenmanager = TokenMangerAnnotationStorage(self.request.root)
+        token = tokenmanager.create_token(self.userid)
+        other = tokenmanager.create_token(self.userid)
+        inst = self.make_one('', get_tokenmanager=lambda x: tokenmanager)
+        self.request.headers = {'X-User-Token': token,
+                                'X-User-Path': self.user_url}
+        inst.forget(self.request)
+        with pytest.raises(KeyError):
+            tokenmanager.get_user_id(token)
+        assert tokenmanager.get_user_id(other) == self.userid
+
+    def test_forget_revoke_signed_token(self):
+        from . import TokenMangerSignedTokens
+        tokenmanager = TokenMangerSignedTokens(self.request.root,
+                                               secret='secret')
+        token = tokenmanager.create_token(self.userid)
+        inst = self.make_one('', get_tokenmanager=lambda x: tokenmanager)
+        self.request.headers = {'X-User-Token': token,
+                                'X-User-Path': self.user_url}
+        assert tokenmanager.get_user_id(token) == self.userid
+        inst.forget(self.request)
+        with pytest.raises(KeyError):
+            tokenmanager.get_user_id(token)
 
     def delete_expired_tokens(self, timeout: float):
         from . import TokenMangerAnnotationStorage
@@ -363,6 +547,35 @@ class GetTokenManagerUnitTest(unittest.TestCase):
         assert inst is None
 
 
+class TestDeleteUserTokens:
+
+    @pytest.fixture
+    def user(self, context):
+        context['user'] = testing.DummyResource()
+        return context['user']
+
+    @pytest.fixture
+    def tokenmanager(self, registry, context):
+        from adhocracy_core.interfaces import ITokenManger
+        from zope.interface import Interface
+        tokenmanager = Mock()
+        registry.registerAdapter(lambda x: tokenmanager,
+                                 required=(Interface,),
+                                 provided=ITokenManger)
+        return tokenmanager
+
+    def call_fut(self, *args, **kwargs):
+        from adhocracy_core.authentication import delete_user_tokens
+        return delete_user_tokens(*args, **kwargs)
+
+    def test_delete_user_tokens(self, user, registry, tokenmanager):
+        self.call_fut(user, registry=registry)
+        tokenmanager.delete_user_tokens.assert_called_with('/user')
+
+    def test_tokenmanager_not_registered(self, user, registry):
+        assert self.call_fut(user, registry=registry) is None
+
+
 class TokenHeaderAuthenticationPolicyIntegrationTest(unittest.TestCase):
 
     def setUp(self):
@@ -1,6 +1,7 @@
 """Authorization with roles/local roles mapped to adhocracy principals."""
 from collections import defaultdict
 from pyramid.security import ALL_PERMISSIONS
+from pyramid.security import AllPermissionsList
 from pyramid.security import Allow
 from pyramid.authorization import ACLAuthorizationPolicy
 from pyramid.security import ACLPermitsResult
@@ -10,6 +11,8 @@ from pyramid.registry import Registry
 from pyramid.request import Request
 from pyramid.router import Router
 from zope.interface import implementer
+from zope.interface import Interface
+from substanced.interfaces import IACLModified
 from substanced.util import get_acl
 from substanced.stats import statsd_timer
 import substanced.util
@@ -17,6 +20,7 @@ import transaction
 
 from adhocracy_core.utils import get_root
 from adhocracy_core.interfaces import IResource
+from adhocracy_core.interfaces import ILocalRolesModfied
 from adhocracy_core.interfaces import IRoleACLAuthorizationPolicy
 from adhocracy_core.events import LocalRolesModified
 from adhocracy_core.schema import ACEPrincipal
@@ -44,12 +48,144 @@ class RoleACLAuthorizationPolicy(ACLAuthorizationPolicy):
                 permission: str) -> ACLPermitsResult:
         """Check `permission` for `context`. Read interface docstring."""
         with statsd_timer('authorization', rate=.1):
-            local_roles = get_local_roles_all(context)
-            principals_with_roles = set(principals)
-            for principal, roles in local_roles.items():
-                if principal in principals:
-                    principals_with_roles.update(roles)
-            return super().permits(context, principals_with_roles, permission)
+            principals_with_roles = get_principals_with_local_roles(
+                context, principals)
+            return permits_lookup.get(context, principals_with_roles,
+                                      permission, super().permits)
+
+
+def get_principals_with_local_roles(context: IResource,
+                                    principals: list) -> set:
+    """Return `principals` and their :term:`local role`s for `context`."""
+    local_roles = get_local_roles_cache().get_local_roles_all(context)
+    principals_with_roles = set(principals)
+    for principal, roles in local_roles.items():
+        if principal in principals:
+            principals_with_roles.update(roles)
+    return principals_with_roles
+
+
+_all_permissions_key = object()
+"""Hashable value of :data:`pyramid.security.ALL_PERMISSIONS`."""
+
+
+class PermitsLookup:
+    """Process wide cache for ACL decisions.
+
+    The decisions are stored per (ACLs in lineage, principals, permission).
+    The ACLs are compared by value, so resources with equal ACLs share
+    the decisions. Resources with callable ACLs are not cached.
+    The mapping ACL object to value is cleared if an
+    :class:`substanced.interfaces.IACLModified` event is sent.
+    """
+
+    def __init__(self, max_size=100000):
+        """Initialize self."""
+        self.max_size = max_size
+        self._acl_keys = {}
+        self._decisions = {}
+
+    def get(self, context: IResource, principals: set, permission: str,
+            permits: callable) -> ACLPermitsResult:
+        """Return the cached result of `permits` or call it."""
+        locations, acls = self._get_acls(context)
+        acl_keys = self._get_acl_keys(acls)
+        if acl_keys is None:
+            return permits(context, principals, permission)
+        key = (acl_keys, frozenset(principals), permission)
+        decision = self._decisions.get(key, None)
+        if decision is None:
+            result = permits(context, principals, permission)
+            decision = self._to_decision(result, locations, acls)
+            self._add(self._decisions, key, decision)
+        result_class, ace, acl_index, location_index, acl = decision
+        if acl_index is not None:
+            acl = acls[acl_index]
+        location = locations[location_index] if location_index is not None\
+            else context
+        return result_class(ace, acl, permission, principals, location)
+
+    def get_acl_keys(self, context: IResource) -> tuple:
+        """Return hashable values of the ACLs in lineage or None.
+
+        None is returned if an ACL is callable or not hashable.
+        """
+        locations, acls = self._get_acls(context)
+        return self._get_acl_keys(acls)
+
+    def _get_acls(self, context: IResource) -> (list, list):
+        locations = []
+        acls = []
+        for location in lineage(context):
+            try:
+                acl = location.__acl__
+            except AttributeError:
+                continue
+            locations.append(location)
+            acls.append(acl)
+        return locations, acls
+
+    def _get_acl_keys(self, acls: list) -> tuple:
+        """Return hashable values of `acls` or None if not possible."""
+        acl_keys = []
+        for acl in acls:
+            cached = self._acl_keys.get(id(acl), None)
+            if cached is not None and cached[0] is acl:
+                acl_keys.append(cached[1])
+                continue
+            if callable(acl):
+                return None
+            try:
+                acl_key = tuple(self._to_hashable(ace) for ace in acl)
+                hash(acl_key)
+            except TypeError:
+                return None
+            # store the acl to keep the id key valid
+            self._add(self._acl_keys, id(acl), (acl, acl_key))
+            acl_keys.append(acl_key)
+        return tuple(acl_keys)
+
+    def _to_hashable(self, ace: tuple) -> tuple:
+        action, principal, permissions = ace
+        if isinstance(permissions, AllPermissionsList):
+            permissions = _all_permissions_key
+        elif isinstance(permissions, list):
+            permissions = tuple(permissions)
+        elif isinstance(permissions, (set, dict)):
+            permissions = frozenset(permissions)
+        return action, principal, permissions
+
+    def _to_decision(self, result: ACLPermitsResult, locations: list,
+                     acls: list) -> tuple:
+        acl_index = self._index(acls, result.acl)
+        location_index = self._index(locations, result.context)
+        # pyramid uses a string if there is no acl in lineage
+        missing_acl = result.acl if acl_index is None else None
+        return (result.__class__, result.ace, acl_index, location_index,
+                missing_acl)
+
+    def _index(self, values: list, value: object) -> int:
+        for index, x in enumerate(values):
+            if x is value:
+                return index
+        return None
+
+    def _add(self, mapping: dict, key, value):
+        if len(mapping) >= self.max_size:
+            mapping.clear()
+        mapping[key] = value
+
+    def clear(self):
+        """Remove all cached ACL values."""
+        self._acl_keys.clear()
+
+
+permits_lookup = PermitsLookup()
+
+
+def clear_permits_lookup_subscriber(event, resource):
+    """Clear the ACL values of :class:`PermitsLookup` if an ACL is modified."""
+    permits_lookup.clear()
 
 
 def set_local_roles(resource, new_local_roles: dict, registry: Registry=None):
@@ -103,6 +239,80 @@ def get_local_roles_all(resource) -> dict:
     return local_roles_all
 
 
+class LocalRolesCache:
+    """Transaction wide cache for :func:`get_local_roles_all`.
+
+    The inheritable local roles are stored per resource and computed with
+    the already cached inheritable local roles of the parent.
+    The cache is cleared if an
+    :class:`adhocracy_core.interfaces.ILocalRolesModified` event is sent.
+    """
+
+    def __init__(self):
+        """Initialize self."""
+        self._inheritable = {}
+
+    def get_local_roles_all(self, resource) -> dict:
+        """Return the :term:`local role`s of the resource and its parents.
+
+        The returned dictionary must not be modified.
+        """
+        inherited = self._get_inheritable(resource.__parent__)
+        local_roles = get_local_roles(resource)
+        if not local_roles:
+            return inherited
+        local_roles_all = dict(inherited)
+        for principal, roles in local_roles.items():
+            local_roles_all[principal] = local_roles_all.get(principal,
+                                                             set()) | roles
+        return local_roles_all
+
+    def _get_inheritable(self, resource) -> dict:
+        """Return the local roles of `resource` and its parents.
+
+        The `creator` role is removed.
+        """
+        if resource is None:
+            return {}
+        key = id(resource)
+        local_roles = get_local_roles(resource)
+        cached = self._inheritable.get(key, None)
+        if cached is not None:
+            cached_resource, parent, cached_local_roles, inheritable = cached
+            if parent is resource.__parent__ \
+                    and cached_local_roles is local_roles:
+                return inheritable
+        inheritable = dict(self._get_inheritable(resource.__parent__))
+        for principal, roles in local_roles.items():
+            roles_without_creator = {x for x in roles if x != CREATOR_ROLEID}
+            inheritable[principal] = inheritable.get(principal, set()) \
+                | roles_without_creator
+        # store the resource to keep the id key valid
+        self._inheritable[key] = (resource, resource.__parent__, local_roles,
+                                  inheritable)
+        return inheritable
+
+    def clear(self):
+        """Remove all cached local roles."""
+        self._inheritable.clear()
+
+
+def get_local_roles_cache() -> LocalRolesCache:
+    """Return the :class:`LocalRolesCache` of the current transaction."""
+    current = transaction.get()
+    try:
+        return current.data(LocalRolesCache)
+    except KeyError:
+        cache = LocalRolesCache()
+        current.set_data(LocalRolesCache, cache)
+        return cache
+
+
+def clear_local_roles_cache_subscriber(event):
+    """Clear the :class:`LocalRolesCache` if local roles are modified."""
+    get_local_roles_cache().clear()
+
+
 def acm_to_acl(acm: dict, registry: Registry) -> [str]:
     """Convert an Access Control Matrix into a pyramid ACL.
 
@@ -183,3 +393,11 @@ def create_fake_god_request(registry):
     request.registry = registry
     request.__cached_principals__ = ['role:god']
     return request
+
+
+def includeme(config):
+    """Register subscribers to clear the authorization caches."""
+    config.add_subscriber(clear_local_roles_cache_subscriber,
+                          ILocalRolesModfied)
+    config.add_subscriber(clear_permits_lookup_subscriber,
+                          [IACLModified, Interface])
@@ -114,6 +114,131 @@ class TestRuleACLAuthorizationPolicy:
                                 ['system.Authenticated'], 'view')
 
 
+class TestPermitsLookup:
+
+    @fixture
+    def inst(self):
+        from . import PermitsLookup
+        return PermitsLookup()
+
+    @fixture
+    def permits(self):
+        from pyramid.authorization import ACLAuthorizationPolicy
+        return Mock(wraps=ACLAuthorizationPolicy().permits)
+
+    def test_get_no_acl(self, inst, context, permits):
+        from pyramid.security import ACLDenied
+        inst.get(context, set(), 'view', permits)
+        result = inst.get(context, set(), 'view', permits)
+        assert isinstance(result, ACLDenied)
+        assert result.acl == '<No ACL found on any object in resource lineage>'
+        assert permits.call_count == 1
+
+    def test_get_cached(self, inst, context, permits):
+        from pyramid.security import ACLAllowed
+        context.__acl__ = [(Allow, 'principal', ['view'])]
+        context['child'] = testing.DummyResource()
+        inst.get(context, {'principal'}, 'view', permits)
+        result = inst.get(context['child'], {'principal'}, 'view', permits)
+        assert isinstance(result, ACLAllowed)
+        assert result.acl is context.__acl__
+        assert result.context is context
+        assert result.principals == {'principal'}
+        assert permits.call_count == 1
+
+    def test_get_cached_equal_acls(self, inst, context, permits):
+        context['child'] = testing.DummyResource(
+            __acl__=[(Deny, 'principal', 'view')])
+        context['child2'] = testing.DummyResource(
+            __acl__=[(Deny, 'principal', 'view')])
+        inst.get(context['child'], {'principal'}, 'view', permits)
+        result = inst.get(context['child2'], {'principal'}, 'view', permits)
+        assert not result
+        assert result.context is context['child2']
+        assert permits.call_count == 1
+
+    def test_get_other_principals_or_permission(self, inst, context,
+                                                permits):
+        context.__acl__ = [(Allow, 'principal', 'view')]
+        assert inst.get(context, {'principal'}, 'view', permits)
+        assert not inst.get(context, {'other'}, 'view', permits)
+        assert not inst.get(context, {'principal'}, 'edit', permits)
+        assert permits.call_count == 3
+
+    def test_get_acl_replaced(self, inst, context, permits):
+        context.__acl__ = [(Allow, 'principal', 'view')]
+        assert inst.get(context, {'principal'}, 'view', permits)
+        context.__acl__ = [(Deny, 'principal', 'view')]
+        assert not inst.get(context, {'principal'}, 'view', permits)
+
+    def test_get_callable_acl(self, inst, context, permits):
+        context.__acl__ = lambda: [(Allow, 'principal', 'view')]
+        inst.get(context, {'principal'}, 'view', permits)
+        assert inst.get(context, {'principal'}, 'view', permits)
+        assert permits.call_count == 2
+
+    def test_get_max_size(self, inst, context, permits):
+        inst.max_size = 1
+        context.__acl__ = [(Allow, 'principal', 'view')]
+        inst.get(context, {'principal'}, 'view', permits)
+        inst.get(context, {'principal'}, 'edit', permits)
+        inst.get(context, {'principal'}, 'view', permits)
+        assert permits.call_count == 3
+
+    def test_get_acl_keys(self, inst, context):
+        context.__acl__ = [(Allow, 'principal', ['view'])]
+        context['child'] = testing.DummyResource()
+        assert inst.get_acl_keys(context['child']) ==\
+            (((Allow, 'principal', ('view',)),),)
+
+    def test_get_acl_keys_all_permissions(self, inst, context):
+        from . import god_all_permission_ace
+        context.__acl__ = [god_all_permission_ace,
+                           (Allow, 'role:reader', 'view')]
+        context['child'] = testing.DummyResource()
+        assert inst.get_acl_keys(context['child']) is not None
+
+    def test_get_acl_keys_set_permissions(self, inst, context):
+        context.__acl__ = [(Allow, 'principal', {'view', 'edit'})]
+        assert inst.get_acl_keys(context) ==\
+            (((Allow, 'principal', frozenset(['view', 'edit'])),),)
+
+    def test_get_cached_with_root_acl(self, inst, context, permits):
+        from adhocracy_core.resources.root import root_acm
+        from . import acm_to_acl
+        from . import god_all_permission_ace
+        context.__acl__ = [god_all_permission_ace] + acm_to_acl(root_acm,
+                                                                None)
+        context['child'] = testing.DummyResource()
+        inst.get(context['child'], {'role:participant'}, 'view', permits)
+        assert inst.get(context['child'], {'role:participant'}, 'view',
+                        permits)
+        assert inst.get(context['child'], {'role:god'}, 'edit', permits)
+        assert permits.call_count == 2
+
+    def test_get_acl_keys_callable_acl(self, inst, context):
+        context.__acl__ = lambda: []
+        assert inst.get_acl_keys(context) is None
+
+    def test_clear(self, inst, context, permits):
+        acl = [(Allow, 'principal', 'view')]
+        context.__acl__ = acl
+        inst.get(context, {'principal'}, 'view', permits)
+        acl[0] = (Deny, 'principal', 'view')
+        inst.clear()
+        assert not inst.get(context, {'principal'}, 'view', permits)
+
+
+def test_clear_permits_lookup_subscriber_set_acl(context, config):
+    from . import permits_lookup
+    from . import set_acl
+    config.include('adhocracy_core.authorization')
+    permits_lookup.get(context, set(), 'view', Mock())
+    assert permits_lookup._acl_keys
+    set_acl(context, [(Allow, 'principal', 'view')], config.registry)
+    assert not permits_lookup._acl_keys
+
+
 def test_set_local_roles_non_set_roles(context):
     from . import set_local_roles
     new_roles = {'principal': []}
@@ -191,6 +316,86 @@ def test_get_local_roles_all_parents_with_creator_role(context):
     child = context['child']
     assert get_local_roles_all(child) == {'principal': {'role:editor'}}
 
+
+def test_get_principals_with_local_roles(context):
+    from . import get_principals_with_local_roles
+    context.__local_roles__ = {'principal': {'role:reader'},
+                               'other': {'role:admin'}}
+    assert get_principals_with_local_roles(context, ['principal']) ==\
+        {'principal', 'role:reader'}
+
+
+class TestLocalRolesCache:
+
+    @fixture
+    def inst(self):
+        from . import LocalRolesCache
+        return LocalRolesCache()
+
+    @fixture
+    def child(self, context):
+        context.__local_roles__ = {'principal': {'role:reader',
+                                                 'role:creator'}}
+        context['child'] = context.clone(
+            __local_roles__={'principal': {'role:editor'}})
+        return context['child']
+
+    def test_get_local_roles_all(self, inst, child):
+        assert inst.get_local_roles_all(child) == {
+            'principal': {'role:reader', 'role:editor'}}
+
+    def test_get_local_roles_all_without_local_roles(self, inst, child):
+        child['grandchild'] = testing.DummyResource()
+        assert inst.get_local_roles_all(child['grandchild']) == {
+            'principal': {'role:reader', 'role:editor'}}
+
+    def test_get_local_roles_all_equals_uncached(self, inst, child):
+        from . import get_local_roles_all
+        for resource in [child, child.__parent__]:
+            assert inst.get_local_roles_all(resource) ==\
+                get_local_roles_all(resource)
+
+    def test_get_local_roles_all_reuse_parent(self, inst, child):
+        inst.get_local_roles_all(child)
+        child.__parent__.__local_roles__['principal'].add('role:admin')
+        assert 'role:admin' not in inst.get_local_roles_all(child)['principal']
+
+    def test_get_local_roles_all_local_roles_replaced(self, inst, child):
+        child['grandchild'] = testing.DummyResource()
+        inst.get_local_roles_all(child['grandchild'])
+        child.__local_roles__ = {}
+        assert inst.get_local_roles_all(child['grandchild']) == {
+            'principal': {'role:reader'}}
+
+    def test_clear(self, inst, child):
+        inst.get_local_roles_all(child)
+        child.__parent__.__local_roles__['principal'].add('role:admin')
+        inst.clear()
+        assert 'role:admin' in inst.get_local_roles_all(child)['principal']
+
+
+def test_get_local_roles_cache_per_transaction():
+    import transaction
+    from . import get_local_roles_cache
+    cache = get_local_roles_cache()
+    assert get_local_roles_cache() is cache
+    transaction.abort()
+    assert get_local_roles_cache() is not cache
+
+
+def test_clear_local_roles_cache_subscriber_set_local_roles(context, config):
+    from . import get_local_roles_cache
+    from . import set_local_roles
+    config.include('adhocracy_core.authorization')
+    context['child'] = testing.DummyResource()
+    cache = get_local_roles_cache()
+    assert cache.get_local_roles_all(context['child']) == {}
+    set_local_roles(context, {'principal': {'role:reader'}},
+                    registry=config.registry)
+    assert cache.get_local_roles_all(context['child']) == {
+        'principal': {'role:reader'}}
+
+
 @fixture
 def mock_registry():
     registry = Mock()
@@ -1,23 +1,41 @@
 """Adapter and helper functions to set the http response caching headers."""
+from collections import Counter
+from copy import deepcopy
+from collections import OrderedDict
+from threading import Condition
+from threading import RLock
+from threading import Thread
 import logging
+import time
 
 from pyramid.httpexceptions import HTTPNotModified
 from pyramid.interfaces import IRequest
 from pyramid.registry import Registry
+from pyramid.threadlocal import get_current_registry
 from pyramid.traversal import resource_path
+from substanced.interfaces import IACLModified
+from substanced.util import find_service
 from zope.interface import implementer
+from zope.interface import Interface
 from zope.interface.interfaces import IInterface
 from requests.exceptions import RequestException
 import requests
 
+from adhocracy_core.authorization import get_principals_with_local_roles
+from adhocracy_core.catalog.allowed import get_changes as get_allowed_changes
+from adhocracy_core.authorization import permits_lookup
 from adhocracy_core.interfaces import HTTPCacheMode
 from adhocracy_core.interfaces import IHTTPCacheStrategy
 from adhocracy_core.interfaces import IResource
+from adhocracy_core.interfaces import IResourceSheetModified
 from adhocracy_core.exceptions import ConfigurationError
 from adhocracy_core.resources.asset import IAssetDownload
+from adhocracy_core.sheets.workflow import IWorkflowAssignment
+from adhocracy_core.utils import LRUCache
 from adhocracy_core.utils import get_reason_if_blocked
 from adhocracy_core.utils import exception_to_str
 from adhocracy_core.utils import extract_events_from_changelog_metadata
+from adhocracy_core.utils import get_iresource
 
 
 DISABLED_VIEWS_OR_METHODS = ['PATCH', 'POST', 'PUT']
@@ -266,41 +284,338 @@ class HTTPCacheStrategyStrongAdapter(HTTPCacheStrategyBaseAdapter):
     etags = (etag_modified, etag_userid, etag_blocked)
 
 
+def get_response_cache_key(context: IResource, request: IRequest) -> tuple:
+    """Return key to cache the response data of `request` or None.
+
+    The key is build with the application url (the data contains absolute
+    urls), the etag functions of the cache strategy and the ACLs in lineage
+    (compared by value). Instead of the :term:`userid` the sorted effective
+    principals including local roles are used. So users with the same
+    principals share the cached data.
+
+    The ACLs of descendants are not in lineage, but listings depend on them.
+    So the key also contains the persistent changes counter of the
+    `allowed` index, see :mod:`adhocracy_core.catalog.allowed`. It is
+    incremented if any ACL is modified (this includes ACL changes by
+    workflow transitions) or a resource is moved, invalidating the cached
+    data of all processes.
+
+    Requests that are not cacheable (no GET method, no etags, changed
+    resources or ACLs in the current transaction, callable ACLs) return
+    None.
+    """
+    if request.method != 'GET' or request.view_name:
+        return None
+    if 'explain' in request.GET:  # debug output with search timings
+        return None
+    strategy = _get_cache_strategy(context, request)
+    etags = getattr(strategy, 'etags', ())
+    if not etags:
+        return None
+    if _has_changed_resources(request.registry):
+        return None
+    acl_keys = permits_lookup.get_acl_keys(context)
+    if acl_keys is None:
+        return None
+    acl_changes = _get_acl_changes(context)
+    if acl_changes is None:
+        return None
+    tags = tuple(t(context, request) for t in etags if t is not etag_userid)
+    principals = tuple(sorted(get_principals_with_local_roles(
+        context, request.effective_principals)))
+    params = tuple(sorted(request.GET.items()))
+    path = resource_path(context)
+    return (request.application_url, path, params, tags, acl_keys,
+            acl_changes, principals)
+
+
+def _get_acl_changes(context: IResource) -> int:
+    """Return the ACL changes counter value, None if changed right now."""
+    catalogs = find_service(context, 'catalogs')
+    if not hasattr(catalogs, 'get_index'):
+        return 0
+    changes = get_allowed_changes(catalogs.get_index('allowed'))
+    if changes is None:
+        return 0
+    if changes._p_changed:
+        return None
+    return changes()
+
+
+def _has_changed_resources(registry: Registry) -> bool:
+    changelog = getattr(registry, 'changelog', {})
+    for meta in changelog.values():
+        if extract_events_from_changelog_metadata(meta):
+            return True
+    return False
+
+
+def get_cached_response_data(context: IResource, request: IRequest,
+                             get_data: callable) -> object:
+    """Return a copy of `get_data()`, use the response cache if enabled.
+
+    The cache is enabled with the setting
+    `adhocracy_core.caching.response_cache_size` (maximal number of
+    cached responses).
+    """
+    cache = getattr(request.registry, 'response_cache', None)
+    if cache is None:
+        return get_data()
+    key = get_response_cache_key(context, request)
+    if key is None:
+        return get_data()
+    data = cache.get(key)
+    if data is None:
+        data = get_data()
+        cache.set(key, data)
+    return deepcopy(data)
+
+
+def clear_response_cache_after_acl_modified(event, resource):
+    """Clear the response cache if an ACL is modified.
+
+    The response data of other resources, e.g. listings containing the
+    modified resource, may depend on the permissions.
+    """
+    _clear_response_cache(get_current_registry())
+
+
+def clear_response_cache_after_workflow_changed(event):
+    """Clear the response cache if a workflow state is changed."""
+    _clear_response_cache(event.registry)
+
+
+def _clear_response_cache(registry: Registry):
+    """Clear the response cache of this process.
+
+    Other processes notice the changes by the ACL changes counter in the
+    cache key, see :func:`get_response_cache_key`.
+    """
+    cache = getattr(registry, 'response_cache', None)
+    if cache is not None:
+        cache.clear()
+
+
+def get_options_cache_key(context: IResource, request: IRequest) -> tuple:
+    """Return key to cache the OPTIONS response data of `request` or None.
+
+    The response data is determined by the resource type, the workflow
+    state, the ACLs in lineage (compared by value) and the effective
+    principals including local roles. Resources with callable ACLs
+    return None.
+    """
+    acl_keys = permits_lookup.get_acl_keys(context)
+    if acl_keys is None:
+        return None
+    iresource = get_iresource(context)
+    workflow = request.registry.content.get_workflow(context)
+    state = workflow.state_of(context) if workflow is not None else None
+    principals = get_principals_with_local_roles(
+        context, request.effective_principals)
+    return iresource, state, acl_keys, frozenset(principals)
+
+
+def get_cached_options_data(context: IResource, request: IRequest,
+                            get_data: callable) -> dict:
+    """Return a copy of `get_data()`, use the options cache if enabled.
+
+    The cache is enabled with the setting
+    `adhocracy_core.caching.options_cache_size` (maximal number of
+    cached responses, default 1000).
+    """
+    cache = getattr(request.registry, 'options_cache', None)
+    if cache is None:
+        return get_data()
+    key = get_options_cache_key(context, request)
+    if key is None:
+        return get_data()
+    data = cache.get(key)
+    if data is None:
+        data = get_data()
+        cache.set(key, data)
+    return deepcopy(data)
+
+
+class PurgeDispatcher:
+    """Send PURGE requests to Varnish in a background thread.
+
+    Paths are collected with :meth:`add` and send by a daemon thread
+    reusing one http connection pool. Paths pending more than once or
+    below another pending path are only purged once, because the
+    `X-Purge-Regex` header purges every url starting with the path.
+    Failed requests are retried `max_attempts` times. If more than
+    `max_pending` paths are waiting the whole virtual host is purged
+    instead.
+
+    Counters for sent, retried, dropped and coalesced purge requests
+    are available in :attr:`stats`.
+    """
+
+    purge_regex = '/?\\??.*$'
+
+    def __init__(self, varnish_url: str, max_pending=10000, max_attempts=3,
+                 retry_delay=1.0):
+        """Create instance, the thread is started with the first path.
+
+        :param varnish_url: the URL of the varnish server;
+               if None, no thread will be started (useful for testing)
+        """
+        self.stats = Counter()
+        """Counters, only modified while holding :attr:`_lock`."""
+        self._varnish_url = varnish_url
+        self._max_pending = max_pending
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._pending = OrderedDict()
+        self._lock = RLock()
+        self._condition = Condition(self._lock)
+        self._session = requests.Session()
+        self._thread = None
+        self._is_stopped = False
+
+    def add(self, path: str, host: str, attempt=0):
+        """Add purge request for `path` and virtual host `host`."""
+        with self._condition:
+            key = (host, path)
+            if key in self._pending:
+                self._count('coalesced')
+                return
+            if len(self._pending) >= self._max_pending:
+                logger.warning('Too many pending purge requests, purge all'
+                               ' for host %s', host)
+                host_keys = [x for x in self._pending if x[0] == host]
+                for host_key in host_keys:
+                    del self._pending[host_key]
+                self._count('dropped', len(host_keys))
+                key = (host, '/')
+            self._pending[key] = attempt
+            self._start_thread()
+            self._condition.notify()
+
+    def _start_thread(self):
+        if self._thread is not None or self._varnish_url is None:
+            return
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while not self._is_stopped:
+            with self._condition:
+                while not self._pending and not self._is_stopped:
+                    self._condition.wait()
+            try:
+                errcount = self.send_pending()
+            except Exception as err:
+                logger.error('Error sending purge requests to Varnish: %s',
+                             exception_to_str(err))
+                errcount = 1
+            if errcount:
+                time.sleep(self._retry_delay)
+
+    def send_pending(self) -> int:
+        """Send all pending purge requests.
+
+        :returns: number of failed requests
+        """
+        with self._condition:
+            pending = self._pending
+            self._pending = OrderedDict()
+        errcount = 0
+        for (host, path), attempt in self._coalesce(pending):
+            if not self._send(host, path):
+                errcount += 1
+                self._retry(host, path, attempt)
+        return errcount
+
+    def _coalesce(self, pending: dict) -> list:
+        coalesced = []
+        last_host, last_path = None, None
+        for (host, path) in sorted(pending):
+            if host == last_host and path.startswith(last_path):
+                self._count('coalesced')
+                continue
+            coalesced.append(((host, path), pending[(host, path)]))
+            last_host, last_path = host, path
+        return coalesced
+
+    def _send(self, host: str, path: str) -> bool:
+        url = self._varnish_url + path
+        headers = {'X-Purge-Host': host,
+                   'X-Purge-Regex': self.purge_regex,
+                   }
+        try:
+            resp = self._session.request('PURGE', url, headers=headers)
+        except RequestException as err:
+            logger.error('Couldn\'t send purge request for %s to Varnish: %s',
+                         path, exception_to_str(err))
+            return False
+        if resp.status_code != 200:
+            logger.warning('Varnish responded %s to purge request for %s',
+                           resp.status_code, path)
+            return False
+        self._count('sent')
+        return True
+
+    def _retry(self, host: str, path: str, attempt: int):
+        if attempt + 1 >= self._max_attempts:
+            logger.error('Giving up on purge request for %s', path)
+            self._count('dropped')
+            return
+        self._count('retried')
+        self.add(path, host, attempt=attempt + 1)
+
+    def _count(self, name: str, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def stop(self):
+        """Stop the thread, pending purge requests are not send."""
+        with self._condition:
+            self._is_stopped = True
+            self._condition.notify()
+
+
+def get_purge_dispatcher(registry: Registry) -> PurgeDispatcher:
+    """Return varnish purge dispatcher or None."""
+    return getattr(registry, 'purge_dispatcher', None)
+
+
 def purge_varnish_after_commit_hook(success: bool, registry: Registry,
                                     request: IRequest):
-    """Send PURGE requests for all changed resources to Varnish."""
-    varnish_url = registry.settings.get('adhocracy.varnish_url')
-    if not (success and varnish_url):
+    """Add PURGE requests for all changed resources to the dispatcher.
+
+    The requests are send asynchronously, see :class:`PurgeDispatcher`.
+    """
+    dispatcher = get_purge_dispatcher(registry)
+    if not success or dispatcher is None:
         return
-    changelog_metadata = registry.changelog.values()
-    errcount = 0
-    for meta in changelog_metadata:
+    for meta in registry.changelog.values():
         events = extract_events_from_changelog_metadata(meta)
         if events == []:
             continue
-        path = resource_path(meta.resource)
-        url = varnish_url + request.script_name + path
-        for event in events:
-            headers = {'X-Purge-Host': request.host}
-            headers['X-Purge-Regex'] = '/?\??.*$'
-            try:
-                resp = requests.request('PURGE', url, headers=headers)
-                if resp.status_code != 200:
-                    logger.warning(
-                        'Varnish responded %s to purge request for %s',
-                        resp.status_code, path)
-            except RequestException as err:
-                logger.error(
-                    'Couldn\'t send purge request for %s to Varnish: %s',
-                    path, exception_to_str(err))
-                errcount += 1
-                if errcount >= 3:  # pragma: no cover
-                    logger.error('Giving up on purge requests')
-                    return
+        path = request.script_name + resource_path(meta.resource)
+        dispatcher.add(path, request.host)
 
 
 def includeme(config):
-    """Register cache strategies."""
+    """Register cache strategies, add response caches and purge dispatcher."""
+    varnish_url = config.registry.settings.get('adhocracy.varnish_url')
+    if varnish_url:
+        config.registry.purge_dispatcher = PurgeDispatcher(varnish_url)
+    cache_size = int(config.registry.settings.get(
+        'adhocracy_core.caching.response_cache_size', 0))
+    if cache_size > 0:
+        config.registry.response_cache = LRUCache(cache_size)
+        config.add_subscriber(clear_response_cache_after_acl_modified,
+                              [IACLModified, Interface])
+        config.add_subscriber(clear_response_cache_after_workflow_changed,
+                              IResourceSheetModified,
+                              event_isheet=IWorkflowAssignment)
+    options_cache_size = int(config.registry.settings.get(
+        'adhocracy_core.caching.options_cache_size', 1000))
+    if options_cache_size > 0:
+        config.registry.options_cache = LRUCache(options_cache_size)
     register_cache_strategy(HTTPCacheStrategyWeakAdapter,
                             IResource,
                             config.registry,
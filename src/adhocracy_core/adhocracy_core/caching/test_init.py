@@ -426,115 +426,571 @@ class TestIntegrationCaching:
         assert resp.status == '200 OK'
 
 
+class TestGetResponseCacheKey:
+
+    @fixture
+    def request_(self, registry, config, request_, monkeypatch):
+        from adhocracy_core.changelog import Changelog
+        from . import HTTPCacheStrategyWeakAdapter
+        from . import register_cache_strategy
+        from . import etag_modified
+        from . import etag_userid
+        from adhocracy_core.interfaces import IResource
+        monkeypatch.setattr(HTTPCacheStrategyWeakAdapter, 'etags',
+                            (etag_modified, etag_userid))
+        register_cache_strategy(HTTPCacheStrategyWeakAdapter, IResource,
+                                registry, 'GET')
+        registry.changelog = Changelog()
+        config.testing_securitypolicy(userid='hank',
+                                      groupids=('role:reader',))
+        return request_
+
+    @fixture
+    def context(self, context):
+        from zope.interface import alsoProvides
+        from adhocracy_core.interfaces import IResource
+        alsoProvides(context, IResource)
+        return context
+
+    def call_fut(self, context, request):
+        from . import get_response_cache_key
+        return get_response_cache_key(context, request)
+
+    def test_key(self, context, request_):
+        request_.GET = {'b': '1', 'a': '2'}
+        assert self.call_fut(context, request_) ==\
+            ('http://example.com', '/', (('a', '2'), ('b', '1')), ('None',),
+             (), 0,
+             ('hank', 'role:reader', 'system.Authenticated',
+              'system.Everyone'))
+
+    def test_key_different_for_different_application_url(self, context,
+                                                          request_):
+        key = self.call_fut(context, request_)
+        request_.application_url = 'https://other.example.com'
+        assert self.call_fut(context, request_) != key
+
+    def test_key_different_for_different_acls(self, context, request_):
+        from pyramid.security import Allow
+        from pyramid.security import Deny
+        parent = testing.DummyResource(__acl__=[(Allow, 'role:reader',
+                                                 'view')])
+        context.__parent__ = parent
+        key = self.call_fut(context, request_)
+        parent.__acl__ = [(Deny, 'role:reader', 'view')]
+        assert self.call_fut(context, request_) != key
+
+    def test_key_with_root_acl(self, context, request_):
+        from adhocracy_core.interfaces import IResource
+        from adhocracy_core.authorization import god_all_permission_ace
+        from adhocracy_core.authorization import acm_to_acl
+        from adhocracy_core.resources.root import root_acm
+        context.__acl__ = [god_all_permission_ace] + acm_to_acl(root_acm,
+                                                                None)
+        context['child'] = testing.DummyResource(__provides__=IResource)
+        assert self.call_fut(context['child'], request_) is not None
+
+    @fixture
+    def allowed_index(self, context):
+        from BTrees.Length import Length
+        from zope.interface import alsoProvides
+        from substanced.interfaces import IFolder
+        from substanced.interfaces import IService
+        alsoProvides(context, IFolder)
+        catalogs = testing.DummyResource(__provides__=(IFolder, IService))
+        index = testing.DummyResource(__allowed_changes__=Length(3))
+        catalogs.get_index = lambda name: index if name == 'allowed' \
+            else None
+        context['catalogs'] = catalogs
+        return index
+
+    def test_key_with_acl_changes(self, context, request_, allowed_index):
+        assert self.call_fut(context, request_)[5] == 3
+        key = self.call_fut(context, request_)
+        allowed_index.__allowed_changes__.change(1)
+        assert self.call_fut(context, request_) != key
+
+    def test_none_if_acl_changed_in_transaction(self, context, request_,
+                                                allowed_index):
+        allowed_index.__allowed_changes__ = mock.Mock(_p_changed=True)
+        assert self.call_fut(context, request_) is None
+
+    def test_key_with_local_roles(self, context, request_):
+        context.__local_roles__ = {'hank': {'role:admin'}}
+        assert 'role:admin' in self.call_fut(context, request_)[-1]
+
+    def test_none_if_callable_acl(self, context, request_):
+        context.__acl__ = lambda: []
+        assert self.call_fut(context, request_) is None
+
+    def test_key_same_for_same_principals(self, context, request_, config):
+        key = self.call_fut(context, request_)
+        config.testing_securitypolicy(userid='hank',
+                                      groupids=('role:reader', 'role:reader'))
+        assert self.call_fut(context, request_) == key
+
+    def test_key_different_for_different_principals(self, context, request_,
+                                                    config):
+        key = self.call_fut(context, request_)
+        config.testing_securitypolicy(userid='other',
+                                      groupids=('role:reader',))
+        assert self.call_fut(context, request_) != key
+
+    def test_none_if_not_get_method(self, context, request_):
+        request_.method = 'OPTIONS'
+        assert self.call_fut(context, request_) is None
+
+    def test_none_if_view_name(self, context, request_):
+        request_.view_name = 'view'
+        assert self.call_fut(context, request_) is None
+
+    def test_none_if_explain(self, context, request_):
+        request_.GET['explain'] = 'true'
+        assert self.call_fut(context, request_) is None
+
+    def test_none_if_no_strategy(self, request_):
+        assert self.call_fut(testing.DummyResource(), request_) is None
+
+    def test_none_if_changed_resources(self, context, request_,
+                                       changelog_meta):
+        request_.registry.changelog['/'] = changelog_meta._replace(
+            modified=True, resource=context)
+        assert self.call_fut(context, request_) is None
+
+
+class TestGetCachedResponseData:
+
+    @fixture
+    def mock_get_data(self):
+        return mock.Mock(return_value={'data': 1})
+
+    @fixture
+    def mock_key(self, monkeypatch):
+        from . import get_response_cache_key
+        from . import __name__ as module_name
+        mock_key = mock.Mock(spec=get_response_cache_key,
+                             return_value=('/',))
+        monkeypatch.setattr(module_name + '.get_response_cache_key', mock_key)
+        return mock_key
+
+    def call_fut(self, context, request, get_data):
+        from . import get_cached_response_data
+        return get_cached_response_data(context, request, get_data)
+
+    def test_without_cache(self, context, request_, mock_get_data):
+        assert self.call_fut(context, request_, mock_get_data) == {'data': 1}
+
+    def test_with_cache(self, context, request_, mock_get_data, mock_key):
+        from adhocracy_core.utils import LRUCache
+        request_.registry.response_cache = LRUCache(10)
+        self.call_fut(context, request_, mock_get_data)
+        assert self.call_fut(context, request_, mock_get_data) == {'data': 1}
+        assert mock_get_data.call_count == 1
+
+    def test_with_cache_return_copy(self, context, request_, mock_get_data,
+                                    mock_key):
+        from adhocracy_core.utils import LRUCache
+        request_.registry.response_cache = LRUCache(10)
+        self.call_fut(context, request_, mock_get_data)['data'] = 2
+        assert self.call_fut(context, request_, mock_get_data) == {'data': 1}
+
+    def test_with_cache_not_cacheable(self, context, request_, mock_get_data,
+                                      mock_key):
+        from adhocracy_core.utils import LRUCache
+        request_.registry.response_cache = LRUCache(10)
+        mock_key.return_value = None
+        self.call_fut(context, request_, mock_get_data)
+        self.call_fut(context, request_, mock_get_data)
+        assert mock_get_data.call_count == 2
+        assert len(request_.registry.response_cache) == 0
+
+
+class TestGetOptionsCacheKey:
+
+    @fixture
+    def request_(self, request_, config, mock_content_registry):
+        config.testing_securitypolicy(userid='hank',
+                                      groupids=('role:reader',))
+        mock_content_registry.get_workflow.return_value = None
+        request_.registry.content = mock_content_registry
+        return request_
+
+    @fixture
+    def context(self, context):
+        from pyramid.security import Allow
+        context.__acl__ = [(Allow, 'role:reader', 'view')]
+        return context
+
+    def call_fut(self, context, request):
+        from . import get_options_cache_key
+        return get_options_cache_key(context, request)
+
+    def test_key(self, context, request_):
+        from adhocracy_core.interfaces import IResource
+        from pyramid.security import Allow
+        assert self.call_fut(context, request_) ==\
+            (IResource, None, (((Allow, 'role:reader', 'view'),),),
+             frozenset({'hank', 'role:reader', 'system.Authenticated',
+                        'system.Everyone'}))
+
+    def test_key_with_god_ace_in_lineage(self, context, request_):
+        from adhocracy_core.authorization import god_all_permission_ace
+        context.__acl__ = [god_all_permission_ace] + context.__acl__
+        context['child'] = testing.DummyResource()
+        assert self.call_fut(context['child'], request_) is not None
+
+    def test_key_with_workflow_state(self, context, request_):
+        workflow = mock.Mock()
+        workflow.state_of.return_value = 'draft'
+        request_.registry.content.get_workflow.return_value = workflow
+        assert self.call_fut(context, request_)[1] == 'draft'
+
+    def test_key_with_local_roles(self, context, request_):
+        context.__local_roles__ = {'hank': {'role:admin'}}
+        assert 'role:admin' in self.call_fut(context, request_)[3]
+
+    def test_key_same_for_equal_acls(self, context, request_):
+        from pyramid.security import Allow
+        key = self.call_fut(context, request_)
+        context.__acl__ = [(Allow, 'role:reader', 'view')]
+        assert self.call_fut(context, request_) == key
+
+    def test_key_different_for_different_acls(self, context, request_):
+        from pyramid.security import Deny
+        key = self.call_fut(context, request_)
+        context.__acl__ = [(Deny, 'role:reader', 'view')]
+        assert self.call_fut(context, request_) != key
+
+    def test_none_if_callable_acl(self, context, request_):
+        context.__acl__ = lambda: []
+        assert self.call_fut(context, request_) is None
+
+
+class TestGetCachedOptionsData:
+
+    @fixture
+    def mock_get_data(self):
+        return mock.Mock(return_value={'GET': {'data': {}}})
+
+    @fixture
+    def mock_key(self, monkeypatch):
+        from . import get_options_cache_key
+        from . import __name__ as module_name
+        mock_key = mock.Mock(spec=get_options_cache_key,
+                             return_value=('/',))
+        monkeypatch.setattr(module_name + '.get_options_cache_key', mock_key)
+        return mock_key
+
+    def call_fut(self, context, request, get_data):
+        from . import get_cached_options_data
+        return get_cached_options_data(context, request, get_data)
+
+    def test_without_cache(self, context, request_, mock_get_data):
+        assert self.call_fut(context, request_, mock_get_data) ==\
+            {'GET': {'data': {}}}
+
+    def test_with_cache(self, context, request_, mock_get_data, mock_key):
+        from adhocracy_core.utils import LRUCache
+        request_.registry.options_cache = LRUCache(10)
+        self.call_fut(context, request_, mock_get_data)
+        assert self.call_fut(context, request_, mock_get_data) ==\
+            {'GET': {'data': {}}}
+        assert mock_get_data.call_count == 1
+
+    def test_with_cache_return_copy(self, context, request_, mock_get_data,
+                                    mock_key):
+        from adhocracy_core.utils import LRUCache
+        request_.registry.options_cache = LRUCache(10)
+        result = self.call_fut(context, request_, mock_get_data)
+        result['GET']['data']['x'] = 1
+        assert self.call_fut(context, request_, mock_get_data) ==\
+            {'GET': {'data': {}}}
+
+    def test_with_cache_not_cacheable(self, context, request_, mock_get_data,
+                                      mock_key):
+        from adhocracy_core.utils import LRUCache
+        request_.registry.options_cache = LRUCache(10)
+        mock_key.return_value = None
+        self.call_fut(context, request_, mock_get_data)
+        self.call_fut(context, request_, mock_get_data)
+        assert mock_get_data.call_count == 2
+
+
+def test_includeme_add_response_cache(config):
+    from adhocracy_core.utils import LRUCache
+    config.registry.settings['adhocracy_core.caching.response_cache_size'] = \
+        '100'
+    config.include('adhocracy_core.events')
+    config.include('adhocracy_core.caching')
+    assert isinstance(config.registry.response_cache, LRUCache)
+    assert config.registry.response_cache.maxsize == 100
+
+
+def test_clear_response_cache_after_acl_modified(registry):
+    from adhocracy_core.utils import LRUCache
+    from . import clear_response_cache_after_acl_modified
+    registry.response_cache = LRUCache(10)
+    registry.response_cache.set('key', 'data')
+    clear_response_cache_after_acl_modified(None, None)
+    assert len(registry.response_cache) == 0
+
+
+def test_clear_response_cache_after_workflow_changed(registry):
+    from adhocracy_core.utils import LRUCache
+    from . import clear_response_cache_after_workflow_changed
+    registry.response_cache = LRUCache(10)
+    registry.response_cache.set('key', 'data')
+    clear_response_cache_after_workflow_changed(
+        testing.DummyResource(registry=registry))
+    assert len(registry.response_cache) == 0
+
+
+def test_includeme_no_response_cache_by_default(config):
+    config.include('adhocracy_core.caching')
+    assert getattr(config.registry, 'response_cache', None) is None
+
+
+def test_includeme_add_options_cache_by_default(config):
+    from adhocracy_core.utils import LRUCache
+    config.include('adhocracy_core.caching')
+    assert isinstance(config.registry.options_cache, LRUCache)
+    assert config.registry.options_cache.maxsize == 1000
+
+
+def test_includeme_no_options_cache_if_size_zero(config):
+    config.registry.settings['adhocracy_core.caching.options_cache_size'] = \
+        '0'
+    config.include('adhocracy_core.caching')
+    assert getattr(config.registry, 'options_cache', None) is None
+
+
+def test_includeme_add_purge_dispatcher(config):
+    from . import PurgeDispatcher
+    config.registry.settings['adhocracy.varnish_url'] = 'http://localhost'
+    config.include('adhocracy_core.caching')
+    assert isinstance(config.registry.purge_dispatcher, PurgeDispatcher)
+
+
+def test_includeme_no_purge_dispatcher_by_default(config):
+    config.include('adhocracy_core.caching')
+    assert getattr(config.registry, 'purge_dispatcher', None) is None
+
+
+class TestPurgeDispatcher:
+
+    @fixture
+    def inst(self):
+        from . import PurgeDispatcher
+        inst = PurgeDispatcher('http://localhost', max_pending=3,
+                               max_attempts=2)
+        inst._start_thread = mock.Mock()
+        return inst
+
+    @fixture
+    def mock_session(self, inst):
+        from requests import Response
+        mock_response = mock.Mock(spec=Response)
+        mock_response.status_code = 200
+        inst._session = mock.Mock()
+        inst._session.request.return_value = mock_response
+        return inst._session
+
+    @fixture
+    def mock_logger(self, monkeypatch):
+        from adhocracy_core import caching
+        mock_logger = mock.Mock()
+        monkeypatch.setattr(caching, 'logger', mock_logger)
+        return mock_logger
+
+    def test_create(self):
+        from requests import Session
+        from . import PurgeDispatcher
+        inst = PurgeDispatcher('http://localhost')
+        assert isinstance(inst._session, Session)
+        assert inst._thread is None
+        assert inst.stats == {}
+
+    def test_add_start_thread(self, inst):
+        inst.add('/', 'host')
+        assert inst._start_thread.called
+
+    def test_add_no_thread_without_varnish_url(self):
+        from . import PurgeDispatcher
+        inst = PurgeDispatcher(None)
+        inst.add('/', 'host')
+        assert inst._thread is None
+
+    def test_send_pending_empty(self, inst, mock_session):
+        assert inst.send_pending() == 0
+        assert not mock_session.request.called
+
+    def test_send_pending(self, inst, mock_session):
+        inst.add('/', 'host')
+        assert inst.send_pending() == 0
+        mock_session.request.assert_called_once_with(
+            'PURGE', 'http://localhost/',
+            headers={'X-Purge-Host': 'host',
+                     'X-Purge-Regex': '/?\\??.*$'})
+        assert inst.stats['sent'] == 1
+        assert inst._pending == {}
+
+    def test_send_pending_coalesce_duplicates(self, inst, mock_session):
+        inst.add('/a', 'host')
+        inst.add('/a', 'host')
+        inst.send_pending()
+        assert mock_session.request.call_count == 1
+        assert inst.stats['coalesced'] == 1
+
+    def test_send_pending_coalesce_descendants(self, inst, mock_session):
+        inst.add('/a/b', 'host')
+        inst.add('/a', 'host')
+        inst.add('/a/c', 'host')
+        inst.send_pending()
+        mock_session.request.assert_called_once_with(
+            'PURGE', 'http://localhost/a', headers=mock.ANY)
+        assert inst.stats['coalesced'] == 2
+
+    def test_send_pending_no_coalesce_different_hosts(self, inst,
+                                                      mock_session):
+        inst.add('/a', 'host')
+        inst.add('/a/b', 'other')
+        inst.send_pending()
+        assert mock_session.request.call_count == 2
+
+    def test_add_purge_all_if_too_many_pending(self, inst):
+        inst.add('/a', 'host')
+        inst.add('/b', 'host')
+        inst.add('/c', 'host')
+        inst.add('/d', 'host')
+        assert list(inst._pending) == [('host', '/')]
+        assert inst.stats['dropped'] == 3
+
+    def test_add_purge_all_only_for_overflowing_host(self, inst):
+        inst.add('/a', 'other')
+        inst.add('/b', 'host')
+        inst.add('/c', 'host')
+        inst.add('/d', 'host')
+        assert list(inst._pending) == [('other', '/a'), ('host', '/')]
+        assert inst.stats['dropped'] == 2
+
+    def test_run_continue_after_unexpected_error(self, inst, mock_logger):
+        inst._retry_delay = 0
+        inst.add('/', 'host')
+
+        def send_pending():
+            if inst.send_pending.call_count == 1:
+                raise ValueError
+            inst._is_stopped = True
+        inst.send_pending = mock.Mock(side_effect=send_pending)
+        inst._run()
+        assert inst.send_pending.call_count == 2
+        assert mock_logger.error.called
+
+    def test_send_pending_unexpected_status_code(self, inst, mock_session,
+                                                 mock_logger):
+        mock_session.request.return_value.status_code = 444
+        inst.add('/', 'host')
+        assert inst.send_pending() == 1
+        assert mock_logger.warning.called
+        assert inst.stats['retried'] == 1
+        assert inst._pending == {('host', '/'): 1}
+
+    def test_send_pending_exception_raised(self, inst, mock_session,
+                                           mock_logger):
+        from requests.exceptions import RequestException
+        mock_session.request.side_effect = RequestException('Nope!')
+        inst.add('/', 'host')
+        assert inst.send_pending() == 1
+        assert mock_logger.error.called
+        assert ('host', '/') in inst._pending
+
+    def test_send_pending_give_up_after_max_attempts(self, inst,
+                                                     mock_session,
+                                                     mock_logger):
+        mock_session.request.return_value.status_code = 444
+        inst.add('/', 'host')
+        inst.send_pending()
+        inst.send_pending()
+        assert mock_session.request.call_count == 2
+        assert inst._pending == {}
+        assert inst.stats['dropped'] == 1
+
+    def test_stop(self, inst):
+        inst.stop()
+        assert inst._is_stopped
+
+
 class TestPurgeVarnishAfterCommitHook:
 
     @fixture
-    def registry_for_varnish(self, registry_with_changelog):
-        registry_with_changelog.settings[
-            'adhocracy.varnish_url'] = 'http://localhost'
+    def mock_dispatcher(self):
+        from . import PurgeDispatcher
+        return mock.Mock(spec=PurgeDispatcher)
+
+    @fixture
+    def registry_for_varnish(self, registry_with_changelog, mock_dispatcher):
+        registry_with_changelog.purge_dispatcher = mock_dispatcher
         return registry_with_changelog
 
     @fixture
     def request_(self):
         return testing.DummyRequest()
 
-    def _monkeypatch_requests(self, monkeypatch, status_code=200,
-                              side_effect=None):
-        from adhocracy_core import caching
-        from requests import Response
-        mock_requests = mock.Mock()
-        mock_response = mock.Mock(spec=Response)
-        mock_response.status_code = status_code
-        mock_requests.request = mock.Mock(return_value=mock_response,
-                                          side_effect=side_effect)
-        monkeypatch.setattr(caching, 'requests', mock_requests)
-        return mock_requests
-
-    def test_empty_changelog(self, monkeypatch, registry_for_varnish, request_):
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        assert not mock_requests.request.called
-
-    def test_modified_in_changelog(self, monkeypatch, registry_for_varnish,
-                                   changelog_meta, context, request_):
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
+    def call_fut(self, *args):
+        from . import purge_varnish_after_commit_hook
+        return purge_varnish_after_commit_hook(*args)
+
+    def test_empty_changelog(self, registry_for_varnish, request_,
+                             mock_dispatcher):
+        self.call_fut(True, registry_for_varnish, request_)
+        assert not mock_dispatcher.add.called
+
+    def test_modified_in_changelog(self, registry_for_varnish,
+                                   changelog_meta, context, request_,
+                                   mock_dispatcher):
         request_.host = 'host'
-        mock_requests = self._monkeypatch_requests(monkeypatch)
         registry_for_varnish.changelog[
             '/'] = changelog_meta._replace(resource=context, modified=True)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        mock_requests.request.assert_called_once_with(
-            'PURGE', 'http://localhost/', headers={'X-Purge-Host': 'host',
-                                                   'X-Purge-Regex': '/?\??.*$'})
+        self.call_fut(True, registry_for_varnish, request_)
+        mock_dispatcher.add.assert_called_once_with('/', 'host')
+
+    def test_modified_in_changelog_with_script_name(
+            self, registry_for_varnish, changelog_meta, context, request_,
+            mock_dispatcher):
+        request_.script_name = '/api'
+        registry_for_varnish.changelog[
+            '/'] = changelog_meta._replace(resource=context, modified=True)
+        self.call_fut(True, registry_for_varnish, request_)
+        assert mock_dispatcher.add.call_args[0][0] == '/api/'
 
     def test_change_descendants_in_changelog(
-            self, monkeypatch, registry_for_varnish, changelog_meta, context,
-            request_):
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch)
+            self, registry_for_varnish, changelog_meta, context, request_,
+            mock_dispatcher):
         registry_for_varnish.changelog[
             '/'] = changelog_meta._replace(resource=context,
                                            changed_descendants=True)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        assert mock_requests.request.call_args[1]['headers']['X-Purge-Regex']\
-            == '/?\??.*$'
+        self.call_fut(True, registry_for_varnish, request_)
+        assert mock_dispatcher.add.call_count == 1
 
     def test_non_empty_changelog_but_unchanged_resource(
-            self, monkeypatch, registry_for_varnish, changelog_meta, context,
-            request_):
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch)
+            self, registry_for_varnish, changelog_meta, context, request_,
+            mock_dispatcher):
         registry_for_varnish.changelog[
             '/'] = changelog_meta._replace(resource=context)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        assert not mock_requests.request.called
+        self.call_fut(True, registry_for_varnish, request_)
+        assert not mock_dispatcher.add.called
 
-    def test_success_false(self, monkeypatch, registry_for_varnish,
-                           changelog_meta, context, request_):
+    def test_success_false(self, registry_for_varnish, changelog_meta,
+                           context, request_, mock_dispatcher):
         """Nothing should happen if the transaction was unsuccessful."""
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch)
         registry_for_varnish.changelog[
             '/'] = changelog_meta._replace(resource=context, modified=True)
-        purge_varnish_after_commit_hook(False, registry_for_varnish, request_)
-        assert not mock_requests.request.called
+        self.call_fut(False, registry_for_varnish, request_)
+        assert not mock_dispatcher.add.called
 
-    def test_no_varnish_url(self, monkeypatch, registry_with_changelog,
-                            changelog_meta, context, request_):
+    def test_no_purge_dispatcher(self, registry_with_changelog,
+                                 changelog_meta, context, request_):
         """Nothing should happen if no varnish_url is configured."""
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch)
         registry_with_changelog.changelog[
             '/'] = changelog_meta._replace(resource=context, modified=True)
-        purge_varnish_after_commit_hook(True, registry_with_changelog, request_)
-        assert not mock_requests.request.called
-
-    def test_unexpected_status_code(self, monkeypatch, registry_for_varnish,
-                                 changelog_meta, context, request_):
-        from adhocracy_core import caching
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(monkeypatch,
-                                                   status_code=444)
-        mock_logger = mock.Mock()
-        monkeypatch.setattr(caching, 'logger', mock_logger)
-        registry_for_varnish.changelog[
-            '/'] = changelog_meta._replace(resource=context, modified=True)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        assert mock_requests.request.called
-        assert mock_logger.warning.called
-
-    def test_exception_raised(self, monkeypatch, registry_for_varnish,
-                              changelog_meta, context, request_):
-        from requests.exceptions import RequestException
-        from adhocracy_core import caching
-        from adhocracy_core.caching import purge_varnish_after_commit_hook
-        mock_requests = self._monkeypatch_requests(
-            monkeypatch, side_effect=RequestException('Nope!'))
-        mock_logger = mock.Mock()
-        monkeypatch.setattr(caching, 'logger', mock_logger)
-        registry_for_varnish.changelog[
-            '/'] = changelog_meta._replace(resource=context, modified=True)
-        purge_varnish_after_commit_hook(True, registry_for_varnish, request_)
-        assert mock_requests.request.called
-        assert mock_logger.error.called
+        assert self.call_fut(True, registry_with_changelog, request_) is None
@@ -1,19 +1,46 @@
 """Configure search catalogs."""
+from collections import defaultdict
+from collections import OrderedDict
 from itertools import chain
+from time import perf_counter
+import logging
 
 from zope.interface import Interface
 from pyramid.registry import Registry
+from pyramid.settings import aslist
+from pyramid.threadlocal import get_current_registry
 from itertools import islice
 from collections.abc import Iterable
 from substanced import catalog
 from substanced.interfaces import IIndexingActionProcessor
+from substanced.interfaces import MODE_DEFERRED
+from substanced.interfaces import MODE_IMMEDIATE
 from substanced.catalog import CatalogsService
+from substanced.catalog.deferred import ReindexAction
 from substanced.catalog.indexes import AllowsComparator
 from substanced.util import find_objectmap
+from substanced.util import get_oid
+from hypatia.field import FieldIndex
+from hypatia.keyword import KeywordIndex
 from hypatia.interfaces import IIndex
 from hypatia.interfaces import IResultSet
 from hypatia.query import Query
 from hypatia.util import ResultSet
+from adhocracy_core.catalog.allowed import BulkAllowsComparator
+from adhocracy_core.catalog.allowed import get_changes as get_allowed_changes
+from adhocracy_core.catalog.visibility import get_changes as \
+    get_visibility_changes
+from adhocracy_core.catalog.visibility import get_concealed_oids
+from adhocracy_core.catalog.cursor import get_next_cursor
+from adhocracy_core.catalog.cursor import scan_after_cursor
+from adhocracy_core.catalog.cursor import supports_cursor
+from adhocracy_core.catalog.plan import execute_plan
+from adhocracy_core.catalog.plan import get_elapsed
+from adhocracy_core.catalog.plan import split_query
+from adhocracy_core.catalog.results import get_changes_count
+from adhocracy_core.catalog.results import get_removals
+from adhocracy_core.catalog.results import get_result_cache_key
+from adhocracy_core.catalog.sorting import sort_docids
 from adhocracy_core.interfaces import IServicePool
 from adhocracy_core.interfaces import FieldComparator
 from adhocracy_core.interfaces import FieldSequenceComparator
@@ -26,15 +53,100 @@ from adhocracy_core.interfaces import search_result
 from adhocracy_core.interfaces import IResource
 from adhocracy_core.resources.service import service_meta
 from adhocracy_core.resources import add_resource_type_to_registry
+from adhocracy_core.utils import LRUCache
 from adhocracy_core.utils import normalize_to_tuple
+import transaction
+
+_marker = object()
+
+logger = logging.getLogger(__name__)
 
 
 class ICatalogsService(IServicePool):
     """The 'catalogs' ServicePool."""
 
 
+def _get_deferred_index_names() -> [str]:
+    settings = get_current_registry().settings or {}
+    return aslist(settings.get('adhocracy.catalog.deferred_indexes', ''))
+
+
+class ReindexQueue:
+    """Collect resources to reindex during one transaction.
+
+    Every resource is reindexed only once per index, no matter how often
+    it was added. The queue is flushed by a before commit hook of the
+    current transaction.
+    """
+
+    def __init__(self, catalogs: 'CatalogsServiceAdhocracy'):
+        """Initialize self and register the before commit hook."""
+        self.catalogs = catalogs
+        self.entries = OrderedDict()
+        self.transaction = transaction.get()
+        self.transaction.addBeforeCommitHook(self.flush_before_commit)
+
+    def add(self, resource: IResource, index_name: str):
+        """Add `resource` to reindex with index `index_name`."""
+        resources = self.entries.setdefault(index_name, OrderedDict())
+        resources[get_oid(resource)] = resource
+
+    def flush(self, index_names: [str]=None):
+        """Reindex the queued resources immediately.
+
+        :param index_names: only reindex these indexes, defaults to all.
+        """
+        self._reindex(index_names, [])
+
+    def flush_before_commit(self):
+        """Reindex the queued resources of all indexes.
+
+        Indexes listed in the setting `adhocracy.catalog.deferred_indexes`
+        are reindexed by the substanced indexing action processor if active.
+        Run `sd_drain_indexing` to start the processor.
+        """
+        self._reindex(None, _get_deferred_index_names())
+
+    def _reindex(self, index_names: [str], deferred_names: [str]):
+        names = list(self.entries) if index_names is None else index_names
+        for name in names:
+            resources = self._pop_existing_resources(name)
+            if not resources:
+                continue
+            index = self.catalogs.get_index(name)
+            if name in deferred_names and self._defer(index, resources):
+                continue
+            for resource in resources.values():
+                index.reindex_resource(resource, action_mode=MODE_IMMEDIATE)
+        if index_names is None and self.entries:  # queued while flushing
+            self._reindex(None, deferred_names)
+
+    def _pop_existing_resources(self, index_name: str) -> dict:
+        """Pop queued resources but skip the ones removed in the meantime."""
+        resources = self.entries.pop(index_name, {})
+        objectmap = find_objectmap(self.catalogs)
+        if objectmap is None:
+            return resources
+        return OrderedDict((oid, resource)
+                           for oid, resource in resources.items()
+                           if oid in objectmap.objectid_to_path)
+
+    def _defer(self, index: IIndex, resources: dict) -> bool:
+        registry = get_current_registry()
+        processor = registry.queryAdapter(index, IIndexingActionProcessor)
+        if processor is None or not processor.active():
+            return False
+        actions = [ReindexAction(index, MODE_DEFERRED, oid)
+                   for oid in resources]
+        logger.debug('adding deferred actions %r', actions)
+        processor.add(actions)
+        return True
+
+
 class CatalogsServiceAdhocracy(CatalogsService):
 
+    _v_reindex_queue = None
+
     def reindex_all(self, resource: IResource):
         """Reindex `resource` with all indexes."""
         for value in self.values():
@@ -51,21 +163,144 @@ class CatalogsServiceAdhocracy(CatalogsService):
             raise KeyError(msg)
         index.reindex_resource(resource)
 
+    def queue_reindex_index(self, resource: IResource, index_name: str):
+        """Reindex `resource` with index `index_name` before commit.
+
+        Multiple calls with the same arguments in one transaction reindex
+        only once.
+
+        :raises KeyError: if `index_name`  index does not exists.
+        """
+        if self.get_index(index_name) is None:
+            msg = 'catalog index {0} does not exist.'.format(index_name)
+            raise KeyError(msg)
+        self._get_reindex_queue().add(resource, index_name)
+
+    def flush_reindex_queue(self, index_names: [str]=None):
+        """Reindex all resources queued with :meth:`queue_reindex_index`.
+
+        :param index_names: only reindex these indexes, defaults to all.
+        """
+        queue = self._v_reindex_queue
+        if queue is None or queue.transaction is not transaction.get():
+            return
+        queue.flush(index_names=index_names)
+
+    def _get_reindex_queue(self) -> ReindexQueue:
+        queue = self._v_reindex_queue
+        if queue is None or queue.transaction is not transaction.get():
+            queue = ReindexQueue(self)
+            self._v_reindex_queue = queue
+        return queue
+
     def search(self, query: SearchQuery) -> SearchResult:
         """Search indexes in catalogs `adhocracy` and `system`."""
-        elements = self._search_elements(query)
+        start = perf_counter()
+        self.flush_reindex_queue(self._get_index_names(query))
+        explain = {} if query.explain else None
+        elements = self._search_elements(query, explain=explain)
         frequency_of = self._get_frequency_of(elements, query)
         group_by = self._get_group_by(elements, query)
+        count = len(elements)
         sorted_elements = self._sort_elements(elements, query)
-        count = len(sorted_elements)
         elements_slice = self._get_slice(sorted_elements, query)
+        cursor = ''
+        if query.limit and self._supports_cursor(query):
+            elements_slice = list(elements_slice)
+            if len(elements_slice) == query.limit:
+                sort_index = self.get_index(query.sort_by)
+                cursor = get_next_cursor(sort_index, elements_slice[-1])
         resolved = self._resolve(elements_slice, query)
         result = search_result._replace(elements=resolved,
                                         count=count,
                                         group_by=group_by,
-                                        frequency_of=frequency_of)
+                                        frequency_of=frequency_of,
+                                        cursor=cursor)
+        if explain is not None:
+            explain['time'] = get_elapsed(start)
+            result = result._replace(explain=explain)
         return result
 
+    def search_many(self, queries: [SearchQuery]) -> [SearchResult]:
+        """Search multiple reference `queries` at once.
+
+        If all `queries` search one reference, sort by `reference` or
+        not at all, and share the other filter parameters (`interfaces`,
+        `root`, `indexes`, `only_visible`, `allows`,...) the filters are
+        applied only once to the found references. Else every query is
+        searched with :meth:`search`.
+        """
+        if not self._can_search_many(queries):
+            return [self.search(query) for query in queries]
+        filter_query = self._get_filter_query(queries[0])
+        self.flush_reindex_queue(self._get_index_names(filter_query))
+        reference_index = self.get_index('reference')
+        oids_per_query = [self._get_reference_oids(reference_index, query)
+                          for query in queries]
+        all_oids = self.family.IF.TreeSet(chain(*oids_per_query))
+        filtered = self._filter_oids(all_oids, filter_query)
+        results = []
+        for query, oids in zip(queries, oids_per_query):
+            elements = [x for x in oids if x in filtered]
+            resolved = self._resolve(elements, query)
+            results.append(search_result._replace(elements=resolved,
+                                                  count=len(elements)))
+        return results
+
+    def _get_filter_query(self, query: SearchQuery) -> SearchQuery:
+        return query._replace(references=(), sort_by='')
+
+    def _can_search_many(self, queries: [SearchQuery]) -> bool:
+        if not queries or not self.values():
+            return False
+        filter_query = self._get_filter_query(queries[0])
+        for query in queries:
+            if len(query.references) != 1 \
+                    or query.sort_by not in ('', 'reference') \
+                    or query.reverse or query.limit or query.offset \
+                    or query.frequency_of or query.group_by \
+                    or self._get_filter_query(query) != filter_query:
+                return False
+        return True
+
+    def _get_reference_oids(self, index: IIndex, query: SearchQuery) -> [int]:
+        reference_query = query.references[0]
+        reference = self._get_query_value(reference_query)
+        if query.sort_by == 'reference':
+            return index.search_with_order(reference).ids
+        comparator = self._get_query_comparator(reference_query)
+        traverse = comparator == ReferenceComparator.traverse.value
+        return index.apply({'reference': reference, 'traverse': traverse})
+
+    def _filter_oids(self, oids: [int], query: SearchQuery) -> [int]:
+        """Filter `oids` with all index queries of `query`."""
+        indexes = self._combine_indexes(
+            query,
+            [self._get_path_index_query(query)],
+            [self._get_interfaces_index_query(query)],
+            self._get_indexes_index_query(query),
+            [self._get_private_visibility_index_query(query)],
+            [self._get_allowed_index_query(query)],)
+        for index_query in indexes:
+            if not oids:
+                break
+            oids = index_query.intersect(oids, None)
+        if query.only_visible:
+            elements = ResultSet(oids, len(oids), None)
+            oids = self._exclude_concealed_descendants(elements).ids
+        return oids
+
+    def _get_index_names(self, query: SearchQuery) -> [str]:
+        """Return the names of all indexes used by `query`."""
+        names = ['interfaces', 'path', 'reference', query.sort_by,
+                 query.frequency_of, query.group_by]
+        names.extend(query.indexes)
+        if query.only_visible:
+            names.append('private_visibility')
+        if query.allows:
+            names.append('allowed')
+        return [x for x in names if x]
+
     def _get_interfaces_index_query(self, query) -> Query:
         interfaces_value = self._get_query_value(query.interfaces)
         if not interfaces_value:
@@ -128,19 +363,23 @@ class CatalogsServiceAdhocracy(CatalogsService):
             return None
         allowed_index = self.get_index('allowed')
         principals, permission = query.allows
-        return allowed_index.allows(principals, permission)
+        comparator = allowed_index.allows(principals, permission)
+        return BulkAllowsComparator(allowed_index, comparator._value)
 
     def _combine_indexes(self, query, *list_of_indexes) -> [Query]:
         maybes_indexes = chain.from_iterable(list_of_indexes)
         indexes = [idx for idx in maybes_indexes if idx is not None]
         return indexes
 
-    def _execute_query(self, indexes) -> IResultSet:
+    def _execute_query(self, indexes, explain: dict=None) -> IResultSet:
         """Combine all query `indexes` with `&` and execute the query.
 
         If `indexes` is empty or it starts with a query from the `allows`
         index an empty result is returned. The allows index can only be used
         as a filter so you need a query that returns a search result first.
+
+        The order of the intersections is planned by
+        :func:`adhocracy_core.catalog.plan.execute_plan`.
         """
         has_indexes = len(indexes) > 0
         is_starting_with_allows = has_indexes and isinstance(indexes[0],
@@ -149,16 +388,78 @@ class CatalogsServiceAdhocracy(CatalogsService):
             index_query = indexes[0]
             for idx in indexes[1:]:
                 index_query &= idx
-            no_resolver = lambda x: x
-            elements = index_query.execute(resolver=no_resolver)
+            registry = get_current_registry()
+            cache = getattr(registry, 'query_plan_cache', None)
+            ids = execute_plan(split_query(index_query), self.family,
+                               cache=cache, explain=explain)
+            elements = ResultSet(ids, len(ids), lambda x: x)
         else:
             elements = ResultSet(set(), 0, None)
         return elements
 
-    def _search_elements(self, query) -> IResultSet:
+    def _search_elements(self, query, explain: dict=None) -> IResultSet:
         if not self.values():  # child catalogs/indexes are not created yet
             return ResultSet(set(), 0, None)
-        indexes = self._combine_indexes(
+        elements = self._execute_cached_query(query, explain=explain)
+        if query.only_visible:
+            start = perf_counter()
+            elements = self._exclude_concealed_descendants(elements)
+            if explain is not None:
+                explain['concealed_time'] = get_elapsed(start)
+        return elements
+
+    def _execute_cached_query(self, query,
+                              explain: dict=None) -> IResultSet:
+        """Execute the index queries, use the search result cache if possible.
+
+        The cache is enabled with the setting
+        `adhocracy.catalog.result_cache_size` (maximal number of cached
+        results), see :mod:`adhocracy_core.catalog.results`.
+        """
+        registry = get_current_registry()
+        cache = getattr(registry, 'search_result_cache', None)
+        key = None
+        if cache is not None:
+            key = self._get_result_cache_key(query)
+        count = None
+        if key is not None:
+            count = get_changes_count(query.root, registry,
+                                      self._get_changes_counters())
+        if count is None:
+            indexes = self._get_index_queries(query)
+            return self._execute_query(indexes, explain=explain)
+        cached = cache.get(key)
+        is_cached = cached is not None and cached[0] == count
+        if is_cached:
+            ids = cached[1]
+        else:
+            indexes = self._get_index_queries(query._replace(allows=()))
+            elements = self._execute_query(indexes, explain=explain)
+            ids = self.family.IF.Set(elements.ids)  # don't share index data
+            cache.set(key, (count, ids))
+        if explain is not None:
+            explain['result_cached'] = is_cached
+        if query.allows and ids:
+            allowed_query = self._get_allowed_index_query(query)
+            allowed_query.flush()
+            ids = allowed_query.intersect(ids, None)
+        return ResultSet(ids, len(ids), lambda x: x)
+
+    def _get_changes_counters(self) -> list:
+        """Return counters of the changes not tracked by the changelog."""
+        visibility_index = self.get_index('private_visibility')
+        return [get_allowed_changes(self.get_index('allowed')),
+                get_visibility_changes(visibility_index),
+                get_removals(self)]
+
+    def _get_result_cache_key(self, query: SearchQuery) -> SearchQuery:
+        deferred_names = _get_deferred_index_names()
+        if set(deferred_names) & set(self._get_index_names(query)):
+            return None  # deferred indexes are updated without changelog
+        return get_result_cache_key(query)
+
+    def _get_index_queries(self, query: SearchQuery) -> [Query]:
+        return self._combine_indexes(
             query,
             self._get_references_index_query(query),
             [self._get_path_index_query(query)],
@@ -166,46 +467,92 @@ class CatalogsServiceAdhocracy(CatalogsService):
             self._get_indexes_index_query(query),
             [self._get_private_visibility_index_query(query)],
             [self._get_allowed_index_query(query)],)
-        elements = self._execute_query(indexes)
-        return elements
+
+    def _exclude_concealed_descendants(self,
+                                       elements: IResultSet) -> IResultSet:
+        """Remove descendants of hidden or deleted resources.
+
+        The `private_visibility` index only stores the own state of every
+        resource, the concealed resources are the roots of invisible
+        subtrees. Their descendants are excluded by path, see
+        :mod:`adhocracy_core.catalog.visibility`.
+        """
+        if not elements:
+            return elements
+        family_if = self.family.IF
+        ids = elements.ids
+        if not isinstance(ids, (family_if.Set, family_if.TreeSet)):
+            ids = family_if.Set(ids)
+        visibility_index = self.get_index('private_visibility')
+        concealed = get_concealed_oids(visibility_index, oids=ids)
+        if not concealed:
+            return elements
+        ids = family_if.difference(ids, concealed)
+        return ResultSet(ids, len(ids), elements.resolver)
 
     def _get_frequency_of(self, elements: IResultSet,
                           query: SearchQuery) -> dict:
         frequency_of = {}
         if query.frequency_of:
             index = self.get_index(query.frequency_of)
-            for value in index.unique_values():
-                value_query = index.eq(value)
-                value_elements = value_query.execute(resolver=None)
-                intersect = elements.intersect(value_elements)
-                count = len(intersect)
-                if count == 0:
-                    continue
-                frequency_of[value] = count
+            for value, docids in self._get_facets(index, elements).items():
+                frequency_of[value] = len(docids)
         return frequency_of
 
     def _get_group_by(self, elements: IResultSet, query: SearchQuery) -> dict:
         group_by = {}
         if query.group_by:
             index = self.get_index(query.group_by)
-            for value in index.unique_values():
-                value_query = index.eq(value)
-                value_elements = value_query.execute(resolver=None)
-                intersect = elements.intersect(value_elements)
-                if len(intersect) == 0:
-                    continue
-                group_by[value] = intersect
+            for value, docids in self._get_facets(index, elements).items():
+                group_by[value] = ResultSet(docids, len(docids), None)
         sort_index = self.get_index(query.sort_by)
         if sort_index is not None and query.sort_by != 'reference':
             for key, intersect in group_by.items():
-                intersect_sorted = intersect.sort(sort_index,
-                                                  reverse=query.reverse,
-                                                  limit=query.limit or None)
-                group_by[key] = intersect_sorted
+                group_by[key] = self._sort_top(intersect, sort_index, query,
+                                               query.limit or None)
         for key, intersect in group_by.items():
             group_by[key] = self._resolve(intersect.all(), query)
         return group_by
 
+    def _get_facets(self, index: IIndex, elements: IResultSet) -> dict:
+        """Map the `index` values of `elements` to lists of docids.
+
+        Field and keyword indexes are faceted with one pass over the
+        docids of `elements` using the reverse (docid to value) map of
+        the index. If the result set is larger than the number of
+        distinct index values or the index has no reverse map we query
+        every index value instead.
+        """
+        rev_index = getattr(index, '_rev_index', None)
+        is_faceted_index = isinstance(index, (FieldIndex, KeywordIndex))
+        if not is_faceted_index or rev_index is None \
+                or len(elements) > index.word_count():
+            return self._get_facets_by_value_query(index, elements)
+        is_keyword = isinstance(index, KeywordIndex)
+        facets = defaultdict(list)
+        for docid in elements.ids:
+            value = rev_index.get(docid, _marker)
+            if value is _marker:
+                continue
+            if is_keyword:
+                for keyword in value:
+                    facets[keyword].append(docid)
+            else:
+                facets[value].append(docid)
+        return dict(facets)
+
+    def _get_facets_by_value_query(self, index: IIndex,
+                                   elements: IResultSet) -> dict:
+        facets = {}
+        for value in index.unique_values():
+            value_query = index.eq(value)
+            value_elements = value_query.execute(resolver=None)
+            intersect = elements.intersect(value_elements)
+            if len(intersect) == 0:
+                continue
+            facets[value] = intersect.ids
+        return facets
+
     def _sort_elements(self, elements: IResultSet,
                        query: SearchQuery) -> IResultSet:
         if query.sort_by == '':
@@ -222,16 +569,44 @@ class CatalogsServiceAdhocracy(CatalogsService):
             references_index = self.get_index('reference')
             elements_sorted = references_index.search_with_order(reference)
             elements = elements_sorted.intersect(elements)
+        elif query.cursor:
+            if not self._supports_cursor(query):
+                raise NotImplementedError()
+            sort_index = self.get_index(query.sort_by)
+            limit = query.offset + query.limit if query.limit else None
+            docids = scan_after_cursor(sort_index, elements.ids,
+                                       query.cursor, reverse=query.reverse,
+                                       limit=limit)
+            elements = ResultSet(docids, len(elements), elements.resolver)
         else:
             sort_index = self.get_index(query.sort_by)
             # TODO: We should assert the IIndexSort interface here, but
             # hypatia.field.FieldIndex is missing this interface.
             assert 'sort' in sort_index.__dir__()
-            elements = elements.sort(sort_index,
-                                     reverse=query.reverse,
-                                     limit=query.limit or None)
+            limit = query.offset + query.limit if query.limit else None
+            elements = self._sort_top(elements, sort_index, query, limit)
         return elements
 
+    def _sort_top(self, elements: IResultSet, sort_index: IIndex,
+                  query: SearchQuery, limit: int=None) -> IResultSet:
+        """Sort `elements`, but only the first `limit` if specified.
+
+        Field indexes are sorted with
+        :func:`adhocracy_core.catalog.sorting.sort_docids`.
+        """
+        if not isinstance(sort_index, FieldIndex):
+            return elements.sort(sort_index, reverse=query.reverse,
+                                 limit=limit)
+        docids = sort_docids(sort_index, elements.ids, reverse=query.reverse,
+                             limit=limit)
+        return ResultSet(docids, len(elements), elements.resolver)
+
+    def _supports_cursor(self, query: SearchQuery) -> bool:
+        if query.sort_by in ('', 'reference'):
+            return False
+        sort_index = self.get_index(query.sort_by)
+        return supports_cursor(sort_index)
+
     def _get_slice(self, elements: Iterable, query: IResultSet) -> Iterable:
         """Get slice defined by `query.limit` and `query.offset`.
 
@@ -319,3 +694,11 @@ def includeme(config):
     config.scan('.index')
     config.include('.adhocracy')
     config.include('.subscriber')
+    plan_cache_size = int(config.registry.settings.get(
+        'adhocracy.catalog.query_plan_cache_size', 1000))
+    if plan_cache_size > 0:
+        config.registry.query_plan_cache = LRUCache(plan_cache_size)
+    result_cache_size = int(config.registry.settings.get(
+        'adhocracy.catalog.result_cache_size', 100))
+    if result_cache_size > 0:
+        config.registry.search_result_cache = LRUCache(result_cache_size)
@@ -4,10 +4,9 @@ from pyramid.traversal import find_interface
 from substanced import catalog
 from substanced.catalog import IndexFactory
 from substanced.util import find_service
+from adhocracy_core.catalog.aggregate import get_aggregate
 from adhocracy_core.catalog.index import ReferenceIndex
 from adhocracy_core.exceptions import RuntimeConfigurationError
-from adhocracy_core.utils import is_deleted
-from adhocracy_core.utils import is_hidden
 from adhocracy_core.interfaces import IItem
 from adhocracy_core.interfaces import search_query
 from adhocracy_core.resources.comment import ICommentVersion
@@ -40,7 +39,7 @@ class AdhocracyCatalogIndexes:
     """
 
     tag = catalog.Keyword()
-    private_visibility = catalog.Keyword()  # visible / deleted / hidden
+    private_visibility = catalog.Keyword()  # own visible / deleted / hidden
     badge = catalog.Keyword()
     item_badge = catalog.Keyword()
     title = catalog.Field()
@@ -75,13 +74,15 @@ def index_visibility(resource, default) -> [str]:
 
     The return value will be one of [visible], [deleted], [hidden], or
     [deleted, hidden].
+
+    Only the own state of `resource` is indexed, so hiding or deleting
+    resources with many descendants does not need to reindex the whole
+    subtree. Descendants of concealed resources are excluded at search time.
     """
-    # FIXME: be more dry, this almost the same like what
-    # utils.get_reason_if_blocked is doing
     result = []
-    if is_deleted(resource):
+    if getattr(resource, 'deleted', False):
         result.append('deleted')
-    if is_hidden(resource):
+    if getattr(resource, 'hidden', False):
         result.append('hidden')
     if not result:
         result.append('visible')
@@ -104,8 +105,12 @@ def index_rates(resource, default) -> int:
     """
     Return aggregated values of referenceing :class:`IRate` resources.
 
-    Only the LAST version of each rate is counted.
+    Only the LAST version of each rate is counted. The stored
+    :class:`adhocracy_core.catalog.aggregate.Aggregate` is used if available.
     """
+    aggregate = get_aggregate(resource, 'rates')
+    if aggregate is not None:
+        return aggregate.sum
     catalogs = find_service(resource, 'catalogs')
     query = search_query._replace(interfaces=IRate,
                                   frequency_of='rate',
@@ -0,0 +1,175 @@
+"""Incrementally maintained aggregate values for catalog indexes.
+
+The `rates` index aggregates the values of other resources. Instead of
+searching the catalog every time the rated resource is reindexed the
+values are stored with the resource and updated by the subscribers in
+:mod:`adhocracy_core.catalog.subscriber`.
+
+The aggregate is added when a rateable is created. Rateables created
+before have no aggregate, the subscribers ignore them and the index
+falls back to the catalog search. Use the `repair_aggregates` script
+to add the missing aggregates.
+"""
+from BTrees.Length import Length
+from persistent import Persistent
+from pyramid.registry import Registry
+from pyramid.traversal import find_interface
+from substanced.util import find_service
+import BTrees
+
+from adhocracy_core.interfaces import IItem
+from adhocracy_core.interfaces import IResource
+from adhocracy_core.interfaces import search_query
+from adhocracy_core.sheets.rate import IRate
+from adhocracy_core.sheets.tags import ITags
+from adhocracy_core.utils import get_sheet_field
+
+
+class Aggregate(Persistent):
+    """Sum and count of integer values stored per resource oid.
+
+    The totals are stored with :class:`BTrees.Length.Length` to support
+    ZODB conflict resolution.
+    """
+
+    family = BTrees.family64
+
+    def __init__(self):
+        """Initialize self."""
+        self._values = self.family.IO.BTree()
+        self._sum = Length(0)
+        self._count = Length(0)
+
+    @property
+    def sum(self) -> int:
+        """Return the sum of all values."""
+        return self._sum()
+
+    @property
+    def count(self) -> int:
+        """Return the number of values."""
+        return self._count()
+
+    def set(self, oid: int, value: int):
+        """Set the `value` for resource `oid`."""
+        old_value = self._values.get(oid, None)
+        if old_value == value:
+            return
+        self._values[oid] = value
+        if old_value is None:
+            self._count.change(1)
+            old_value = 0
+        self._sum.change(value - old_value)
+
+    def remove(self, oid: int):
+        """Remove the value for resource `oid`, do nothing if missing."""
+        old_value = self._values.pop(oid, None)
+        if old_value is None:
+            return
+        self._count.change(-1)
+        self._sum.change(-old_value)
+
+    def items(self) -> dict:
+        """Return dictionary with resource oid as key and value."""
+        return dict(self._values.items())
+
+    def update(self, values: dict):
+        """Replace all values with `values`."""
+        for oid in list(self._values.keys()):
+            if oid not in values:
+                self.remove(oid)
+        for oid, value in values.items():
+            self.set(oid, value)
+
+
+def _get_attribute_name(name: str) -> str:
+    return '__{0}_aggregate__'.format(name)
+
+
+def get_aggregate(resource: IResource, name: str) -> Aggregate:
+    """Return the aggregate `name` stored with `resource` or None."""
+    return getattr(resource, _get_attribute_name(name), None)
+
+
+def compute_rates(resource: IResource) -> dict:
+    """Search the LAST rate versions referencing `resource`.
+
+    :returns: dictionary with rate version oid as key and rate as value.
+    """
+    catalogs = find_service(resource, 'catalogs')
+    if catalogs is None:  # ease testing
+        return {}
+    query = search_query._replace(interfaces=IRate,
+                                  indexes={'tag': 'LAST'},
+                                  references=[(None, IRate, 'object', resource)
+                                              ],
+                                  resolve=True,
+                                  )
+    rates = catalogs.search(query).elements
+    return {x.__oid__: get_sheet_field(x, IRate, 'rate') for x in rates}
+
+
+aggregate_computers = {'rates': compute_rates}
+"""Mapping aggregate name to function that recomputes the values."""
+
+
+def add_aggregate(resource: IResource, name: str) -> Aggregate:
+    """Add empty aggregate `name` to the new `resource`."""
+    aggregate = Aggregate()
+    setattr(resource, _get_attribute_name(name), aggregate)
+    return aggregate
+
+
+def _is_last_version(version: IResource, registry: Registry) -> bool:
+    item = find_interface(version, IItem)
+    if item is None:
+        return False
+    last = get_sheet_field(item, ITags, 'LAST', registry=registry)
+    return last is version
+
+
+def update_rates_aggregate(rate: IResource, registry: Registry) -> IResource:
+    """Add or remove `rate` in the aggregate of the rated resource.
+
+    Only the LAST version of each rate is counted. Rated resources without
+    aggregate are ignored.
+
+    :returns: the rated resource or None
+    """
+    rateable = get_sheet_field(rate, IRate, 'object', registry=registry)
+    if rateable is None:
+        return None
+    aggregate = get_aggregate(rateable, 'rates')
+    if aggregate is None:
+        return rateable
+    if _is_last_version(rate, registry):
+        value = get_sheet_field(rate, IRate, 'rate', registry=registry)
+        aggregate.set(rate.__oid__, value)
+    else:
+        aggregate.remove(rate.__oid__)
+    return rateable
+
+
+def remove_from_rates_aggregate(rate: IResource, rateable: IResource):
+    """Remove `rate` from the aggregate of `rateable`."""
+    aggregate = get_aggregate(rateable, 'rates')
+    if aggregate is not None:
+        aggregate.remove(rate.__oid__)
+
+
+def repair_aggregate(resource: IResource, name: str,
+                     dry_run=False) -> bool:
+    """Recompute aggregate `name` of `resource` from scratch.
+
+    :param dry_run: only verify the stored values, don't write.
+    :returns: True if the stored values were wrong or missing.
+    """
+    values = aggregate_computers[name](resource)
+    aggregate = get_aggregate(resource, name)
+    if aggregate is not None and aggregate.items() == values:
+        return False
+    if not dry_run:
+        if aggregate is None:
+            aggregate = add_aggregate(resource, name)
+        aggregate.update(values)
+    return True
@@ -0,0 +1,167 @@
+"""Bulk filtering with the `allowed` index.
+
+:class:`substanced.catalog.indexes.AllowsComparator` checks the ACLs stored
+in the objectmap for every oid to filter. For large result sets
+:class:`BulkAllowsComparator` intersects with the set of all allowed oids
+instead. This set is computed with the subtrees of the resources having an
+ACL and cached per database connection until an ACL is modified or a
+resource is moved.
+
+Adding or removing resources does not invalidate the cache. Removed oids
+are not indexed, so they are never filtered. Oids added after the
+computation are checked one by one when they are filtered for the first
+time and then added to the cached set, see :func:`get_allowed_oids`.
+"""
+from collections.abc import Iterable
+
+from BTrees.Length import Length
+from hypatia.interfaces import IIndex
+from substanced.catalog.indexes import AllowsComparator
+from substanced.util import find_objectmap
+from substanced.util import find_service
+from pyramid.security import Allow
+from pyramid.util import is_nonstr_iter
+
+from adhocracy_core.interfaces import IResource
+
+
+class BulkAllowsComparator(AllowsComparator):
+    """Comparator that intersects with the cached allowed oids.
+
+    Smaller sets than `min_size` are filtered oid by oid.
+    """
+
+    min_size = 100
+
+    def intersect(self, left, names):
+        """Return the oids in `left` that are allowed."""
+        try:
+            size = len(left)
+        except TypeError:
+            size = 0
+        if size < self.min_size:
+            return super().intersect(left, names)
+        principals, permission = self._value
+        family_if = self.family.IF
+        if not isinstance(left, (family_if.Set, family_if.TreeSet)):
+            left = family_if.Set(left)
+        allowed = get_allowed_oids(self.index, principals, permission,
+                                   oids=left)
+        return family_if.intersection(left, allowed)
+
+
+def get_changes(index: IIndex) -> Length:
+    """Return the changes counter of the `allowed` `index` or None."""
+    return getattr(index, '__allowed_changes__', None)
+
+
+def increment_changes(index: IIndex):
+    """Increment the changes counter of the `allowed` `index`."""
+    changes = get_changes(index)
+    if changes is None:
+        changes = Length(0)
+        index.__allowed_changes__ = changes
+    changes.change(1)
+
+
+def get_allowed_oids(index: IIndex, principals: list, permission: str,
+                     oids: Iterable=()) -> set:
+    """Return set with the oids of all resources `principals` may access.
+
+    The result is cached until :func:`increment_changes` is called.
+
+    :param oids: the oids to filter, oids added to the objectmap after the
+                 cached set was computed are checked and added to it.
+    """
+    objectmap = find_objectmap(index)
+    changes = get_changes(index)
+    if changes is None or changes._p_changed:
+        # no cache for changes not commited yet
+        return _compute_allowed_oids(objectmap, principals, permission)
+    counter, known, cache = getattr(index, '_v_allowed_oids',
+                                    (None, None, {}))
+    if counter != changes():
+        family_if = objectmap.family.IF
+        known = family_if.Set(objectmap.objectid_to_path.keys())
+        counter, cache = changes(), {}
+        index._v_allowed_oids = (counter, known, cache)
+    key = (frozenset(principals), permission)
+    if key not in cache:
+        if len(cache) >= 20:
+            cache.clear()
+        allowed = _compute_allowed_oids(objectmap, principals, permission)
+        cache[key] = (allowed, objectmap.family.IF.Set())
+    allowed, checked = cache[key]
+    new = [x for x in oids if x not in known and x not in checked]
+    if new:
+        checked.update(new)
+        allowed.update(objectmap.allowed(new, principals, permission))
+    return allowed
+
+
+def _compute_allowed_oids(objectmap, principals: list,
+                          permission: str) -> set:
+    """Combine the subtrees of all resources with ACL.
+
+    Parents are processed first, so the decision of a child ACL overrides
+    its parents.
+    """
+    family_if = objectmap.family.IF
+    allowed = family_if.Set()
+    decisions = {}
+    for path in sorted(objectmap.path_to_acl.keys(), key=len):
+        acl = objectmap.path_to_acl[path]
+        inherited = _get_parent_decision(decisions, path)
+        decision = _get_acl_decision(acl, principals, permission)
+        if decision is None:
+            decision = inherited
+        decisions[path] = decision
+        if decision == inherited:
+            continue  # the subtree is already added or removed
+        subtree = objectmap.pathlookup(path)
+        if decision:
+            allowed = family_if.union(allowed, subtree)
+        else:
+            allowed = family_if.difference(allowed, subtree)
+    return allowed
+
+
+def _get_acl_decision(acl: tuple, principals: list, permission: str) -> bool:
+    """Return True if allowed, False if denied or None if not decided."""
+    for ace_action, ace_principal, ace_permissions in acl:
+        if ace_principal not in principals:
+            continue
+        if not is_nonstr_iter(ace_permissions):
+            ace_permissions = [ace_permissions]
+        if permission in ace_permissions:
+            return ace_action == Allow
+    return None
+
+
+def _get_parent_decision(decisions: dict, path: tuple) -> bool:
+    for end in range(len(path) - 1, 0, -1):
+        decision = decisions.get(path[:end], None)
+        if decision is not None:
+            return decision
+    return False
+
+
+def _increment_changes_for(context: IResource):
+    catalogs = find_service(context, 'catalogs')
+    if not hasattr(catalogs, 'get_index'):  # ease testing
+        return
+    index = catalogs.get_index('allowed')
+    if index is not None:
+        increment_changes(index)
+
+
+def increment_changes_after_acl_modified(event, resource):
+    """Invalidate the cached allowed oids if an ACL is modified."""
+    _increment_changes_for(event.object)
+
+
+def increment_changes_after_moved(event, resource, parent):
+    """Invalidate the cached allowed oids if a resource is moved."""
+    if event.moving is None or event.moving is False:
+        return
+    _increment_changes_for(event.parent)
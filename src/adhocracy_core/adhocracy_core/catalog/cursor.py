@@ -0,0 +1,153 @@
+"""Cursor based (keyset) pagination for sorted search results.
+
+A cursor is an opaque string encoding the sort value and the docid of the
+last element of a result page. The next page is found by scanning the
+sort index starting at this position, so deep pages are as fast as the
+first one and do not shift if new elements are added.
+
+The elements are ordered by (sort value, docid), or both reversed if
+`reverse` is set. Only :class:`hypatia.field.FieldIndex` indexes are
+supported.
+"""
+from base64 import urlsafe_b64decode
+from base64 import urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from heapq import nlargest
+from heapq import nsmallest
+from json import dumps
+from json import loads
+
+from hypatia.field import FieldIndex
+from hypatia.interfaces import IIndex
+
+from adhocracy_core.catalog.sorting import SCAN_MIN_RATIO
+
+
+def supports_cursor(index: IIndex) -> bool:
+    """Return True if `index` can be used to paginate with cursors."""
+    return isinstance(index, FieldIndex)
+
+
+def encode_cursor(value: object, docid: int) -> str:
+    """Return cursor for the sort `value` and `docid` or empty string.
+
+    An empty string is returned if the type of `value` is not supported.
+    """
+    if isinstance(value, datetime):
+        offset = value.utcoffset()
+        offset = offset.total_seconds() if offset is not None else None
+        value = {'datetime': list(value.timetuple()[:6]) + [value.microsecond],
+                 'offset': offset}
+    elif not isinstance(value, (str, int, float)):
+        return ''
+    data = dumps([value, docid]).encode()
+    return urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor: str) -> (object, int):
+    """Return sort value and docid of `cursor`.
+
+    :raises ValueError: if the cursor is not valid
+    """
+    try:
+        value, docid = loads(urlsafe_b64decode(cursor.encode()).decode())
+        if isinstance(value, dict):
+            value = _decode_datetime(value)
+    except (BinasciiError, UnicodeError, TypeError, KeyError, ValueError):
+        raise ValueError('Invalid cursor: {}'.format(cursor))
+    if not isinstance(docid, int):
+        raise ValueError('Invalid cursor: {}'.format(cursor))
+    return value, docid
+
+
+def decode_index_cursor(index: IIndex, cursor: str) -> (object, int):
+    """Return sort value and docid of `cursor` to paginate the sort `index`.
+
+    :raises ValueError: if the cursor is not valid or its value cannot be
+                        compared with the values of `index`, e.g. a string
+                        for an integer index or a naive datetime for a
+                        timezone aware one.
+    """
+    value, docid = decode_cursor(cursor)
+    fwd_index = index._fwd_index
+    if fwd_index:
+        try:
+            value < fwd_index.minKey()
+        except TypeError:
+            raise ValueError('Invalid cursor value: {}'.format(cursor))
+    return value, docid
+
+
+def _decode_datetime(value: dict) -> datetime:
+    offset = value['offset']
+    tzinfo = None
+    if offset is not None:
+        tzinfo = timezone(timedelta(seconds=offset))
+    return datetime(*value['datetime'], tzinfo=tzinfo)
+
+
+def get_next_cursor(index: IIndex, docid: int) -> str:
+    """Return cursor to continue after `docid` or empty string."""
+    value = index._rev_index.get(docid, None)
+    if value is None:
+        return ''
+    return encode_cursor(value, docid)
+
+
+def scan_after_cursor(index: IIndex, docids, cursor: str,
+                      reverse=False, limit: int=None) -> iter:
+    """Iterate the sorted `docids` following the `cursor` position.
+
+    The sort index is scanned if `docids` is a large part of the index,
+    otherwise only `docids` are sorted, see
+    :data:`adhocracy_core.catalog.sorting.SCAN_MIN_RATIO`.
+
+    :param limit: maximal number of docids needed, used to sort only the
+                  first docids.
+    :raises ValueError: if the cursor is not valid
+    """
+    value, docid = decode_index_cursor(index, cursor)
+    family_if = index.family.IF
+    if not isinstance(docids, (family_if.Set, family_if.TreeSet)):
+        docids = family_if.Set(docids)
+    numdocs = index.indexed_count()
+    if len(docids) < numdocs * SCAN_MIN_RATIO:
+        return _sort(index, docids, value, docid, reverse, limit)
+    return _scan(index, docids, value, docid, reverse)
+
+
+def _scan(index: IIndex, docids, value: object, docid: int,
+          reverse: bool) -> iter:
+    fwd_index = index._fwd_index
+    if reverse:
+        values = reversed(fwd_index.keys(max=value))
+    else:
+        values = fwd_index.keys(min=value)
+    for current in values:
+        value_docids = fwd_index[current]
+        if reverse:
+            value_docids = reversed(value_docids.keys())
+        for candidate in value_docids:
+            if candidate not in docids:
+                continue
+            if current == value and (candidate >= docid if reverse
+                                     else candidate <= docid):
+                continue
+            yield candidate
+
+
+def _sort(index: IIndex, docids, value: object, docid: int, reverse: bool,
+          limit: int=None) -> iter:
+    rev_index = index._rev_index
+    position = (value, docid)
+    keys = ((rev_index[x], x) for x in docids if x in rev_index)
+    if reverse:
+        keys = [x for x in keys if x < position]
+        keys = nlargest(limit, keys) if limit else sorted(keys, reverse=True)
+    else:
+        keys = [x for x in keys if x > position]
+        keys = nsmallest(limit, keys) if limit else sorted(keys)
+    return (x for _, x in keys)
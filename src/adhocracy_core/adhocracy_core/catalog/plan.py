@@ -0,0 +1,110 @@
+"""Plan and explain the execution of search index queries.
+
+A search intersects the results of several index queries (`reference`,
+`path`, `interfaces`, custom `indexes`, `private_visibility`, `allowed`).
+The intersection is cheapest if it starts with the smallest result and
+stops as soon as the result is empty. So the queries are ordered by the
+result sizes measured for the last search with the same query shape, the
+index names and comparators without the query values. These plans are
+cached per process with :class:`adhocracy_core.utils.LRUCache`.
+
+Queries of the `allowed` index are filters only and always applied last.
+"""
+from time import perf_counter
+
+from hypatia.query import And
+from hypatia.query import Query
+from substanced.catalog.indexes import AllowsComparator
+from substanced.stats import statsd_timer
+
+
+def split_query(query: Query) -> [Query]:
+    """Return the optimized subqueries of the `query` combined with `&`."""
+    query = query._optimize()
+    if isinstance(query, And):
+        return list(query.queries)
+    return [query]
+
+
+def get_query_shape(queries: [Query]) -> tuple:
+    """Return the index names and comparators of `queries`."""
+    return tuple((_get_index_name(x), type(x).__name__) for x in queries)
+
+
+def _get_index_name(query: Query) -> str:
+    index = getattr(query, 'index', None)
+    return getattr(index, '__name__', '')
+
+
+def execute_plan(queries: [Query], family, cache=None,
+                 explain: dict=None) -> object:
+    """Return the intersection of the results of all index `queries`.
+
+    :param family: BTrees family of the indexes
+    :param cache: :class:`adhocracy_core.utils.LRUCache` to store
+                  the query order, no plans are cached if None
+    :param explain: dictionary to add the key `plan_cached` and the key
+                    `queries` with a list of `index`, `comparator`, `size`
+                    (result size of the query itself, None for filters),
+                    `result` (size after the intersection) and `time` (ms)
+                    of every executed query.
+    """
+    for query in queries:
+        query.flush()  # index pending actions of the current transaction
+    filters = [x for x in queries if isinstance(x, AllowsComparator)]
+    queries = [x for x in queries if not isinstance(x, AllowsComparator)]
+    shape = get_query_shape(queries)
+    order = cache.get(shape) if cache is not None else None
+    if explain is not None:
+        explain['plan_cached'] = order is not None
+        explain['queries'] = []
+    if order is None:
+        order = range(len(queries))
+    family_if = family.IF
+    result = None
+    sizes = {}
+    for position in order:
+        query = queries[position]
+        if result is not None and not len(result):
+            break
+        start = perf_counter()
+        with statsd_timer(_get_metric(query), rate=.1):
+            applied = query._apply(None)
+            sizes[position] = len(applied)
+            if result is None:
+                result = applied
+            elif sizes[position]:
+                _, result = family_if.weightedIntersection(result, applied)
+            else:
+                result = family_if.Set()
+        _add_explain(explain, query, sizes[position], len(result), start)
+    if cache is not None and len(sizes) == len(queries):
+        cache.set(shape, tuple(sorted(sizes, key=sizes.get)))
+    for query in filters:
+        if result is None or not len(result):
+            break
+        start = perf_counter()
+        with statsd_timer(_get_metric(query), rate=.1):
+            result = query.intersect(result, None)
+        _add_explain(explain, query, None, len(result), start)
+    return result if result is not None else family_if.Set()
+
+
+def _get_metric(query: Query) -> str:
+    return 'catalog.query.' + _get_index_name(query)
+
+
+def _add_explain(explain: dict, query: Query, size: int, result_size: int,
+                 start: float):
+    if explain is None:
+        return
+    explain['queries'].append({'index': _get_index_name(query),
+                               'comparator': type(query).__name__,
+                               'size': size,
+                               'result': result_size,
+                               'time': get_elapsed(start)})
+
+
+def get_elapsed(start: float) -> float:
+    """Return milliseconds since `start` (:func:`time.perf_counter`)."""
+    return round((perf_counter() - start) * 1000, 3)
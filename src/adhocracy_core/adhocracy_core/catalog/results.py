@@ -0,0 +1,113 @@
+"""Cache the docids found for hot search queries.
+
+The same list-view queries are searched again and again by many users. The
+docids found for a query are cached per process with
+:class:`adhocracy_core.utils.LRUCache`, keyed by the query without
+the principal filter (`allows`) and the parameters only used to present the
+result (sorting, pagination, facets). The principal filter and the
+exclusion of concealed descendants (`only_visible`) are applied to the
+cached docids afterwards, they may change without changing the `root`.
+
+A cached result is valid as long as the `__changed_descendants_counter__`
+of the query `root` is not changed. The counter is incremented by the
+changelog if a descendant is created, modified or its back references
+change, see :mod:`adhocracy_core.changelog.subscriber`. Cached results are
+also invalidated if an ACL or the visibility of a resource is changed,
+see :mod:`adhocracy_core.catalog.allowed` and
+:mod:`adhocracy_core.catalog.visibility`, or if a resource is removed. The
+changelog does not track removals, so they are counted by the catalogs
+service, see :func:`increment_removals_after_removed`. Queries with
+`references` are not cached, their result may depend on resources outside
+the `root`. Neither are queries using indexes listed in the setting
+`adhocracy.catalog.deferred_indexes`, these are updated without changelog.
+"""
+from BTrees.Length import Length
+from pyramid.registry import Registry
+from pyramid.traversal import resource_path
+from substanced.util import find_service
+from substanced.util import get_oid
+
+from adhocracy_core.interfaces import IResource
+from adhocracy_core.interfaces import SearchQuery
+
+
+def get_result_cache_key(query: SearchQuery) -> SearchQuery:
+    """Return the normalized `query` to cache its result or None."""
+    if query.references or query.root is None:
+        return None
+    oid = get_oid(query.root, None)
+    if oid is None:
+        return None
+    try:
+        key = query._replace(interfaces=_freeze(query.interfaces),
+                             indexes=_freeze(query.indexes),
+                             root=oid,
+                             allows=(),
+                             resolve=False,
+                             sort_by='',
+                             reverse=False,
+                             limit=0,
+                             offset=0,
+                             cursor='',
+                             frequency_of='',
+                             group_by='',
+                             explain=False)
+        hash(key)
+    except TypeError:  # values not hashable or resources
+        return None
+    return key
+
+
+def _freeze(value: object) -> object:
+    if IResource.providedBy(value):
+        raise TypeError('Resources are not cached: {}'.format(value))
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(x) for x in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def get_changes_count(root: IResource, registry: Registry,
+                      counters: [Length]=()) -> tuple:
+    """Return the changed descendants counter value of `root` and the
+    values of `counters` or None.
+
+    None is returned if the root counter is missing, not updated by the
+    changelog or descendants are changed in the current transaction, then
+    cached results cannot be used.
+
+    :param counters: additional changes counters, missing ones (None)
+                     count as 0.
+    """
+    counter = getattr(root, '__changed_descendants_counter__', None)
+    changelog = getattr(registry, 'changelog', None)
+    if counter is None or changelog is None:
+        return None
+    if counter._p_changed or resource_path(root) in changelog:
+        return None
+    counts = [counter()]
+    for other in counters:
+        if other is not None and other._p_changed:
+            return None
+        counts.append(other() if other is not None else 0)
+    return tuple(counts)
+
+
+def get_removals(catalogs: IResource) -> Length:
+    """Return the removed resources counter of `catalogs` or None."""
+    return getattr(catalogs, '__removals__', None)
+
+
+def increment_removals_after_removed(event, resource, parent):
+    """Invalidate the cached search results if a resource is removed."""
+    catalogs = find_service(parent, 'catalogs')
+    if catalogs is None:
+        return
+    removals = get_removals(catalogs)
+    if removals is None:
+        removals = Length(0)
+        catalogs.__removals__ = removals
+    removals.change(1)
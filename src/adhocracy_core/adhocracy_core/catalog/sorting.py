@@ -0,0 +1,82 @@
+"""Sort limited search results, scan the sort index in reverse order.
+
+:meth:`hypatia.field.FieldIndex.sort` chooses the sort algorithm itself
+(forward scan, nbest or timsort). For descending order it never scans the
+index, so :func:`sort_docids` scans it in reverse if `limit` is set and the
+result set is a large part of the index, see :data:`SCAN_MIN_RATIO`.
+
+Only :class:`hypatia.field.FieldIndex` indexes are supported.
+"""
+from itertools import islice
+
+from hypatia.exc import Unsortable
+from hypatia.interfaces import IIndex
+
+
+SCAN = 'scan'
+
+SCAN_MIN_RATIO = 0.25
+"""Minimal ratio result size / indexed documents to scan the index."""
+
+
+def sort_docids(index: IIndex, docids, reverse=False, limit: int=None,
+                sort_type: str=None) -> iter:
+    """Return the `limit` first `docids` sorted by the `index` values.
+
+    Elements with the same value are ordered by docid (reversed if
+    `reverse` is set) for all algorithms, like the pages following a
+    cursor, see :func:`adhocracy_core.catalog.cursor.scan_after_cursor`.
+
+    :param sort_type: :data:`SCAN` or a hypatia sort type, default is
+                      :data:`SCAN` to get the first elements of large
+                      reversed results, else chosen by the `index`.
+    :raises hypatia.exc.Unsortable: if docids are missing in the `index`
+    """
+    family_if = index.family.IF
+    if not isinstance(docids, (family_if.Set, family_if.TreeSet)):
+        docids = family_if.Set(docids)
+    if sort_type is None and reverse and _reverse_scan_wins(index, docids,
+                                                            limit):
+        sort_type = SCAN
+    if sort_type == SCAN:
+        return islice(scan_index(index, docids, reverse=reverse), limit)
+    if reverse:
+        # timsort is stable, order equal values by docid like the scan
+        docids = list(docids)[::-1]
+    return index.sort(docids, reverse=reverse, limit=limit,
+                      sort_type=sort_type)
+
+
+def _reverse_scan_wins(index: IIndex, docids, limit: int=None) -> bool:
+    if not limit or limit >= len(docids):
+        return False
+    numdocs = index.indexed_count()
+    return numdocs > 0 and len(docids) / numdocs >= SCAN_MIN_RATIO
+
+
+def scan_index(index: IIndex, docids, reverse=False) -> iter:
+    """Iterate `docids` in the order of the `index` values.
+
+    Elements with the same value are ordered by docid (reversed if
+    `reverse` is set).
+
+    :raises hypatia.exc.Unsortable: if docids are missing in the `index`,
+                                    after all other docids are iterated
+    """
+    family_if = index.family.IF
+    if not isinstance(docids, (family_if.Set, family_if.TreeSet)):
+        docids = family_if.Set(docids)
+    found_count = 0
+    values = index._fwd_index.values()
+    if reverse:
+        values = reversed(values)
+    for value_docids in values:
+        if reverse:
+            value_docids = reversed(value_docids.keys())
+        for docid in value_docids:
+            if docid in docids:
+                found_count += 1
+                yield docid
+    if found_count < len(docids):
+        rev_index = index._rev_index
+        raise Unsortable([x for x in docids if x not in rev_index])
@@ -3,55 +3,99 @@
 Read :mod:`substanced.catalog.subscribers` for default reindex subscribers.
 """
 
+from substanced.interfaces import IACLModified
+from substanced.interfaces import IObjectAdded
+from substanced.interfaces import IObjectWillBeRemoved
 from substanced.util import find_service
-
+from zope.interface import Interface
+
+from adhocracy_core.catalog.allowed import \
+    increment_changes_after_acl_modified
+from adhocracy_core.catalog.allowed import increment_changes_after_moved
+from adhocracy_core.catalog.visibility import \
+    increment_changes_after_visibility_changed
+from adhocracy_core.catalog.visibility import \
+    increment_changes_after_moved as increment_visibility_changes_after_moved
+from adhocracy_core.catalog.results import increment_removals_after_removed
+from adhocracy_core.catalog.aggregate import add_aggregate
+from adhocracy_core.catalog.aggregate import remove_from_rates_aggregate
+from adhocracy_core.catalog.aggregate import update_rates_aggregate
 from adhocracy_core.utils import get_visibility_change
 from adhocracy_core.interfaces import VisibilityChange
-from adhocracy_core.interfaces import IResource
 from adhocracy_core.interfaces import IResourceSheetModified
 from adhocracy_core.interfaces import ISheetBackReferenceModified
+from adhocracy_core.interfaces import ISheetBackReferenceRemoved
 from adhocracy_core.interfaces import IResourceCreatedAndAdded
 from adhocracy_core.interfaces import IItem
 from adhocracy_core.sheets.metadata import IMetadata
 from adhocracy_core.sheets.versions import IVersionable
+from adhocracy_core.sheets.rate import IRate
 from adhocracy_core.sheets.rate import IRateable
+from adhocracy_core.sheets.tags import ITags
 from adhocracy_core.sheets.badge import IBadgeAssignment
 from adhocracy_core.sheets.badge import IBadgeable
 from adhocracy_core.sheets.principal import IUserBasic
 from adhocracy_core.sheets.principal import IUserExtended
 from adhocracy_core.sheets.workflow import IWorkflowAssignment
-from adhocracy_core.utils import list_resource_with_descendants
 from adhocracy_core.utils import get_sheet_field
 
 
 def reindex_tag(event):
     """Reindex tag index if a tag backreference is modified."""
     catalogs = find_service(event.object, 'catalogs')
-    catalogs.reindex_index(event.object, 'tag')
+    catalogs.queue_reindex_index(event.object, 'tag')
 
 
 def reindex_rates(event):
     """Reindex the rates index if a rate backreference is modified."""
     catalogs = find_service(event.object, 'catalogs')
-    catalogs.reindex_index(event.object, 'rates')
+    catalogs.queue_reindex_index(event.object, 'rates')
+
+
+def aggregate_rates(event):
+    """Update the rates aggregate if a rate backreference is modified."""
+    rate = event.reference.source
+    if not IRate.providedBy(rate):
+        return
+    if ISheetBackReferenceRemoved.providedBy(event):
+        remove_from_rates_aggregate(rate, event.object)
+    else:
+        update_rates_aggregate(rate, event.registry)
+
+
+def aggregate_rates_after_tag_change(event):
+    """Update the rates aggregate if the LAST tag of a rate is modified."""
+    if not event.reference.isheet.isOrExtends(ITags):
+        return
+    rateable = update_rates_aggregate(event.object, event.registry)
+    if rateable is None:
+        return
+    catalogs = find_service(rateable, 'catalogs')
+    catalogs.queue_reindex_index(rateable, 'rates')
+
+
+def add_rates_aggregate(event):
+    """Add the empty rates aggregate if a rateable is created."""
+    add_aggregate(event.object, 'rates')
 
 
 def reindex_user_name(event):
     """Reindex indexes `user_name`."""
     catalogs = find_service(event.object, 'catalogs')
-    catalogs.reindex_index(event.object, 'user_name')
+    catalogs.queue_reindex_index(event.object, 'user_name')
 
 
 def reindex_user_email(event):
     """Reindex indexes `private_user_email`."""
     catalogs = find_service(event.object, 'catalogs')
-    catalogs.reindex_index(event.object, 'private_user_email')
+    catalogs.queue_reindex_index(event.object, 'private_user_email')
 
 
 def reindex_user_activation_path(event):
     """Reindex indexes `private_user_activation_path`."""
     catalogs = find_service(event.object, 'catalogs')
-    catalogs.reindex_index(event.object, 'private_user_activation_path')
+    catalogs.queue_reindex_index(event.object,
+                                 'private_user_activation_path')
 
 
 def reindex_badge(event):
@@ -62,23 +106,21 @@ def reindex_badge(event):
     catalogs = find_service(event.object, 'catalogs')
     badgeable = get_sheet_field(event.object, IBadgeAssignment, 'object',
                                 registry=event.registry)
-    catalogs.reindex_index(badgeable, 'badge')
+    catalogs.queue_reindex_index(badgeable, 'badge')
 
 
 def reindex_visibility(event):
-    """Reindex the private_visibility index for all descendants if modified."""
+    """Reindex the private_visibility index if modified.
+
+    Descendants are not reindexed, the visibility is inherited at search
+    time, see :meth:`adhocracy_core.catalog.CatalogsServiceAdhocracy.search`.
+    """
     visibility = get_visibility_change(event)
     if visibility in (VisibilityChange.concealed, VisibilityChange.revealed):
-        _reindex_resource_and_descendants(event.object)
-
-
-def _reindex_resource_and_descendants(resource: IResource):
-    catalogs = find_service(resource, 'catalogs')
-    if catalogs is None:  # ease testing
-        return
-    resource_and_descendants = list_resource_with_descendants(resource)
-    for res in resource_and_descendants:
-        catalogs.reindex_index(res, 'private_visibility')
+        catalogs = find_service(event.object, 'catalogs')
+        if catalogs is None:  # ease testing
+            return
+        catalogs.queue_reindex_index(event.object, 'private_visibility')
 
 
 def reindex_item_badge(event):
@@ -87,17 +129,17 @@ def reindex_item_badge(event):
     children = event.object.values()
     versionables = (c for c in children if IVersionable.providedBy(c))
     for versionable in versionables:
-        catalogs.reindex_index(versionable, 'item_badge')
+        catalogs.queue_reindex_index(versionable, 'item_badge')
 
 
 def reindex_workflow_state(event):
     """Reindex the workflow_state index for item and its versions."""
     catalogs = find_service(event.object, 'catalogs')
-    catalogs.reindex_index(event.object, 'workflow_state')
+    catalogs.queue_reindex_index(event.object, 'workflow_state')
     children = event.object.values()
     versionables = (c for c in children if IVersionable.providedBy(c))
     for versionable in versionables:
-        catalogs.reindex_index(versionable, 'workflow_state')
+        catalogs.queue_reindex_index(versionable, 'workflow_state')
 
 
 def includeme(config):
@@ -108,9 +150,19 @@ def includeme(config):
     config.add_subscriber(reindex_visibility,
                           IResourceSheetModified,
                           event_isheet=IMetadata)
+    config.add_subscriber(aggregate_rates,
+                          ISheetBackReferenceModified,
+                          event_isheet=IRateable)
     config.add_subscriber(reindex_rates,
                           ISheetBackReferenceModified,
                           event_isheet=IRateable)
+    config.add_subscriber(aggregate_rates_after_tag_change,
+                          ISheetBackReferenceModified,
+                          object_iface=IRate,
+                          event_isheet=IVersionable)
+    config.add_subscriber(add_rates_aggregate,
+                          IResourceCreatedAndAdded,
+                          object_iface=IRateable)
     config.add_subscriber(reindex_badge,
                           IResourceSheetModified,
                           event_isheet=IBadgeAssignment)
@@ -135,3 +187,16 @@ def includeme(config):
                           event_isheet=IUserBasic)
     # add subscriber to updated allowed index
     config.scan('substanced.objectmap.subscribers')
+    config.add_subscriber(increment_changes_after_acl_modified,
+                          [IACLModified, Interface])
+    config.add_subscriber(increment_changes_after_moved,
+                          [IObjectAdded, Interface, Interface])
+    # add subscriber to invalidate cached concealed descendants
+    config.add_subscriber(increment_changes_after_visibility_changed,
+                          IResourceSheetModified,
+                          event_isheet=IMetadata)
+    config.add_subscriber(increment_visibility_changes_after_moved,
+                          [IObjectAdded, Interface, Interface])
+    # add subscriber to invalidate cached search results
+    config.add_subscriber(increment_removals_after_removed,
+                          [IObjectWillBeRemoved, Interface, Interface])
@@ -92,6 +92,13 @@ def test_index_visibility_deleted(context):
     assert index_visibility(context, 'default') == ['deleted']
 
 
+def test_index_visibility_ignore_hidden_parent(context):
+    from .adhocracy import index_visibility
+    context.hidden = True
+    context['child'] = testing.DummyResource()
+    assert index_visibility(context['child'], 'default') == ['visible']
+
+
 def test_index_visibility_hidden(context):
     from .adhocracy import index_visibility
     context.hidden = True
@@ -173,6 +180,16 @@ class TestIndexRate:
         item['rateable'] = dummy_rateable
         assert index_rates(item['rateable'], None) == 0
 
+    def test_index_rates_with_aggregate(self, item, mock_catalogs):
+        from .adhocracy import index_rates
+        from .aggregate import Aggregate
+        item['rateable'] = testing.DummyResource()
+        item['rateable'].__rates_aggregate__ = Aggregate()
+        item['rateable'].__rates_aggregate__.set(1, 1)
+        item['rateable'].__rates_aggregate__.set(2, 1)
+        assert index_rates(item['rateable'], None) == 2
+        assert not mock_catalogs.search.called
+
 
 class TestIndexComments:
 
@@ -0,0 +1,169 @@
+from pytest import fixture
+from pytest import mark
+
+
+class TestAggregate:
+
+    @fixture
+    def inst(self):
+        from .aggregate import Aggregate
+        return Aggregate()
+
+    def test_create(self, inst):
+        from persistent import Persistent
+        assert isinstance(inst, Persistent)
+        assert inst.sum == 0
+        assert inst.count == 0
+        assert inst.items() == {}
+
+    def test_set(self, inst):
+        inst.set(1, 1)
+        inst.set(2, -1)
+        inst.set(3, 1)
+        assert inst.sum == 1
+        assert inst.count == 3
+        assert inst.items() == {1: 1, 2: -1, 3: 1}
+
+    def test_set_twice(self, inst):
+        inst.set(1, 1)
+        inst.set(1, 1)
+        assert inst.sum == 1
+        assert inst.count == 1
+
+    def test_set_change_value(self, inst):
+        inst.set(1, 1)
+        inst.set(1, -1)
+        assert inst.sum == -1
+        assert inst.count == 1
+
+    def test_remove(self, inst):
+        inst.set(1, 1)
+        inst.set(2, 1)
+        inst.remove(1)
+        assert inst.sum == 1
+        assert inst.count == 1
+
+    def test_remove_ignore_if_missing(self, inst):
+        inst.remove(1)
+        assert inst.sum == 0
+        assert inst.count == 0
+
+    def test_update(self, inst):
+        inst.set(1, 1)
+        inst.set(2, 1)
+        inst.update({2: -1, 3: 1})
+        assert inst.items() == {2: -1, 3: 1}
+        assert inst.sum == 0
+        assert inst.count == 2
+
+
+def test_get_aggregate_none(context):
+    from .aggregate import get_aggregate
+    assert get_aggregate(context, 'rates') is None
+
+
+@mark.usefixtures('integration')
+class TestAggregates:
+
+    @fixture
+    def pool(self, pool_with_catalogs):
+        return pool_with_catalogs
+
+    @fixture
+    def document_item(self, pool, registry):
+        from adhocracy_core.resources.document import IDocument
+        return registry.content.create(IDocument.__identifier__,
+                                       parent=pool)
+
+    @fixture
+    def document(self, document_item):
+        return self._get_first_version(document_item)
+
+    def _get_first_version(self, item):
+        from adhocracy_core.utils import get_sheet_field
+        from adhocracy_core.sheets.tags import ITags
+        return get_sheet_field(item, ITags, 'FIRST')
+
+    def _make_rate(self, registry, item, rateable, rate, follows):
+        from adhocracy_core.resources.rate import IRateVersion
+        from adhocracy_core.sheets.rate import IRate
+        from adhocracy_core.sheets.versions import IVersionable
+        appstructs = {IRate.__identifier__: {'object': rateable,
+                                             'rate': rate},
+                      IVersionable.__identifier__: {'follows': [follows]},
+                      }
+        return registry.content.create(IRateVersion.__identifier__,
+                                       parent=item,
+                                       appstructs=appstructs)
+
+    def test_rates_aggregate_added_to_new_rateable(self, document):
+        from .aggregate import get_aggregate
+        assert get_aggregate(document, 'rates').items() == {}
+
+    def test_rates_count_last_versions(self, registry, document_item,
+                                       document):
+        from adhocracy_core.resources.rate import IRate
+        from .aggregate import get_aggregate
+        rate_item = registry.content.create(IRate.__identifier__,
+                                            parent=document_item['rates'])
+        rate_v0 = self._get_first_version(rate_item)
+        rate_v1 = self._make_rate(registry, rate_item, document, 1, rate_v0)
+        aggregate = get_aggregate(document, 'rates')
+        assert aggregate.items() == {rate_v1.__oid__: 1}
+        rate_v2 = self._make_rate(registry, rate_item, document, -1, rate_v1)
+        assert aggregate.items() == {rate_v2.__oid__: -1}
+        assert aggregate.sum == -1
+
+    def test_rates_reindex_rates(self, registry, pool, document_item,
+                                 document):
+        from adhocracy_core.resources.rate import IRate
+        from substanced.interfaces import MODE_IMMEDIATE
+        pool['catalogs']['adhocracy']['rates'].action_mode = MODE_IMMEDIATE
+        rate_item = registry.content.create(IRate.__identifier__,
+                                            parent=document_item['rates'])
+        rate_v0 = self._get_first_version(rate_item)
+        self._make_rate(registry, rate_item, document, 1, rate_v0)
+        pool['catalogs'].flush_reindex_queue()
+        rates_index = pool['catalogs']['adhocracy']['rates']
+        assert rates_index.document_repr(document.__oid__) == '1'
+
+    def test_rates_ignore_rateable_without_aggregate(self, registry,
+                                                     document_item, document):
+        from adhocracy_core.resources.rate import IRate
+        from .aggregate import get_aggregate
+        del document.__rates_aggregate__
+        rate_item = registry.content.create(IRate.__identifier__,
+                                            parent=document_item['rates'])
+        rate_v0 = self._get_first_version(rate_item)
+        self._make_rate(registry, rate_item, document, 1, rate_v0)
+        assert get_aggregate(document, 'rates') is None
+
+    def test_repair_aggregate_missing(self, document):
+        from .aggregate import get_aggregate
+        from .aggregate import repair_aggregate
+        del document.__rates_aggregate__
+        assert repair_aggregate(document, 'rates')
+        assert get_aggregate(document, 'rates').items() == {}
+
+    def test_repair_aggregate_wrong(self, document):
+        from .aggregate import Aggregate
+        from .aggregate import get_aggregate
+        from .aggregate import repair_aggregate
+        document.__rates_aggregate__ = Aggregate()
+        document.__rates_aggregate__.set(1, 1)
+        assert repair_aggregate(document, 'rates')
+        assert get_aggregate(document, 'rates').items() == {}
+
+    def test_repair_aggregate_valid(self, document):
+        from .aggregate import Aggregate
+        from .aggregate import repair_aggregate
+        document.__rates_aggregate__ = Aggregate()
+        assert not repair_aggregate(document, 'rates')
+
+    def test_repair_aggregate_dry_run(self, document):
+        from .aggregate import get_aggregate
+        from .aggregate import repair_aggregate
+        del document.__rates_aggregate__
+        assert repair_aggregate(document, 'rates', dry_run=True)
+        assert get_aggregate(document, 'rates') is None
+
@@ -0,0 +1,126 @@
+from pyramid.security import Allow
+from pyramid.security import Deny
+from pytest import fixture
+from pytest import mark
+
+
+@mark.usefixtures('integration')
+class TestAllowed:
+
+    @fixture
+    def pool(self, pool_with_catalogs):
+        return pool_with_catalogs
+
+    @fixture
+    def index(self, pool):
+        return pool['catalogs']['system']['allowed']
+
+    @fixture
+    def objectmap(self, pool):
+        from substanced.util import find_objectmap
+        return find_objectmap(pool)
+
+    def _create(self, registry, parent, name):
+        from adhocracy_core.resources.pool import IBasicPool
+        from adhocracy_core.sheets.name import IName
+        return registry.content.create(
+            IBasicPool.__identifier__, parent=parent,
+            appstructs={IName.__identifier__: {'name': name}})
+
+    @fixture
+    def tree(self, registry, pool):
+        from adhocracy_core.authorization import set_acl
+        child = self._create(registry, pool, 'child')
+        grandchild = self._create(registry, child, 'grandchild')
+        self._create(registry, grandchild, 'greatgrandchild')
+        child2 = self._create(registry, pool, 'child2')
+        set_acl(pool, [(Allow, 'principal', 'view')], registry=registry)
+        set_acl(child, [(Deny, 'principal', 'view')], registry=registry)
+        set_acl(grandchild, [(Allow, 'other', 'view')], registry=registry)
+        set_acl(child2, [(Allow, 'other', 'edit')], registry=registry)
+        return pool
+
+    def _get_all_oids(self, objectmap, pool):
+        return objectmap.pathlookup(pool)
+
+    def test_get_allowed_oids_equals_objectmap_allowed(self, tree, index,
+                                                       objectmap):
+        from .allowed import get_allowed_oids
+        oids = self._get_all_oids(objectmap, tree)
+        for principals in [['principal'], ['other'], ['principal', 'other'],
+                           []]:
+            for permission in ['view', 'edit']:
+                expected = set(objectmap.allowed(oids, principals,
+                                                 permission))
+                result = get_allowed_oids(index, principals, permission)
+                assert set(result) == expected
+
+    def test_get_allowed_oids_cached(self, tree, index):
+        from .allowed import get_allowed_oids
+        result = get_allowed_oids(index, ['principal'], 'view')
+        assert get_allowed_oids(index, ['principal'], 'view') is result
+
+    def test_get_allowed_oids_not_cached_after_change(self, tree, index):
+        from .allowed import get_allowed_oids
+        from .allowed import increment_changes
+        result = get_allowed_oids(index, ['principal'], 'view')
+        increment_changes(index)
+        assert get_allowed_oids(index, ['principal'], 'view') is not result
+
+    def test_set_acl_increments_changes(self, tree, index, registry):
+        from adhocracy_core.authorization import set_acl
+        changes = index.__allowed_changes__()
+        set_acl(tree, [(Allow, 'principal', 'edit')], registry=registry)
+        assert index.__allowed_changes__() == changes + 1
+
+    def test_add_resource_does_not_increment_changes(self, tree, index,
+                                                     registry):
+        changes = index.__allowed_changes__()
+        self._create(registry, tree, 'child3')
+        assert index.__allowed_changes__() == changes
+
+    def test_get_allowed_oids_add_new_oids(self, tree, index, registry,
+                                           objectmap):
+        from .allowed import get_allowed_oids
+        result = get_allowed_oids(index, ['principal'], 'view')
+        allowed = self._create(registry, tree, 'child3')
+        denied = self._create(registry, tree['child'], 'child4')
+        oids = [allowed.__oid__, denied.__oid__]
+        assert get_allowed_oids(index, ['principal'], 'view', oids=oids)\
+            is result
+        assert allowed.__oid__ in result
+        assert denied.__oid__ not in result
+
+    def test_get_allowed_oids_equals_objectmap_allowed_after_add(
+            self, tree, index, registry, objectmap):
+        from .allowed import get_allowed_oids
+        get_allowed_oids(index, ['principal'], 'view')
+        self._create(registry, tree, 'child3')
+        self._create(registry, tree['child'], 'child4')
+        oids = self._get_all_oids(objectmap, tree)
+        expected = set(objectmap.allowed(oids, ['principal'], 'view'))
+        result = get_allowed_oids(index, ['principal'], 'view', oids=oids)
+        assert set(result) == expected
+
+    def test_move_resource_increments_changes(self, tree, index, registry):
+        changes = index.__allowed_changes__()
+        tree.move('child2', tree['child'])
+        assert index.__allowed_changes__() == changes + 1
+
+    def test_bulk_allows_comparator(self, tree, index, objectmap):
+        from .allowed import BulkAllowsComparator
+        oids = self._get_all_oids(objectmap, tree)
+        inst = BulkAllowsComparator(index, (['principal'], 'view'))
+        expected = set(objectmap.allowed(oids, ['principal'], 'view'))
+        assert set(inst.intersect(oids, None)) == expected
+        inst.min_size = 0
+        assert set(inst.intersect(list(oids), None)) == expected
+
+    def test_search_with_allows(self, tree, pool, monkeypatch):
+        from adhocracy_core.interfaces import IPool
+        from adhocracy_core.interfaces import search_query
+        from .allowed import BulkAllowsComparator
+        monkeypatch.setattr(BulkAllowsComparator, 'min_size', 0)
+        result = pool['catalogs'].search(search_query._replace(
+            interfaces=IPool, allows=(['principal'], 'view')))
+        assert [x.__name__ for x in result.elements] == ['child2']
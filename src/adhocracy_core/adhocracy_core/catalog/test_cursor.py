@@ -0,0 +1,143 @@
+from datetime import datetime
+from datetime import timezone
+
+from hypatia.field import FieldIndex
+from pyramid import testing
+from pytest import fixture
+from pytest import mark
+from pytest import raises
+
+
+@fixture
+def index():
+    index = FieldIndex(discriminator='value')
+    for docid, value in [(1, 'b'), (2, 'a'), (3, 'b'), (4, 'c'), (5, 'a')]:
+        index.index_doc(docid, testing.DummyResource(value=value))
+    return index
+
+
+def test_supports_cursor(index):
+    from .cursor import supports_cursor
+    assert supports_cursor(index)
+    assert not supports_cursor(object())
+
+
+def test_encode_and_decode_cursor():
+    from .cursor import encode_cursor
+    from .cursor import decode_cursor
+    for value in ['name', 1, 1.5,
+                  datetime(2015, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc),
+                  datetime(2015, 1, 2)]:
+        assert decode_cursor(encode_cursor(value, 7)) == (value, 7)
+
+
+def test_encode_cursor_not_supported_value():
+    from .cursor import encode_cursor
+    assert encode_cursor(object(), 7) == ''
+
+
+def test_decode_index_cursor():
+    from .cursor import decode_index_cursor
+    from .cursor import encode_cursor
+    index = FieldIndex('value')
+    assert decode_index_cursor(index, encode_cursor('x', 1)) == ('x', 1)
+    index.index_doc(1, testing.DummyResource(value=3))
+    assert decode_index_cursor(index, encode_cursor(2, 1)) == (2, 1)
+    with raises(ValueError):
+        decode_index_cursor(index, encode_cursor('x', 1))
+
+
+def test_decode_index_cursor_naive_and_aware_datetime():
+    from .cursor import decode_index_cursor
+    from .cursor import encode_cursor
+    index = FieldIndex('value')
+    aware = datetime(2016, 1, 1, tzinfo=timezone.utc)
+    index.index_doc(1, testing.DummyResource(value=aware))
+    with raises(ValueError):
+        decode_index_cursor(index, encode_cursor(datetime(2016, 1, 1), 1))
+
+
+def test_decode_cursor_invalid():
+    from .cursor import decode_cursor
+    for cursor in ['', 'invalid', 'WzFd', 'WzEsICJhIl0=']:
+        with raises(ValueError):
+            decode_cursor(cursor)
+
+
+def test_get_next_cursor(index):
+    from .cursor import get_next_cursor
+    from .cursor import decode_cursor
+    assert decode_cursor(get_next_cursor(index, 3)) == ('b', 3)
+    assert get_next_cursor(index, 100) == ''
+
+
+def test_scan_after_cursor(index):
+    from .cursor import encode_cursor
+    from .cursor import scan_after_cursor
+    cursor = encode_cursor('a', 5)
+    assert list(scan_after_cursor(index, [1, 2, 3, 4, 5], cursor)) ==\
+        [1, 3, 4]
+    cursor = encode_cursor('b', 1)
+    assert list(scan_after_cursor(index, [1, 2, 3, 4, 5], cursor)) ==\
+        [3, 4]
+
+
+def test_scan_after_cursor_reverse(index):
+    from .cursor import encode_cursor
+    from .cursor import scan_after_cursor
+    cursor = encode_cursor('b', 3)
+    assert list(scan_after_cursor(index, [1, 2, 3, 4, 5], cursor,
+                                  reverse=True)) == [1, 5, 2]
+
+
+def test_scan_after_cursor_filter_docids(index):
+    from .cursor import encode_cursor
+    from .cursor import scan_after_cursor
+    cursor = encode_cursor('a', 2)
+    assert list(scan_after_cursor(index, [1, 2, 4], cursor)) == [1, 4]
+
+
+def test_scan_after_cursor_raise_if_invalid(index):
+    from .cursor import scan_after_cursor
+    with raises(ValueError):
+        scan_after_cursor(index, [1], 'invalid')
+
+
+def test_scan_after_cursor_sort_if_few_docids(index):
+    from .cursor import encode_cursor
+    from .cursor import scan_after_cursor
+    for docid in range(10, 100):
+        index.index_doc(docid, testing.DummyResource(value='d'))
+    cursor = encode_cursor('a', 2)
+    assert list(scan_after_cursor(index, [1, 2, 4, 5], cursor)) == [5, 1, 4]
+    assert list(scan_after_cursor(index, [1, 2, 4, 5], cursor,
+                                  limit=1)) == [5]
+    cursor = encode_cursor('b', 1)
+    assert list(scan_after_cursor(index, [1, 2, 4, 5], cursor,
+                                  reverse=True)) == [5, 2]
+
+
+@mark.parametrize('reverse', [False, True])
+@mark.parametrize('extra_docs', [0, 100])
+def test_paginate_ties_with_cursor(reverse, extra_docs):
+    from hypatia.interfaces import NBEST
+    from hypatia.interfaces import TIMSORT
+    from .cursor import get_next_cursor
+    from .cursor import scan_after_cursor
+    from .sorting import SCAN
+    from .sorting import sort_docids
+    index = FieldIndex(discriminator='value')
+    docids = [1, 2, 3, 100, 101]
+    for docid in docids:
+        index.index_doc(docid, testing.DummyResource(value='a'))
+    for docid in range(200, 200 + extra_docs):
+        index.index_doc(docid, testing.DummyResource(value='b'))
+    wanted = sorted(docids, reverse=reverse)
+    for sort_type in [SCAN, NBEST, TIMSORT]:
+        page = list(sort_docids(index, docids, reverse=reverse, limit=3,
+                                sort_type=sort_type))
+        assert page == wanted[:3]
+        cursor = get_next_cursor(index, page[-1])
+        page2 = list(scan_after_cursor(index, docids, cursor,
+                                       reverse=reverse))
+        assert page2 == wanted[3:]
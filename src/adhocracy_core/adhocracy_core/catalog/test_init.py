@@ -128,6 +128,124 @@ class TestCatalogsServiceAdhocracy:
         with raises(KeyError):
             inst.reindex_index(child, 'WRONG')
 
+    def test_queue_reindex_index(self, registry, pool, inst):
+        from substanced.interfaces import MODE_IMMEDIATE
+        inst['adhocracy']['rate'].reindex_resource = Mock()
+        child = self._make_resource(registry, parent=pool)
+        inst.queue_reindex_index(child, 'rate')
+        assert not inst['adhocracy']['rate'].reindex_resource.called
+        inst.flush_reindex_queue()
+        inst['adhocracy']['rate'].reindex_resource.assert_called_with(
+            child, action_mode=MODE_IMMEDIATE)
+
+    def test_queue_reindex_index_only_once(self, registry, pool, inst):
+        inst['adhocracy']['rate'].reindex_resource = Mock()
+        child = self._make_resource(registry, parent=pool)
+        inst.queue_reindex_index(child, 'rate')
+        inst.queue_reindex_index(child, 'rate')
+        inst.flush_reindex_queue()
+        inst.flush_reindex_queue()
+        assert inst['adhocracy']['rate'].reindex_resource.call_count == 1
+
+    def test_queue_reindex_index_flush_before_commit(self, registry, pool,
+                                                     inst):
+        import transaction
+        inst.queue_reindex_index(pool, 'rate')
+        hooks = list(transaction.get().getBeforeCommitHooks())
+        queue = inst._v_reindex_queue
+        assert (queue.flush_before_commit, (), {}) in hooks
+
+    def test_queue_reindex_index_new_queue_per_transaction(self, pool, inst):
+        import transaction
+        inst.queue_reindex_index(pool, 'rate')
+        queue = inst._v_reindex_queue
+        transaction.abort()
+        inst.queue_reindex_index(pool, 'rate')
+        assert inst._v_reindex_queue is not queue
+
+    def test_queue_reindex_index_raise_if_wrong_index(self, pool, inst):
+        with raises(KeyError):
+            inst.queue_reindex_index(pool, 'WRONG')
+
+    def test_flush_reindex_queue_ignore_removed(self, registry, pool, inst):
+        inst['adhocracy']['rate'].reindex_resource = Mock()
+        child = self._make_resource(registry, parent=pool)
+        inst.queue_reindex_index(child, 'rate')
+        del pool[child.__name__]
+        inst.flush_reindex_queue()
+        assert not inst['adhocracy']['rate'].reindex_resource.called
+
+    def test_flush_reindex_queue_with_index_names(self, registry, pool, inst):
+        inst['adhocracy']['rate'].reindex_resource = Mock()
+        inst['adhocracy']['tag'].reindex_resource = Mock()
+        child = self._make_resource(registry, parent=pool)
+        inst.queue_reindex_index(child, 'rate')
+        inst.queue_reindex_index(child, 'tag')
+        inst.flush_reindex_queue(['tag'])
+        assert not inst['adhocracy']['rate'].reindex_resource.called
+        assert inst['adhocracy']['tag'].reindex_resource.called
+
+    def test_flush_reindex_queue_before_commit_deferred(self, registry, pool,
+                                                        inst):
+        from zope.interface import Interface
+        from substanced.interfaces import IIndexingActionProcessor
+        from substanced.interfaces import MODE_DEFERRED
+        registry.settings = {'adhocracy.catalog.deferred_indexes': 'rate'}
+        processor = Mock()
+        registry.registerAdapter(lambda x: processor, (Interface,),
+                                 IIndexingActionProcessor)
+        index = inst['adhocracy']['rate']
+        index.reindex_resource = Mock()
+        child = self._make_resource(registry, parent=pool)
+        inst.queue_reindex_index(child, 'rate')
+        inst._v_reindex_queue.flush_before_commit()
+        action = processor.add.call_args[0][0][0]
+        assert action.index is index
+        assert action.oid == child.__oid__
+        assert action.mode is MODE_DEFERRED
+        assert not index.reindex_resource.called
+
+    def test_flush_reindex_queue_before_commit_deferred_inactive(
+            self, registry, pool, inst):
+        from zope.interface import Interface
+        from substanced.interfaces import IIndexingActionProcessor
+        registry.settings = {'adhocracy.catalog.deferred_indexes': 'rate'}
+        processor = Mock()
+        processor.active.return_value = False
+        registry.registerAdapter(lambda x: processor, (Interface,),
+                                 IIndexingActionProcessor)
+        inst['adhocracy']['rate'].reindex_resource = Mock()
+        child = self._make_resource(registry, parent=pool)
+        inst.queue_reindex_index(child, 'rate')
+        inst._v_reindex_queue.flush_before_commit()
+        assert not processor.add.called
+        assert inst['adhocracy']['rate'].reindex_resource.called
+
+    def test_flush_reindex_queue_not_deferred(self, registry, pool, inst):
+        from zope.interface import Interface
+        from substanced.interfaces import IIndexingActionProcessor
+        registry.settings = {'adhocracy.catalog.deferred_indexes': 'rate'}
+        processor = Mock()
+        registry.registerAdapter(lambda x: processor, (Interface,),
+                                 IIndexingActionProcessor)
+        inst['adhocracy']['rate'].reindex_resource = Mock()
+        child = self._make_resource(registry, parent=pool)
+        inst.queue_reindex_index(child, 'rate')
+        inst.flush_reindex_queue()
+        assert not processor.add.called
+        assert inst['adhocracy']['rate'].reindex_resource.called
+
+    def test_search_flush_reindex_queue_of_query_indexes(self, registry, pool,
+                                                         inst, query):
+        inst['adhocracy']['tag'].reindex_resource = Mock()
+        inst['adhocracy']['rate'].reindex_resource = Mock()
+        child = self._make_resource(registry, parent=pool)
+        inst.queue_reindex_index(child, 'rate')
+        inst.queue_reindex_index(child, 'tag')
+        inst.search(query._replace(indexes={'tag': 'LAST'}))
+        assert inst['adhocracy']['tag'].reindex_resource.called
+        assert not inst['adhocracy']['rate'].reindex_resource.called
+
     def test_search_default_query_is_empty(self, registry, pool, inst, query):
         child = self._make_resource(registry, parent=pool)
         result = inst.search(query)
@@ -233,6 +351,26 @@ class TestCatalogsServiceAdhocracy:
         assert child_visible in elements
         assert child_hidden not in elements
 
+    def test_search_with_only_visible_exclude_descendants(self, registry,
+                                                          pool, inst, query):
+        from adhocracy_core.sheets.metadata import IMetadata
+        parent = self._make_resource(registry, parent=pool)
+        child = self._make_resource(registry, parent=parent)
+        grandchild = self._make_resource(registry, parent=child)
+        other = self._make_resource(registry, parent=pool)
+        meta_sheet = registry.content.get_sheet(parent, IMetadata)
+        meta_sheet.set({'hidden': True})
+        meta_sheet = registry.content.get_sheet(child, IMetadata)
+        meta_sheet.set({'deleted': True})
+        result = inst.search(query._replace(root=pool, only_visible=True))
+        assert list(result.elements) == [other]
+        meta_sheet = registry.content.get_sheet(parent, IMetadata)
+        meta_sheet.set({'hidden': False})
+        result = inst.search(query._replace(root=pool, only_visible=True))
+        elements = list(result.elements)
+        assert set(elements) == {parent, other}
+        assert grandchild not in elements
+
     def test_search_with_indexes(self, registry, pool, inst, query):
         from adhocracy_core.interfaces import IItem
         item = self._make_resource(registry, parent=pool, iresource=IItem)
@@ -287,6 +425,60 @@ class TestCatalogsServiceAdhocracy:
         result = inst.search(query._replace(references=[reference]))
         assert list(result.elements) == [referencing]
 
+    def test_search_many_references(self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import IItem
+        from adhocracy_core.interfaces import Reference
+        from adhocracy_core.sheets.tags import ITags
+        item = self._make_resource(registry, parent=pool, iresource=IItem)
+        version = item['VERSION_0000000']
+        first = Reference(item, ITags, 'FIRST', None)
+        back_last = Reference(None, ITags, 'LAST', version)
+        other = Reference(pool, ITags, 'FIRST', None)
+        queries = [query._replace(references=[first], resolve=True),
+                   query._replace(references=[back_last], resolve=True),
+                   query._replace(references=[other], resolve=True,
+                                  sort_by='reference')]
+        results = inst.search_many(queries)
+        assert [x.elements for x in results] == [[version], [item], []]
+        assert [x.count for x in results] == [1, 1, 0]
+
+    def test_search_many_references_filter_once(self, registry, pool, inst,
+                                                 query):
+        from adhocracy_core.interfaces import IItem
+        from adhocracy_core.interfaces import Reference
+        from adhocracy_core.sheets.metadata import IMetadata
+        from adhocracy_core.sheets.tags import ITags
+        item = self._make_resource(registry, parent=pool, iresource=IItem)
+        version = item['VERSION_0000000']
+        meta_sheet = registry.content.get_sheet(version, IMetadata)
+        meta_sheet.set({'hidden': True})
+        inst._filter_oids = Mock(wraps=inst._filter_oids)
+        queries = [query._replace(references=[Reference(item, ITags, x, None)],
+                                  only_visible=True, resolve=True)
+                   for x in ('FIRST', 'LAST')]
+        results = inst.search_many(queries)
+        assert [x.elements for x in results] == [[], []]
+        assert inst._filter_oids.call_count == 1
+
+    def test_search_many_fallback_if_different_filters(self, pool, inst,
+                                                       query):
+        from adhocracy_core.interfaces import Reference
+        from adhocracy_core.sheets.tags import ITags
+        inst.search = Mock()
+        reference = Reference(pool, ITags, 'FIRST', None)
+        queries = [query._replace(references=[reference]),
+                   query._replace(references=[reference], only_visible=True)]
+        inst.search_many(queries)
+        assert inst.search.call_count == 2
+
+    def test_search_many_fallback_if_limit(self, pool, inst, query):
+        from adhocracy_core.interfaces import Reference
+        from adhocracy_core.sheets.tags import ITags
+        inst.search = Mock()
+        reference = Reference(pool, ITags, 'FIRST', None)
+        inst.search_many([query._replace(references=[reference], limit=1)])
+        assert inst.search.call_count == 1
+
     def test_search_with_two_references(self, registry, pool, service, inst,
                                         query):
         from copy import deepcopy
@@ -424,6 +616,205 @@ class TestCatalogsServiceAdhocracy:
                                             offset=1))
         assert list(result.elements) == [child2]
 
+    def test_search_with_limit_and_offset_and_sort_by(self, registry, pool,
+                                                      inst, query):
+        from adhocracy_core.interfaces import IPool
+        self._make_resource(registry, parent=pool)
+        child2 = self._make_resource(registry, parent=pool)
+        child3 = self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(interfaces=IPool,
+                                            sort_by='name',
+                                            limit=2,
+                                            offset=1))
+        assert list(result.elements) == [child2, child3]
+        assert result.count == 3
+
+    def test_search_with_group_by_and_sort_by_and_limit(self, registry, pool,
+                                                        inst, query):
+        from adhocracy_core.interfaces import IPool
+        self._make_resource(registry, parent=pool)
+        child2 = self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(interfaces=IPool,
+                                            group_by='interfaces',
+                                            sort_by='name',
+                                            reverse=True,
+                                            limit=1,
+                                            resolve=True))
+        assert result.group_by[IPool] == [child2]
+
+    def test_search_with_explain(self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import IPool
+        self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(interfaces=IPool,
+                                            root=pool,
+                                            only_visible=True,
+                                            explain=True))
+        assert result.explain['plan_cached'] is False
+        assert [x['index'] for x in result.explain['queries']] ==\
+            ['path', 'interfaces', 'private_visibility']
+        assert result.explain['time'] >= 0
+        assert 'concealed_time' in result.explain
+
+    def test_search_without_explain(self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import IPool
+        result = inst.search(query._replace(interfaces=IPool))
+        assert result.explain == {}
+
+    def test_search_cache_query_plan(self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import IPool
+        self._make_resource(registry, parent=pool)
+        query = query._replace(interfaces=IPool, root=pool, explain=True)
+        inst.search(query)
+        result = inst.search(query)
+        assert result.explain['plan_cached'] is True
+
+    def test_search_cache_result(self, registry_with_changelog, pool, inst,
+                                 query):
+        from adhocracy_core.interfaces import IPool
+        registry = registry_with_changelog
+        root = self._make_resource(registry, parent=pool)
+        child = self._make_resource(registry, parent=root)
+        query = query._replace(interfaces=IPool, root=root, explain=True)
+        inst.search(query)
+        result = inst.search(query._replace(sort_by='name'))
+        assert result.explain['result_cached'] is True
+        assert list(result.elements) == [child]
+
+    def test_search_cache_result_invalid_if_descendants_changed(
+            self, registry_with_changelog, pool, inst, query):
+        from adhocracy_core.interfaces import IPool
+        registry = registry_with_changelog
+        root = self._make_resource(registry, parent=pool)
+        query = query._replace(interfaces=IPool, root=root, explain=True)
+        inst.search(query)
+        child = self._make_resource(registry, parent=root)
+        root.__changed_descendants_counter__.change(1)
+        result = inst.search(query)
+        assert result.explain['result_cached'] is False
+        assert list(result.elements) == [child]
+
+    def test_search_cache_result_invalid_if_visibility_changed(
+            self, registry_with_changelog, pool, inst, query):
+        from adhocracy_core.interfaces import IPool
+        from .visibility import increment_changes
+        registry = registry_with_changelog
+        root = self._make_resource(registry, parent=pool)
+        query = query._replace(interfaces=IPool, root=root, explain=True)
+        inst.search(query)
+        increment_changes(inst.get_index('private_visibility'))
+        result = inst.search(query)
+        assert result.explain['result_cached'] is False
+
+    def test_search_cache_result_invalid_if_acl_changed(
+            self, registry_with_changelog, pool, inst, query):
+        from adhocracy_core.interfaces import IPool
+        from .allowed import increment_changes
+        registry = registry_with_changelog
+        root = self._make_resource(registry, parent=pool)
+        query = query._replace(interfaces=IPool, root=root, explain=True)
+        inst.search(query)
+        increment_changes(inst.get_index('allowed'))
+        result = inst.search(query)
+        assert result.explain['result_cached'] is False
+
+    def test_search_cache_result_invalid_if_resource_removed(
+            self, registry_with_changelog, pool, inst, query):
+        from adhocracy_core.interfaces import IPool
+        registry = registry_with_changelog
+        root = self._make_resource(registry, parent=pool)
+        child = self._make_resource(registry, parent=root)
+        query = query._replace(interfaces=IPool, root=root, explain=True)
+        inst.search(query)
+        del root[child.__name__]
+        result = inst.search(query)
+        assert result.explain['result_cached'] is False
+        assert list(result.elements) == []
+
+    def test_search_cache_result_ignore_if_changed_in_transaction(
+            self, registry_with_changelog, pool, inst, query, changelog_meta):
+        from pyramid.traversal import resource_path
+        from adhocracy_core.interfaces import IPool
+        registry = registry_with_changelog
+        root = self._make_resource(registry, parent=pool)
+        query = query._replace(interfaces=IPool, root=root, explain=True)
+        inst.search(query)
+        registry.changelog[resource_path(root)] = changelog_meta
+        result = inst.search(query)
+        assert 'result_cached' not in result.explain
+
+    def test_search_cache_result_filter_allows(self, registry_with_changelog,
+                                              pool, inst, query, monkeypatch):
+        from pyramid.authorization import Allow
+        from adhocracy_core.authorization import set_acl
+        from adhocracy_core.interfaces import IPool
+        from .allowed import BulkAllowsComparator
+        monkeypatch.setattr(BulkAllowsComparator, 'min_size', 0)
+        registry = registry_with_changelog
+        root = self._make_resource(registry, parent=pool)
+        child = self._make_resource(registry, parent=root)
+        set_acl(child, [(Allow, 'principal', 'view')], registry=registry)
+        query = query._replace(interfaces=IPool, root=root, explain=True)
+        inst.search(query)
+        result = inst.search(query._replace(allows=(['other'], 'view')))
+        assert result.explain['result_cached'] is True
+        assert list(result.elements) == []
+        result = inst.search(query._replace(allows=(['principal'], 'view')))
+        assert list(result.elements) == [child]
+
+    def test_search_with_limit_and_sort_by_return_cursor(self, registry, pool,
+                                                         inst, query):
+        from adhocracy_core.interfaces import IPool
+        from .cursor import decode_cursor
+        child = self._make_resource(registry, parent=pool)
+        self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(interfaces=IPool,
+                                            sort_by='name',
+                                            limit=1))
+        assert decode_cursor(result.cursor) == (child.__name__, child.__oid__)
+
+    def test_search_with_limit_return_no_cursor_if_last_page(
+            self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import IPool
+        self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(interfaces=IPool,
+                                            sort_by='name',
+                                            limit=2))
+        assert result.cursor == ''
+
+    def test_search_with_cursor(self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import IPool
+        child = self._make_resource(registry, parent=pool)
+        child2 = self._make_resource(registry, parent=pool)
+        child3 = self._make_resource(registry, parent=pool)
+        query = query._replace(interfaces=IPool, sort_by='name', limit=1)
+        result = inst.search(query)
+        result2 = inst.search(query._replace(cursor=result.cursor))
+        result3 = inst.search(query._replace(cursor=result2.cursor))
+        result4 = inst.search(query._replace(cursor=result3.cursor))
+        assert list(result2.elements) == [child2]
+        assert list(result3.elements) == [child3]
+        assert result3.count == 3
+        assert list(result4.elements) == []
+        assert result4.cursor == ''
+
+    def test_search_with_cursor_and_reverse(self, registry, pool, inst,
+                                            query):
+        from adhocracy_core.interfaces import IPool
+        child = self._make_resource(registry, parent=pool)
+        child2 = self._make_resource(registry, parent=pool)
+        query = query._replace(interfaces=IPool, sort_by='name', limit=1,
+                               reverse=True)
+        result = inst.search(query)
+        result2 = inst.search(query._replace(cursor=result.cursor))
+        assert list(result.elements) == [child2]
+        assert list(result2.elements) == [child]
+
+    def test_search_with_cursor_raise_if_index_not_supported(
+            self, registry, pool, inst, query):
+        with raises(NotImplementedError):
+            inst.search(query._replace(sort_by='interfaces',
+                                       cursor='WyJhIiwgMV0='))
+
     def test_search_with_frequency_of(self, registry, pool, inst, query):
         from adhocracy_core.interfaces import IResource
         child = self._make_resource(registry, parent=pool)
@@ -431,6 +822,41 @@ class TestCatalogsServiceAdhocracy:
                                             frequency_of='interfaces'))
         assert result.frequency_of[IResource] == 1
 
+    def test_search_with_frequency_of_field_index(self, registry, pool, inst,
+                                                  query):
+        from adhocracy_core.interfaces import IPool
+        child = self._make_resource(registry, parent=pool)
+        child2 = self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(interfaces=IPool,
+                                            frequency_of='name'))
+        assert result.frequency_of == {child.__name__: 1,
+                                       child2.__name__: 1}
+
+    def test_search_with_frequency_of_query_values_if_less_values(
+            self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import IPool
+        self._make_resource(registry, parent=pool)
+        self._make_resource(registry, parent=pool)
+        index = inst['system']['name']
+        index.word_count = Mock(return_value=1)
+        index.eq = Mock(wraps=index.eq)
+        result = inst.search(query._replace(interfaces=IPool,
+                                            frequency_of='name'))
+        assert index.eq.called
+        assert sum(result.frequency_of.values()) == 2
+
+    def test_search_with_frequency_of_single_pass_if_more_values(
+            self, registry, pool, inst, query):
+        from adhocracy_core.interfaces import IPool
+        self._make_resource(registry, parent=pool)
+        self._make_resource(registry, parent=pool)
+        index = inst['system']['name']
+        index.eq = Mock(wraps=index.eq)
+        result = inst.search(query._replace(interfaces=IPool,
+                                            frequency_of='name'))
+        assert not index.eq.called
+        assert sum(result.frequency_of.values()) == 2
+
     def test_search_with_sort_by_reference_ignore_if_no_references(
             self, registry, pool, inst, query):
         from adhocracy_core.interfaces import IPool
@@ -513,6 +939,17 @@ class TestCatalogsServiceAdhocracy:
                                             sort_by='name'))
         assert list(result.group_by[IPool]) == [child, child2]
 
+    def test_search_with_group_by_field_index(self, registry, pool, inst,
+                                              query):
+        from adhocracy_core.interfaces import IPool
+        child = self._make_resource(registry, parent=pool)
+        child2 = self._make_resource(registry, parent=pool)
+        result = inst.search(query._replace(interfaces=IPool,
+                                            group_by='name',
+                                            resolve=True))
+        assert list(result.group_by[child.__name__]) == [child]
+        assert list(result.group_by[child2.__name__]) == [child2]
+
     def test_search_with_allows_no_permission(self, registry, pool, inst, query):
         from adhocracy_core.interfaces import IPool
         from pyramid.authorization import Deny
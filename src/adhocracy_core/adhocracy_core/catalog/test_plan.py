@@ -0,0 +1,107 @@
+from hypatia.field import FieldIndex
+from pyramid import testing
+from pytest import fixture
+
+
+def _make_index(name, values):
+    index = FieldIndex(discriminator='value')
+    index.__name__ = name
+    for docid, value in enumerate(values):
+        index.index_doc(docid, testing.DummyResource(value=value))
+    return index
+
+
+@fixture
+def large():
+    return _make_index('large', ['a', 'a', 'a', 'a', 'b'])
+
+
+@fixture
+def small():
+    return _make_index('small', ['x', 'y', 'y', 'y', 'x'])
+
+
+@fixture
+def family():
+    import BTrees
+    return BTrees.family64
+
+
+@fixture
+def cache():
+    from adhocracy_core.utils import LRUCache
+    return LRUCache(10)
+
+
+def test_split_query(large, small):
+    from .plan import split_query
+    query = large.eq('a') & small.eq('x')
+    assert [x.index for x in split_query(query)] == [large, small]
+    assert len(split_query(large.eq('a'))) == 1
+
+
+def test_get_query_shape(large, small):
+    from .plan import get_query_shape
+    queries = [large.eq('a'), small.eq('x')]
+    assert get_query_shape(queries) == (('large', 'Eq'), ('small', 'Eq'))
+
+
+def test_execute_plan(large, small, family):
+    from .plan import execute_plan
+    result = execute_plan([large.eq('a'), small.eq('x')], family)
+    assert list(result) == [0]
+
+
+def test_execute_plan_empty(large, small, family):
+    from .plan import execute_plan
+    result = execute_plan([large.eq('c'), small.eq('x')], family)
+    assert list(result) == []
+
+
+def test_execute_plan_cache_order_by_size(large, small, family, cache):
+    from .plan import execute_plan
+    from .plan import get_query_shape
+    queries = [large.eq('a'), small.eq('x')]
+    execute_plan(queries, family, cache=cache)
+    assert cache.get(get_query_shape(queries)) == (1, 0)
+
+
+def test_execute_plan_use_cached_order(large, small, family, cache):
+    from .plan import execute_plan
+    from .plan import get_query_shape
+    queries = [large.eq('a'), small.eq('x')]
+    cache.set(get_query_shape(queries), (1, 0))
+    explain = {}
+    result = execute_plan(queries, family, cache=cache, explain=explain)
+    assert list(result) == [0]
+    assert explain['plan_cached'] is True
+    assert [x['index'] for x in explain['queries']] == ['small', 'large']
+
+
+def test_execute_plan_explain(large, small, family):
+    from .plan import execute_plan
+    explain = {}
+    execute_plan([large.eq('a'), small.eq('x')], family, explain=explain)
+    assert explain['plan_cached'] is False
+    first, second = explain['queries']
+    assert first['index'] == 'large'
+    assert first['comparator'] == 'Eq'
+    assert first['size'] == 4
+    assert first['result'] == 4
+    assert second['size'] == 2
+    assert second['result'] == 1
+    assert second['time'] >= 0
+
+
+def test_execute_plan_apply_filters_last(large, small, family, cache):
+    from unittest.mock import Mock
+    from substanced.catalog.indexes import AllowsComparator
+    from .plan import execute_plan
+    allows = Mock(spec=AllowsComparator)
+    allows.intersect.return_value = family.IF.Set()
+    explain = {}
+    result = execute_plan([allows, large.eq('a')], family, cache=cache,
+                          explain=explain)
+    assert list(result) == []
+    assert list(allows.intersect.call_args[0][0]) == [0, 1, 2, 3]
+    assert explain['queries'][1]['size'] is None
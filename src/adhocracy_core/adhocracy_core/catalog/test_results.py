@@ -0,0 +1,129 @@
+from unittest.mock import Mock
+
+from pyramid import testing
+from pytest import fixture
+
+
+@fixture
+def root():
+    root = testing.DummyResource(__oid__=1)
+    return root
+
+
+@fixture
+def query(root):
+    from adhocracy_core.interfaces import search_query
+    return search_query._replace(root=root)
+
+
+def test_get_result_cache_key(query):
+    from adhocracy_core.interfaces import IPool
+    from .results import get_result_cache_key
+    query = query._replace(interfaces=[IPool],
+                           indexes={'tag': 'LAST', 'rates': [1, 2]},
+                           allows=(['principal'], 'view'),
+                           sort_by='rates',
+                           limit=10)
+    key = get_result_cache_key(query)
+    assert key.root == 1
+    assert key.interfaces == (IPool,)
+    assert key.indexes == (('rates', (1, 2)), ('tag', 'LAST'))
+    assert key.allows == ()
+    assert key.sort_by == ''
+    assert key.limit == 0
+    assert hash(key)
+
+
+def test_get_result_cache_key_ignore_presentation(query):
+    from .results import get_result_cache_key
+    assert get_result_cache_key(query) == get_result_cache_key(
+        query._replace(sort_by='name', reverse=True, offset=1,
+                       allows=(['principal'], 'view')))
+
+
+def test_get_result_cache_key_none_if_no_root(query):
+    from .results import get_result_cache_key
+    assert get_result_cache_key(query._replace(root=None)) is None
+
+
+def test_get_result_cache_key_none_if_references(query):
+    from .results import get_result_cache_key
+    reference = (None, None, '', None)
+    assert get_result_cache_key(query._replace(references=[reference])) \
+        is None
+
+
+def test_get_result_cache_key_none_if_resource_value(query):
+    from adhocracy_core.interfaces import IResource
+    from .results import get_result_cache_key
+    resource = testing.DummyResource(__provides__=IResource)
+    assert get_result_cache_key(query._replace(indexes={'x': resource})) \
+        is None
+
+
+@fixture
+def registry():
+    return testing.DummyResource(changelog={})
+
+
+def test_get_changes_count(root, registry):
+    from BTrees.Length import Length
+    from .results import get_changes_count
+    root.__changed_descendants_counter__ = Length(3)
+    assert get_changes_count(root, registry) == (3,)
+
+
+def test_get_changes_count_with_counters(root, registry):
+    from BTrees.Length import Length
+    from .results import get_changes_count
+    root.__changed_descendants_counter__ = Length(3)
+    assert get_changes_count(root, registry, [Length(2), None]) == (3, 2, 0)
+
+
+def test_get_changes_count_none_if_counter_changed_in_transaction(
+        root, registry):
+    from BTrees.Length import Length
+    from .results import get_changes_count
+    root.__changed_descendants_counter__ = Length(3)
+    counter = Mock(_p_changed=True)
+    assert get_changes_count(root, registry, [counter]) is None
+
+
+def test_get_changes_count_none_if_no_counter(root, registry):
+    from .results import get_changes_count
+    assert get_changes_count(root, registry) is None
+
+
+def test_get_changes_count_none_if_no_changelog(root):
+    from BTrees.Length import Length
+    from .results import get_changes_count
+    root.__changed_descendants_counter__ = Length(3)
+    assert get_changes_count(root, testing.DummyResource()) is None
+
+
+def test_get_changes_count_none_if_changed_in_transaction(root, registry):
+    from .results import get_changes_count
+    root.__changed_descendants_counter__ = Mock(_p_changed=True)
+    assert get_changes_count(root, registry) is None
+
+
+def test_get_changes_count_none_if_changed_in_changelog(root, registry):
+    from BTrees.Length import Length
+    from .results import get_changes_count
+    root.__changed_descendants_counter__ = Length(3)
+    registry.changelog['/'] = object()
+    assert get_changes_count(root, registry) is None
+
+
+def test_increment_removals_after_removed(pool, service):
+    from .results import get_removals
+    from .results import increment_removals_after_removed
+    pool['catalogs'] = service
+    increment_removals_after_removed(None, None, pool)
+    increment_removals_after_removed(None, None, pool)
+    assert get_removals(service)() == 2
+
+
+def test_increment_removals_after_removed_no_catalogs(pool):
+    from .results import increment_removals_after_removed
+    increment_removals_after_removed(None, None, pool)
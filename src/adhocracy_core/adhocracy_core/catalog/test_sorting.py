@@ -0,0 +1,83 @@
+from hypatia.field import FieldIndex
+from pyramid import testing
+from pytest import fixture
+from pytest import raises
+
+
+@fixture
+def index():
+    index = FieldIndex(discriminator='value')
+    for docid, value in [(1, 'b'), (2, 'a'), (3, 'b'), (4, 'c'), (5, 'a')]:
+        index.index_doc(docid, testing.DummyResource(value=value))
+    return index
+
+
+def test_sort_docids_delegate_to_index(index):
+    from unittest.mock import Mock
+    from .sorting import sort_docids
+    index.sort = Mock(return_value=[2])
+    assert sort_docids(index, [1, 2, 3, 4], limit=1) == [2]
+    assert index.sort.call_args[1] == {'reverse': False, 'limit': 1,
+                                       'sort_type': None}
+
+
+def test_sort_docids_reverse_scan_if_large_result(index):
+    from unittest.mock import Mock
+    from .sorting import sort_docids
+    index.sort = Mock()
+    assert list(sort_docids(index, [1, 2, 3, 4], limit=1, reverse=True)) ==\
+        [4]
+    assert not index.sort.called
+
+
+def test_sort_docids_reverse_delegate_to_index_if_small_result(index):
+    from unittest.mock import Mock
+    from .sorting import sort_docids
+    for docid in range(10, 100):
+        index.index_doc(docid, testing.DummyResource(value='d'))
+    index.sort = Mock(return_value=[4])
+    assert sort_docids(index, [1, 2, 3, 4], limit=1, reverse=True) == [4]
+    assert index.sort.call_args[0][0] == [4, 3, 2, 1]
+
+
+def test_sort_docids_reverse_delegate_to_index_if_no_limit(index):
+    from .sorting import sort_docids
+    assert list(sort_docids(index, [1, 2, 3, 4, 5], reverse=True)) ==\
+        [4, 3, 1, 5, 2]
+
+
+def test_sort_docids_same_result_for_all_sort_types(index):
+    from hypatia.interfaces import NBEST
+    from hypatia.interfaces import TIMSORT
+    from .sorting import sort_docids
+    from .sorting import SCAN
+    for sort_type in [SCAN, NBEST, TIMSORT]:
+        result = sort_docids(index, [1, 2, 3, 4], limit=3,
+                             sort_type=sort_type)
+        assert list(result) == [2, 1, 3]
+        result = sort_docids(index, [1, 2, 3, 4], limit=1, reverse=True,
+                             sort_type=sort_type)
+        assert list(result) == [4]
+
+
+def test_sort_docids_accept_iterator(index):
+    from .sorting import sort_docids
+    assert list(sort_docids(index, iter([4, 2]), limit=1)) == [2]
+
+
+def test_scan_index(index):
+    from .sorting import scan_index
+    assert list(scan_index(index, [1, 2, 3, 4, 5])) == [2, 5, 1, 3, 4]
+
+
+def test_scan_index_reverse(index):
+    from .sorting import scan_index
+    assert list(scan_index(index, [1, 2, 3, 4, 5], reverse=True)) ==\
+        [4, 3, 1, 5, 2]
+
+
+def test_scan_index_raise_if_docid_not_indexed(index):
+    from hypatia.exc import Unsortable
+    from .sorting import scan_index
+    with raises(Unsortable):
+        list(scan_index(index, [1, 100]))
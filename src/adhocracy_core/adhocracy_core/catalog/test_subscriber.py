@@ -12,7 +12,7 @@ def catalog():
     catalog = testing.DummyResource(__provides__=(IFolder, IService))
     catalog['adhocracy'] = testing.DummyResource(__provides__=(IFolder,
                                                                IService))
-    catalog.reindex_index = Mock()
+    catalog.queue_reindex_index = Mock()
     return catalog
 
 
@@ -30,32 +30,121 @@ def event(context):
 def test_reindex_tagged_with_removed_and_added_elements(event, catalog):
     from .subscriber import reindex_tag
     reindex_tag(event)
-    catalog.reindex_index.assert_called_with(event.object, 'tag')
+    catalog.queue_reindex_index.assert_called_with(event.object, 'tag')
 
 
 def test_reindex_rate_index(event, catalog):
     from .subscriber import reindex_rates
     reindex_rates(event)
-    catalog.reindex_index.assert_called_with(event.object, 'rates')
+    catalog.queue_reindex_index.assert_called_with(event.object, 'rates')
+
+
+class TestAggregateRates:
+
+    @fixture
+    def event(self, event, registry):
+        from adhocracy_core.sheets.rate import IRate
+        event.registry = registry
+        event.reference = Mock(source=testing.DummyResource(__provides__=IRate))
+        return event
+
+    @fixture
+    def mock_update(self, mocker):
+        from . import subscriber
+        return mocker.patch.object(subscriber, 'update_rates_aggregate')
+
+    @fixture
+    def mock_remove(self, mocker):
+        from . import subscriber
+        return mocker.patch.object(subscriber, 'remove_from_rates_aggregate')
+
+    def call_fut(self, event):
+        from .subscriber import aggregate_rates
+        return aggregate_rates(event)
+
+    def test_update_if_added(self, event, mock_update, mock_remove):
+        self.call_fut(event)
+        mock_update.assert_called_with(event.reference.source, event.registry)
+        assert not mock_remove.called
+
+    def test_remove_if_removed(self, event, mock_update, mock_remove):
+        from zope.interface import alsoProvides
+        from adhocracy_core.interfaces import ISheetBackReferenceRemoved
+        alsoProvides(event, ISheetBackReferenceRemoved)
+        self.call_fut(event)
+        mock_remove.assert_called_with(event.reference.source, event.object)
+        assert not mock_update.called
+
+    def test_ignore_if_source_is_not_rate(self, event, mock_update,
+                                          mock_remove):
+        event.reference.source = testing.DummyResource()
+        self.call_fut(event)
+        assert not mock_update.called
+        assert not mock_remove.called
+
+
+class TestAggregateRatesAfterTagChange:
+
+    @fixture
+    def event(self, event, registry):
+        from adhocracy_core.sheets.tags import ITags
+        event.registry = registry
+        event.reference = Mock(isheet=ITags)
+        return event
+
+    @fixture
+    def mock_update(self, mocker):
+        from . import subscriber
+        return mocker.patch.object(subscriber, 'update_rates_aggregate')
+
+    def call_fut(self, event):
+        from .subscriber import aggregate_rates_after_tag_change
+        return aggregate_rates_after_tag_change(event)
+
+    def test_update_and_reindex_rateable(self, event, catalog, context,
+                                         mock_update):
+        mock_update.return_value = context
+        self.call_fut(event)
+        mock_update.assert_called_with(event.object, event.registry)
+        catalog.queue_reindex_index.assert_called_with(context, 'rates')
+
+    def test_ignore_if_no_rateable(self, event, catalog, mock_update):
+        mock_update.return_value = None
+        self.call_fut(event)
+        assert not catalog.queue_reindex_index.called
+
+    def test_ignore_if_not_tag_reference(self, event, mock_update):
+        from adhocracy_core.interfaces import ISheet
+        event.reference.isheet = ISheet
+        self.call_fut(event)
+        assert not mock_update.called
+
+
+def test_add_rates_aggregate(event):
+    from .aggregate import get_aggregate
+    from .subscriber import add_rates_aggregate
+    add_rates_aggregate(event)
+    assert get_aggregate(event.object, 'rates').items() == {}
 
 
 def test_reindex_user_name(event, catalog):
     from .subscriber import reindex_user_name
     reindex_user_name(event)
-    catalog.reindex_index.assert_called_with(event.object, 'user_name')
+    catalog.queue_reindex_index.assert_called_with(event.object, 'user_name')
 
 
 def test_reindex_user_email(event, catalog):
     from .subscriber import reindex_user_email
     reindex_user_email(event)
-    catalog.reindex_index.assert_called_with(event.object, 'private_user_email')
+    catalog.queue_reindex_index.assert_called_with(event.object,
+                                                   'private_user_email')
 
 
 def test_reindex_user_activation_path(event, catalog):
     from .subscriber import reindex_user_activation_path
     reindex_user_activation_path(event)
-    catalog.reindex_index.assert_called_with(event.object,
-                                             'private_user_activation_path')
+    catalog.queue_reindex_index.assert_called_with(
+        event.object, 'private_user_activation_path')
 
 
 def test_reindex_badge_index(event, catalog, mock_sheet, registry_with_content):
@@ -65,7 +154,7 @@ def test_reindex_badge_index(event, catalog, mock_sheet, registry_with_content):
     registry_with_content.content.get_sheet.return_value = mock_sheet
     event.registry = registry_with_content
     reindex_badge(event)
-    catalog.reindex_index.assert_called_with(badgeable, 'badge')
+    catalog.queue_reindex_index.assert_called_with(badgeable, 'badge')
 
 
 def test_reindex_item_badge(event, catalog):
@@ -76,19 +165,14 @@ def test_reindex_item_badge(event, catalog):
     event.object['other'] = testing.DummyResource()
     reindex_item_badge(event)
 
-    index_calls = catalog.reindex_index.call_args_list
+    index_calls = catalog.queue_reindex_index.call_args_list
     assert call(event.object['version'], 'item_badge') in index_calls
     assert call(event.object['other'], 'item_badge') not in index_calls
 
 
 @fixture
-def mock_reindex(monkeypatch):
-    from . import subscriber
-    mock_reindex = Mock(spec=subscriber._reindex_resource_and_descendants)
-    monkeypatch.setattr(subscriber,
-                        '_reindex_resource_and_descendants',
-                        mock_reindex)
-    return mock_reindex
+def mock_reindex(catalog):
+    return catalog.queue_reindex_index
 
 
 @fixture
@@ -106,7 +190,17 @@ def test_reindex_visibility_concealed(event, mock_reindex, mock_visibility):
     from .subscriber import reindex_visibility
     mock_visibility.return_value = VisibilityChange.concealed
     reindex_visibility(event)
-    assert mock_reindex.called
+    mock_reindex.assert_called_with(event.object, 'private_visibility')
+
+
+def test_reindex_visibility_concealed_ignore_descendants(
+        event, mock_reindex, mock_visibility):
+    from adhocracy_core.interfaces import VisibilityChange
+    from .subscriber import reindex_visibility
+    event.object['child'] = testing.DummyResource()
+    mock_visibility.return_value = VisibilityChange.concealed
+    reindex_visibility(event)
+    assert mock_reindex.call_count == 1
 
 
 def test_reindex_visibility_revealed(event, mock_reindex, mock_visibility):
@@ -133,42 +227,6 @@ def test_reindex_visibility_visible(event, mock_reindex, mock_visibility):
     assert not mock_reindex.called
 
 
-class TestReindexResourceAndDescendants:
-
-    @fixture
-    def mock_path_query(self):
-        mock_query = Mock()
-        return mock_query
-
-    @fixture
-    def catalog(self, catalog, mock_path_query):
-        from substanced.interfaces import IService
-        from substanced.interfaces import IFolder
-        from substanced.catalog.indexes import PathIndex
-        catalog['system'] = testing.DummyResource(__provides__=(IFolder,
-                                                                IService))
-        mock_path_index = Mock(spec=PathIndex)
-        mock_path_index.eq.return_value = mock_path_query
-        catalog['system']['path'] = mock_path_index
-        return catalog
-
-    def call_fut(self, context):
-        from .subscriber import _reindex_resource_and_descendants
-        return _reindex_resource_and_descendants(context)
-
-    def test_resource_and_descentdants_reindexed(self, context, catalog,
-                                                 mock_path_query):
-        from pyramid.traversal import resource_path
-        child = testing.DummyResource()
-        mock_path_query.execute.return_value = [context, child]
-        self.call_fut(context)
-        assert catalog['system']['path'].eq.call_args == \
-               call(resource_path(context), include_origin=True)
-        mock_reindex = catalog.reindex_index
-        assert call(child, 'private_visibility') in mock_reindex.call_args_list
-        assert mock_reindex.call_count == 2
-
-
 def test_reindex_workflow_state(event, catalog):
     from unittest.mock import call
     from .subscriber import reindex_workflow_state
@@ -177,7 +235,7 @@ def test_reindex_workflow_state(event, catalog):
     event.object['other'] = testing.DummyResource()
     reindex_workflow_state(event)
 
-    index_calls = catalog.reindex_index.call_args_list
+    index_calls = catalog.queue_reindex_index.call_args_list
     assert call(event.object, 'workflow_state') in index_calls
     assert call(event.object['version'], 'workflow_state') in index_calls
     assert call(event.object['other'], 'workflow_state') not in index_calls
@@ -189,6 +247,9 @@ def test_register_subscriber(registry):
     assert subscriber.reindex_tag.__name__ in handlers
     assert subscriber.reindex_visibility.__name__ in handlers
     assert subscriber.reindex_rates.__name__ in handlers
+    assert subscriber.aggregate_rates.__name__ in handlers
+    assert subscriber.aggregate_rates_after_tag_change.__name__ in handlers
+    assert subscriber.add_rates_aggregate.__name__ in handlers
     assert subscriber.reindex_badge.__name__ in handlers
     assert subscriber.reindex_item_badge.__name__ in handlers
     assert subscriber.reindex_workflow_state.__name__ in handlers
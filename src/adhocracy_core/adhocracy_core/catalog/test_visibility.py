@@ -0,0 +1,100 @@
+from pytest import fixture
+from pytest import mark
+
+
+@mark.usefixtures('integration')
+class TestVisibility:
+
+    @fixture
+    def pool(self, pool_with_catalogs):
+        return pool_with_catalogs
+
+    @fixture
+    def index(self, pool):
+        return pool['catalogs']['adhocracy']['private_visibility']
+
+    @fixture
+    def objectmap(self, pool):
+        from substanced.util import find_objectmap
+        return find_objectmap(pool)
+
+    def _create(self, registry, parent, name):
+        from adhocracy_core.resources.pool import IBasicPool
+        from adhocracy_core.sheets.name import IName
+        return registry.content.create(
+            IBasicPool.__identifier__, parent=parent,
+            appstructs={IName.__identifier__: {'name': name}})
+
+    def _set(self, registry, resource, **appstruct):
+        from substanced.util import find_service
+        from adhocracy_core.sheets.metadata import IMetadata
+        sheet = registry.content.get_sheet(resource, IMetadata)
+        sheet.set(appstruct)
+        find_service(resource, 'catalogs').flush_reindex_queue()
+
+    @fixture
+    def tree(self, registry, pool):
+        child = self._create(registry, pool, 'child')
+        grandchild = self._create(registry, child, 'grandchild')
+        self._create(registry, grandchild, 'greatgrandchild')
+        self._create(registry, pool, 'child2')
+        self._set(registry, child, hidden=True)
+        self._set(registry, grandchild, deleted=True)
+        return pool
+
+    def test_get_concealed_oids(self, tree, index):
+        from .visibility import get_concealed_oids
+        grandchild = tree['child']['grandchild']
+        expected = {grandchild.__oid__, grandchild['greatgrandchild'].__oid__}
+        assert set(get_concealed_oids(index)) == expected
+
+    def test_get_concealed_oids_cached(self, tree, index):
+        from .visibility import get_concealed_oids
+        result = get_concealed_oids(index)
+        assert get_concealed_oids(index) is result
+
+    def test_get_concealed_oids_not_cached_after_change(self, tree, index):
+        from .visibility import get_concealed_oids
+        from .visibility import increment_changes
+        result = get_concealed_oids(index)
+        increment_changes(index)
+        assert get_concealed_oids(index) is not result
+
+    def test_conceal_resource_increments_changes(self, tree, index,
+                                                 registry):
+        changes = index.__visibility_changes__()
+        self._set(registry, tree['child2'], hidden=True)
+        assert index.__visibility_changes__() == changes + 1
+
+    def test_reveal_resource_increments_changes(self, tree, index, registry):
+        changes = index.__visibility_changes__()
+        self._set(registry, tree['child'], hidden=False)
+        assert index.__visibility_changes__() == changes + 1
+
+    def test_add_resource_does_not_increment_changes(self, tree, index,
+                                                     registry):
+        changes = index.__visibility_changes__()
+        self._create(registry, tree, 'child3')
+        assert index.__visibility_changes__() == changes
+
+    def test_move_resource_increments_changes(self, tree, index):
+        changes = index.__visibility_changes__()
+        tree.move('child2', tree['child'])
+        assert index.__visibility_changes__() == changes + 1
+
+    def test_get_concealed_oids_add_new_oids(self, tree, index, registry):
+        from .visibility import get_concealed_oids
+        result = get_concealed_oids(index)
+        visible = self._create(registry, tree, 'child3')
+        concealed = self._create(registry, tree['child'], 'child4')
+        oids = [visible.__oid__, concealed.__oid__]
+        assert get_concealed_oids(index, oids=oids) is result
+        assert visible.__oid__ not in result
+        assert concealed.__oid__ in result
+
+    def test_search_with_only_visible(self, tree, pool):
+        from adhocracy_core.interfaces import IPool
+        from adhocracy_core.interfaces import search_query
+        query = search_query._replace(interfaces=IPool, only_visible=True)
+        result = pool['catalogs'].search(query)
+        assert [x.__name__ for x in result.elements] == ['child2']
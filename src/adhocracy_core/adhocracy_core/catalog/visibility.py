@@ -0,0 +1,126 @@
+"""Exclude descendants of hidden or deleted resources.
+
+The `private_visibility` index only stores the own state of every resource,
+the concealed resources are the roots of invisible subtrees. The oids of
+their descendants are computed with the objectmap and cached per database
+connection until the visibility of a resource is changed or a resource is
+moved.
+
+Adding or removing resources does not invalidate the cache. Removed oids
+are not indexed, so they are never excluded. Oids added after the
+computation are checked one by one when they are filtered for the first
+time and then added to the cached set, see :func:`get_concealed_oids`.
+"""
+from collections.abc import Iterable
+
+from BTrees.Length import Length
+from hypatia.interfaces import IIndex
+from substanced.util import find_objectmap
+from substanced.util import find_service
+
+from adhocracy_core.interfaces import IResource
+from adhocracy_core.interfaces import IResourceSheetModified
+from adhocracy_core.interfaces import VisibilityChange
+from adhocracy_core.utils import get_visibility_change
+
+
+CONCEALED = ('deleted', 'hidden')
+
+
+def get_changes(index: IIndex) -> Length:
+    """Return the changes counter of the visibility `index` or None."""
+    return getattr(index, '__visibility_changes__', None)
+
+
+def increment_changes(index: IIndex):
+    """Increment the changes counter of the `private_visibility` `index`."""
+    changes = get_changes(index)
+    if changes is None:
+        changes = Length(0)
+        index.__visibility_changes__ = changes
+    changes.change(1)
+
+
+def get_concealed_oids(index: IIndex, oids: Iterable=()) -> set:
+    """Return set with the oids of all descendants of concealed resources.
+
+    The result is cached until :func:`increment_changes` is called.
+
+    :param oids: the oids to filter, oids added to the objectmap after the
+                 cached set was computed are checked and added to it.
+    """
+    objectmap = find_objectmap(index)
+    changes = get_changes(index)
+    if changes is not None and changes._p_changed:
+        # no cache for changes not commited yet
+        return _compute_concealed_oids(index, objectmap)
+    count = changes() if changes is not None else 0
+    counter, known, concealed, checked = getattr(index, '_v_concealed_oids',
+                                                 (None, None, None, None))
+    if counter != count:
+        family_if = objectmap.family.IF
+        known = family_if.Set(objectmap.objectid_to_path.keys())
+        concealed = _compute_concealed_oids(index, objectmap)
+        counter, checked = count, family_if.Set()
+        index._v_concealed_oids = (counter, known, concealed, checked)
+    new = [x for x in oids if x not in known and x not in checked]
+    if new:
+        checked.update(new)
+        concealed.update(x for x in new
+                         if _has_concealed_parent(index, objectmap, x))
+    return concealed
+
+
+def _compute_concealed_oids(index: IIndex, objectmap) -> set:
+    """Combine the subtrees of all concealed resources.
+
+    Parents are processed first, nested subtrees are already included.
+    """
+    family_if = objectmap.family.IF
+    roots = index.any(CONCEALED).execute(resolver=None)
+    paths = (objectmap.path_for(x) for x in roots.ids)
+    concealed = family_if.Set()
+    root_path = None
+    for path in sorted(x for x in paths if x is not None):
+        if root_path and path[:len(root_path)] == root_path:
+            continue  # already included with the subtree of root_path
+        root_path = path
+        subtree = objectmap.pathlookup(path, include_origin=False)
+        concealed = family_if.union(concealed, subtree)
+    return concealed
+
+
+def _has_concealed_parent(index: IIndex, objectmap, oid: int) -> bool:
+    path = objectmap.path_for(oid)
+    if path is None:
+        return False
+    for end in range(len(path) - 1, 0, -1):
+        parent = objectmap.objectid_for(path[:end])
+        values = index._rev_index.get(parent, ())
+        if any(x in values for x in CONCEALED):
+            return True
+    return False
+
+
+def _increment_changes_for(context: IResource):
+    catalogs = find_service(context, 'catalogs')
+    if not hasattr(catalogs, 'get_index'):  # ease testing
+        return
+    index = catalogs.get_index('private_visibility')
+    if index is not None:
+        increment_changes(index)
+
+
+def increment_changes_after_visibility_changed(event:
+                                               IResourceSheetModified):
+    """Invalidate the cached concealed oids if a resource is concealed."""
+    visibility = get_visibility_change(event)
+    if visibility in (VisibilityChange.concealed, VisibilityChange.revealed):
+        _increment_changes_for(event.object)
+
+
+def increment_changes_after_moved(event, resource, parent):
+    """Invalidate the cached concealed oids if a resource is moved."""
+    if event.moving is None or event.moving is False:
+        return
+    _increment_changes_for(event.parent)
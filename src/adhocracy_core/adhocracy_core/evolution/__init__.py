@@ -8,12 +8,14 @@ from pyramid.registry import Registry
 from pyramid.threadlocal import get_current_registry
 from substanced.evolution import add_evolution_step
 from substanced.interfaces import IFolder
+from substanced.util import find_objectmap
 from substanced.util import find_service
 from zope.interface import alsoProvides
 from zope.interface import directlyProvides
 from zope.interface import noLongerProvides
 from zope.interface.interfaces import IInterface
 
+from adhocracy_core.auditing import set_auditlog
 from adhocracy_core.catalog import ICatalogsService
 from adhocracy_core.interfaces import IItem
 from adhocracy_core.interfaces import IItemVersion
@@ -617,6 +619,28 @@ def remove_duplicated_group_ids(root):  # pragma: no cover
             user.group_ids = unique_group_ids
 
 
+def reindex_private_visibility(root):  # pragma: no cover
+    """Reindex private_visibility, only the own visibility is indexed now."""
+    catalogs = find_service(root, 'catalogs')
+    objectmap = find_objectmap(root)
+    visibility_index = catalogs.get_index('private_visibility')
+    concealed_query = visibility_index.any(['deleted', 'hidden'])
+    concealed = concealed_query.execute(resolver=None)
+    oids = list(concealed.ids)
+    count = len(oids)
+    for index, oid in enumerate(oids):
+        logger.info('Reindex resource {0} of {1}'.format(index + 1, count))
+        resource = objectmap.object_for(oid)
+        if resource is None:
+            continue
+        catalogs.reindex_index(resource, 'private_visibility')
+
+
+def add_auditlog_index(root):  # pragma: no cover
+    """Add auditlog index with resource and user paths of all entries."""
+    set_auditlog(root)
+
+
 def includeme(config):  # pragma: no cover
     """Register evolution utilities and add evolution steps."""
     config.add_directive('add_evolution_step', add_evolution_step)
@@ -646,3 +670,5 @@ def includeme(config):  # pragma: no cover
     config.add_evolution_step(add_image_reference_to_organisations)
     config.add_evolution_step(set_comment_count)
     config.add_evolution_step(remove_duplicated_group_ids)
+    config.add_evolution_step(reindex_private_visibility)
+    config.add_evolution_step(add_auditlog_index)
@@ -25,6 +25,24 @@ class SheetReftype(namedtuple('ISheetReftype', 'isheet field reftype')):
     """Fields: isheet field reftype."""
 
 
+def _filter_reftypes(all_reftypes: Iterable, base_isheet: ISheet,
+                     base_reftype: SheetReference) -> (SheetReftype,):
+    reftypes = []
+    for reftype in all_reftypes:
+        if isinstance(reftype, str):
+            continue
+        if not issubclass(reftype, SheetReference):
+            continue
+        if not reftype.isOrExtends(base_reftype):
+            continue
+        isheet = reftype.queryTaggedValue('source_isheet')
+        if not isheet.isOrExtends(base_isheet):
+            continue
+        field = reftype.queryTaggedValue('source_isheet_field')
+        reftypes.append(SheetReftype(isheet, field, reftype))
+    return tuple(reftypes)
+
+
 @content('Graph',
          )
 class Graph(Persistent):
@@ -45,29 +63,41 @@ class Graph(Persistent):
         return find_objectmap(self.context)
 
     def get_reftypes(self, base_isheet=ISheet,
-                     base_reftype=SheetReference) -> Iterator:
+                     base_reftype=SheetReference) -> (SheetReftype,):
         """Collect all used SheetReferenceTypes.
 
         :param base_reftype: Skip types that are not subclasses of this.
         :param base_isheet: Skip types with a source isheet that is not a
                             subclass of this.
-        :returns: Generator of :class:`adhocracy_core.graph.SheetReftype`
+        :returns: Tuple of :class:`adhocracy_core.graph.SheetReftype`
         """
-        if not self._objectmap:
+        objectmap = self._objectmap
+        if not objectmap:
             return []
-        all_reftypes = self._objectmap.get_reftypes()
-        for reftype in all_reftypes:
-            if isinstance(reftype, str):
-                continue
-            if not issubclass(reftype, SheetReference):
-                continue
-            if not reftype.isOrExtends(base_reftype):
-                continue
-            isheet = reftype.queryTaggedValue('source_isheet')
-            if not isheet.isOrExtends(base_isheet):
-                continue
-            field = reftype.queryTaggedValue('source_isheet_field')
-            yield SheetReftype(isheet, field, reftype)
+        lookup = self._get_reftypes_lookup(objectmap)
+        # use identity, different interfaces with equal names are equal
+        key = (id(base_isheet), id(base_reftype))
+        if key not in lookup:
+            reftypes = _filter_reftypes(objectmap.get_reftypes(), base_isheet,
+                                        base_reftype)
+            # store the base types to keep the id keys valid
+            lookup[key] = (base_isheet, base_reftype, reftypes)
+        return lookup[key][2]
+
+    def _get_reftypes_lookup(self, objectmap: ObjectMap) -> dict:
+        """Return the filtered reftypes cached with the `objectmap`.
+
+        The cache is stored per database connection. Reftypes are never
+        removed from the objectmap, so it is cleared if their number
+        changes.
+        """
+        count = len(objectmap.get_reftypes())
+        cached_count, lookup = getattr(objectmap, '_v_reftypes_lookup',
+                                       (None, None))
+        if cached_count != count:
+            lookup = {}
+            objectmap._v_reftypes_lookup = (count, lookup)
+        return lookup
 
     def set_references(self, source, targets: Iterable,
                        reftype: SheetReference, registry: Registry=None,
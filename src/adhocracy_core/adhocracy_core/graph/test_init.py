@@ -134,6 +134,49 @@ class TestGraphGetReftypes:
         reftypes = list(self.call_fut(mock_objectmap, base_isheet=ISheet))
         assert len(reftypes) == 2
 
+    def test_cache_reftypes(self, mock_objectmap):
+        mock_objectmap.get_reftypes.return_value = [SheetToSheet]
+        reftypes = self.call_fut(mock_objectmap)
+        assert self.call_fut(mock_objectmap) is reftypes
+
+    def test_cache_reftypes_per_base_types(self, mock_objectmap):
+        class SubSheetToSheet(SheetToSheet):
+            pass
+        mock_objectmap.get_reftypes.return_value = [SubSheetToSheet,
+                                                    SheetToSheet]
+        self.call_fut(mock_objectmap)
+        reftypes = self.call_fut(mock_objectmap, base_reftype=SubSheetToSheet)
+        assert len(reftypes) == 1
+
+    def test_cache_reftypes_clear_if_new_reftype(self, mock_objectmap):
+        class SubSheetToSheet(SheetToSheet):
+            pass
+        mock_objectmap.get_reftypes.return_value = [SheetToSheet]
+        self.call_fut(mock_objectmap)
+        mock_objectmap.get_reftypes.return_value = [SheetToSheet,
+                                                    SubSheetToSheet]
+        reftypes = self.call_fut(mock_objectmap)
+        assert len(reftypes) == 2
+
+    def test_cache_reftypes_per_objectmap(self, mock_objectmap):
+        from substanced.objectmap import ObjectMap
+        from unittest.mock import Mock
+        other_objectmap = Mock(spec=ObjectMap)
+        other_objectmap.get_reftypes.return_value = []
+        mock_objectmap.get_reftypes.return_value = [SheetToSheet]
+        self.call_fut(mock_objectmap)
+        assert self.call_fut(other_objectmap) == ()
+
+    def test_cache_reftypes_clear_if_reference_with_new_reftype(self,
+                                                                 context,
+                                                                 objectmap):
+        from adhocracy_core.graph import Graph
+        graph = Graph(context)
+        source, target = create_dummy_resources(parent=context, count=2)
+        assert graph.get_reftypes() == ()
+        graph.set_references(source, [target], SheetToSheet)
+        assert graph.get_reftypes() == ((ISheet, '', SheetToSheet),)
+
 
 class TestGraphSetReferences:
 
@@ -462,6 +462,9 @@ class ITokenManger(Interface):  # pragma: no cover
     def delete_token(token: str):
         """Delete authentication token."""
 
+    def delete_user_tokens(userid: str):
+        """Delete all authentication tokens of :term:`userid`."""
+
     def delete_expired_tokens(timeout: float):
         """Delete expired authentication tokens."""
 
@@ -550,13 +553,17 @@ class AuditlogAction(Enum):
 SearchResult = namedtuple('SearchResult', ['elements',
                                            'count',
                                            'frequency_of',
-                                           'group_by'])
+                                           'group_by',
+                                           'cursor',
+                                           'explain'])
 
 
 search_result = SearchResult(elements=[],
                              count=0,
                              frequency_of={},
-                             group_by={})
+                             group_by={},
+                             cursor='',
+                             explain={})
 
 
 class Comparator(Enum):
@@ -623,8 +630,10 @@ class SearchQuery(namedtuple('Query', ['interfaces',
                                        'reverse',
                                        'limit',
                                        'offset',
+                                       'cursor',
                                        'frequency_of',
                                        'group_by',
+                                       'explain',
                                        ])):
     """Query parameters to search resources.
 
@@ -677,10 +686,18 @@ class SearchQuery(namedtuple('Query', ['interfaces',
     offset (int):
         starting position of resources in search result (only works together
         with `limit`)
+    cursor (str):
+        continue after the position of the last resource of the previous
+        page. The cursor is returned in the search result if the query has
+        a `limit`, `sort_by` is a field index and the page is full (only
+        works together with `limit` and `sort_by`).
     frequency_of (str):
         index name to count frequency of indexed values.
     group_by (str):
         index name to group result resources by indexed value.
+    explain (bool):
+        add the result size and time of every index query to the search
+        result, see :func:`adhocracy_core.catalog.plan.execute_plan`.
     """
 
 
@@ -696,8 +713,10 @@ search_query = SearchQuery(interfaces=(),
                            reverse=False,
                            limit=0,
                            offset=0,
+                           cursor='',
                            frequency_of='',
                            group_by='',
+                           explain=False,
                            )
 
 
@@ -12,6 +12,7 @@ from zope.interface import Attribute
 from zope.interface import Interface
 from zope.interface import implementer
 
+from adhocracy_core.authentication import delete_user_tokens
 from adhocracy_core.authorization import set_acl
 from adhocracy_core.interfaces import IPool
 from adhocracy_core.interfaces import IServicePool
@@ -31,6 +32,7 @@ from adhocracy_core.sheets.metadata import IMetadata
 from adhocracy_core.sheets.metadata import is_older_than
 from adhocracy_core.utils import get_sheet
 from adhocracy_core.utils import get_sheet_field
+from adhocracy_core.utils import LRUCache
 import adhocracy_core.sheets.metadata
 import adhocracy_core.sheets.principal
 import adhocracy_core.sheets.pool
@@ -230,11 +232,15 @@ class PasswordReset(Base):
     """Password reset implementation."""
 
     def reset_password(self, password):
-        """Set `password` for creator user and delete itself."""
+        """Set `password` for creator user and delete itself.
+
+        All authentication tokens of the user are deleted.
+        """
         user = get_sheet_field(self, IMetadata, 'creator')
         password_sheet = get_sheet(
             user, adhocracy_core.sheets.principal.IPasswordAuthentication)
         password_sheet.set({'password': password}, send_event=False)
+        delete_user_tokens(user)
         if not user.active:  # pragma: no cover
             user.activate()
         del self.__parent__[self.__name__]
@@ -368,15 +374,53 @@ class UserLocatorAdapter(object):
         return sorted(list(roleids))
 
 
+class PrincipalsCache(LRUCache):
+    """In-process LRU cache for the groups and roles of users.
+
+    :param ttl: seconds until cached principals expire, this limits the
+                time other processes may use outdated principals.
+    :param maxsize: maximal number of cached users
+    """
+
+    def __init__(self, ttl: float, maxsize: int=10000):
+        """Initialize self."""
+        super().__init__(maxsize, ttl=ttl)
+
+    def get(self, userid: str) -> list:
+        """Return cached principals for `userid` or None."""
+        principals = super().get(userid)
+        return None if principals is None else list(principals)
+
+    def set(self, userid: str, principals: list):
+        """Cache `principals`, remove the least recently used users."""
+        super().set(userid, tuple(principals))
+
+
+def get_principals_cache(registry: Registry) -> PrincipalsCache:
+    """Return the principals cache or None."""
+    return getattr(registry, 'principals_cache', None)
+
+
 def groups_and_roles_finder(userid: str, request: Request) -> list:
-    """A Pyramid authentication policy groupfinder callback."""
+    """A Pyramid authentication policy groupfinder callback.
+
+    The result is cached in the :class:`PrincipalsCache` of the registry.
+    """
+    cache = get_principals_cache(request.registry)
+    if cache is not None:
+        principals = cache.get(userid)
+        if principals is not None:
+            return principals
     with statsd_timer('authentication.groups', rate=.1):
         userlocator = request.registry.getMultiAdapter((request.context,
                                                         request),
                                                        IRolesUserLocator)
-        groupids = userlocator.get_groupids(userid) or []
+        groupids = userlocator.get_groupids(userid)
         roleids = userlocator.get_role_and_group_roleids(userid) or []
-    return groupids + roleids
+    principals = (groupids or []) + roleids
+    if cache is not None and groupids is not None:  # only for existing users
+        cache.set(userid, principals)
+    return principals
 
 
 def delete_not_activated_users(request: Request, age_in_days: int):
@@ -416,3 +460,7 @@ def includeme(config):
     config.registry.registerAdapter(UserLocatorAdapter,
                                     (Interface, Interface),
                                     IRolesUserLocator)
+    ttl = float(config.registry.settings.get(
+        'adhocracy.principals_cache_ttl', 60))
+    if ttl > 0:
+        config.registry.principals_cache = PrincipalsCache(ttl)
@@ -41,6 +41,7 @@ root_acm = ACM().deserialize(
                      ['hide',                          None,       None,           None,          Allow,        None,      Allow,       Allow],
                      ['do_transition',                 None,       None,           None,          None,         None,      Allow,       Allow],
                      ['message_to_user',               None,       None,           Allow,         Allow,        None,      Allow,       Allow],
+                     ['view_auditlog',                 None,       None,           None,          Allow,        None,      None,        Allow],
                      # structure resources
                      ['create_pool',                   None,       None,           None,          None,         None,      None,        Allow],
                      ['create_organisation',           None,       None,           None,          None,         None,      None,        Allow],
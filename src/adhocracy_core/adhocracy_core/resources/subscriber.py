@@ -9,7 +9,11 @@ from pyramid.request import Request
 from pyramid.settings import asbool
 from pyramid.traversal import find_interface
 from pyramid.i18n import TranslationStringFactory
+from pyramid.threadlocal import get_current_registry
+from substanced.interfaces import IObjectWillBeRemoved
 from substanced.util import find_service
+from zope.interface import Interface
+import transaction
 
 from adhocracy_core.interfaces import IResource
 from adhocracy_core.interfaces import IItem
@@ -26,9 +30,11 @@ from adhocracy_core.interfaces import IResourceSheetModified
 from adhocracy_core.interfaces import VisibilityChange
 from adhocracy_core.interfaces import search_query
 from adhocracy_core.interfaces import ReferenceComparator
+from adhocracy_core.authentication import delete_user_tokens
 from adhocracy_core.resources.principal import IGroup
 from adhocracy_core.resources.principal import IUser
 from adhocracy_core.resources.principal import IPasswordReset
+from adhocracy_core.resources.principal import get_principals_cache
 from adhocracy_core.resources.asset import add_metadata
 from adhocracy_core.resources.asset import IAsset
 from adhocracy_core.resources.image import add_image_size_downloads
@@ -36,6 +42,7 @@ from adhocracy_core.resources.image import IImage
 from adhocracy_core.resources.comment import IComment
 from adhocracy_core.resources.comment import ICommentVersion
 from adhocracy_core.sheets.principal import IPermissions
+from adhocracy_core.sheets.principal import IPasswordAuthentication
 from adhocracy_core.sheets.tags import ITags
 from adhocracy_core.exceptions import AutoUpdateNoForkAllowedError
 from adhocracy_core.utils import find_graph
@@ -245,6 +252,11 @@ def send_password_reset_mail(event):
     event.registry.messenger.send_password_reset_mail(user, password_reset)
 
 
+def delete_user_tokens_after_password_changed(event):
+    """Delete all authentication tokens if the user password is changed."""
+    delete_user_tokens(event.object, registry=event.registry)
+
+
 def send_activation_mail_or_activate_user(event):
     """Send mail with activation link if a user is created.
 
@@ -343,6 +355,23 @@ def update_comments_count(resource: ICommentVersion,
                               omit_readonly=False)
 
 
+def clear_principals_cache(event, *args):
+    """Clear the principals cache if groups or roles change.
+
+    Local roles are not cached, they are added per context by the
+    authorization policy.
+
+    The cache is cleared again after commit, so principals read by
+    concurrent requests or aborted transactions are not kept.
+    """
+    registry = getattr(event, 'registry', None) or get_current_registry()
+    cache = get_principals_cache(registry)
+    if cache is None:
+        return
+    cache.clear()
+    transaction.get().addAfterCommitHook(lambda success: cache.clear())
+
+
 def includeme(config):
     """Register subscribers."""
     config.add_subscriber(autoupdate_versionable_has_new_version,
@@ -366,6 +395,10 @@ def includeme(config):
     config.add_subscriber(update_modification_date_modified_by,
                           IResourceSheetModified,
                           object_iface=IMetadata)
+    config.add_subscriber(delete_user_tokens_after_password_changed,
+                          IResourceSheetModified,
+                          object_iface=IUser,
+                          event_isheet=IPasswordAuthentication)
     config.add_subscriber(send_password_reset_mail,
                           IResourceCreatedAndAdded,
                           object_iface=IPasswordReset)
@@ -387,3 +420,13 @@ def includeme(config):
                           IResourceSheetModified,
                           object_iface=IComment,
                           event_isheet=IMetadata)
+    config.add_subscriber(clear_principals_cache,
+                          IResourceSheetModified,
+                          event_isheet=IPermissions)
+    config.add_subscriber(clear_principals_cache,
+                          IResourceSheetModified,
+                          event_isheet=sheets.principal.IGroup)
+    config.add_subscriber(clear_principals_cache,
+                          [IObjectWillBeRemoved, IUser, Interface])
+    config.add_subscriber(clear_principals_cache,
+                          [IObjectWillBeRemoved, IGroup, Interface])
@@ -283,6 +283,25 @@ class TestPasswordReset:
         new_password = user.password
         assert old_password != new_password
 
+    @mark.usefixtures('integration')
+    def test_delete_user_tokens_after_reset_password(self, registry,
+                                                     principals):
+        from pyramid.traversal import find_root
+        from pyramid.traversal import resource_path
+        from adhocracy_core.interfaces import ITokenManger
+        from . import principal
+        user = registry.content.create(principal.IUser.__identifier__,
+                                       parent=principals['users'],
+                                       appstructs={})
+        reset = registry.content.create(principal.IPasswordReset.__identifier__,
+                                        parent=principals['resets'],
+                                        creator=user)
+        tokenmanager = registry.getAdapter(find_root(user), ITokenManger)
+        token = tokenmanager.create_token(resource_path(user))
+        reset.reset_password('new_password')
+        with pytest.raises(KeyError):
+            tokenmanager.get_user_id(token)
+
     @mark.usefixtures('integration')
     def test_suicide_after_reset_password(self, registry, principals):
         from . import principal
@@ -517,6 +536,99 @@ class TestGroupsAndRolesFinder:
         assert self.call_fut('userid', request) == ['group:Readers']
 
 
+class TestPrincipalsCache:
+
+    @fixture
+    def inst(self):
+        from .principal import PrincipalsCache
+        return PrincipalsCache(60, maxsize=2)
+
+    def test_create(self, inst):
+        from adhocracy_core.utils import LRUCache
+        assert isinstance(inst, LRUCache)
+        assert inst.ttl == 60
+        assert inst.maxsize == 2
+
+    def test_get_missing(self, inst):
+        assert inst.get('userid') is None
+
+    def test_set_and_get(self, inst):
+        inst.set('userid', ['group:a', 'role:reader'])
+        assert inst.get('userid') == ['group:a', 'role:reader']
+        assert len(inst) == 1
+
+    def test_get_expired(self, inst):
+        inst.ttl = -1
+        inst.set('userid', ['role:reader'])
+        assert inst.get('userid') is None
+        assert len(inst) == 0
+
+    def test_set_remove_least_recently_used(self, inst):
+        inst.set('user1', [])
+        inst.set('user2', [])
+        inst.get('user1')
+        inst.set('user3', [])
+        assert inst.get('user2') is None
+        assert inst.get('user1') == []
+
+    def test_clear(self, inst):
+        inst.set('userid', [])
+        inst.clear()
+        assert len(inst) == 0
+
+
+class TestGroupsAndRolesFinderWithCache:
+
+    @fixture
+    def cache(self, registry):
+        from .principal import PrincipalsCache
+        registry.principals_cache = PrincipalsCache(60)
+        return registry.principals_cache
+
+    @fixture
+    def request(self, context, registry):
+        request = testing.DummyRequest(context=context)
+        request.registry = registry
+        return request
+
+    def call_fut(self, userid, request):
+        from adhocracy_core.resources.principal import groups_and_roles_finder
+        return groups_and_roles_finder(userid, request)
+
+    def test_cache_principals(self, request, cache, mock_user_locator):
+        mock_user_locator.get_groupids.return_value = ['group:a']
+        mock_user_locator.get_role_and_group_roleids.return_value = ['role:x']
+        assert self.call_fut('userid', request) == ['group:a', 'role:x']
+        mock_user_locator.get_groupids.return_value = []
+        assert self.call_fut('userid', request) == ['group:a', 'role:x']
+        assert cache.get('userid') == ['group:a', 'role:x']
+
+    def test_ignore_wrong_userid(self, request, cache, mock_user_locator):
+        assert self.call_fut('WRONG', request) == []
+        assert len(cache) == 0
+
+
+@mark.usefixtures('integration')
+class TestPrincipalsCacheIntegration:
+
+    def test_includeme_add_cache(self, registry):
+        from .principal import PrincipalsCache
+        assert isinstance(registry.principals_cache, PrincipalsCache)
+
+    def test_clear_cache_if_roles_modified(self, registry, principals):
+        from adhocracy_core import sheets
+        from adhocracy_core.utils import get_sheet
+        from . import principal
+        user = registry.content.create(principal.IUser.__identifier__,
+                                       parent=principals['users'])
+        cache = registry.principals_cache
+        cache.set('userid', [])
+        sheet = get_sheet(user, sheets.principal.IPermissions,
+                          registry=registry)
+        sheet.set({'roles': ['admin']})
+        assert len(cache) == 0
+
+
 class TestDeleteNotActiveUsers:
 
     @fixture
@@ -450,6 +450,34 @@ class TestSendPasswordResetMail:
                                                                    event.object)
 
 
+class TestDeleteUserTokensAfterPasswordChanged:
+
+    @fixture
+    def tokenmanager(self, registry):
+        from zope.interface import Interface
+        from adhocracy_core.interfaces import ITokenManger
+        tokenmanager = Mock()
+        registry.registerAdapter(lambda x: tokenmanager,
+                                 required=(Interface,),
+                                 provided=ITokenManger)
+        return tokenmanager
+
+    @fixture
+    def event(self, context, registry):
+        context['user'] = testing.DummyResource()
+        event.object = context['user']
+        event.registry = registry
+        return event
+
+    def call_fut(self, event):
+        from .subscriber import delete_user_tokens_after_password_changed
+        return delete_user_tokens_after_password_changed(event)
+
+    def test_call(self, event, tokenmanager):
+        self.call_fut(event)
+        tokenmanager.delete_user_tokens.assert_called_with('/user')
+
+
 class TestSendAcitvationMail:
 
     @fixture
@@ -653,6 +681,41 @@ class TestUpdateCommentsCountAfterVisibilityChange:
         assert mock_update.called_with(comment_v0, 1, event.registry)
 
 
+class TestClearPrincipalsCache:
+
+    @fixture
+    def cache(self, registry):
+        from .principal import PrincipalsCache
+        registry.principals_cache = PrincipalsCache(60)
+        registry.principals_cache.set('userid', [])
+        return registry.principals_cache
+
+    @fixture
+    def event(self, registry):
+        return testing.DummyResource(registry=registry)
+
+    def call_fut(self, event):
+        from .subscriber import clear_principals_cache
+        return clear_principals_cache(event)
+
+    def test_clear_cache(self, event, cache):
+        self.call_fut(event)
+        assert len(cache) == 0
+
+    def test_clear_cache_after_commit(self, event, cache):
+        import transaction
+        self.call_fut(event)
+        cache.set('userid', [])
+        hooks = list(transaction.get().getAfterCommitHooks())
+        transaction.abort()
+        hook, args, kwargs = hooks[-1]
+        hook(True)
+        assert len(cache) == 0
+
+    def test_ignore_without_cache(self, event):
+        assert self.call_fut(event) is None
+
+
 @mark.usefixtures('integration')
 def test_register_subscriber(registry):
     from adhocracy_core.resources import subscriber
@@ -662,11 +725,11 @@ def test_register_subscriber(registry):
     assert subscriber.add_default_group_to_user.__name__ in handlers
     assert subscriber.update_modification_date_modified_by.__name__ in handlers
     assert subscriber.send_password_reset_mail.__name__ in handlers
+    assert subscriber.delete_user_tokens_after_password_changed.__name__ in handlers
     assert subscriber.send_activation_mail_or_activate_user.__name__ in handlers
     assert subscriber.update_asset_download.__name__ in handlers
     assert subscriber.update_image_downloads.__name__ in handlers
     assert subscriber.decrease_comments_count.__name__ in handlers
     assert subscriber.increase_comments_count.__name__ in handlers
     assert subscriber.update_comments_count_after_visibility_change.__name__ in handlers
-
-
+    assert subscriber.clear_principals_cache.__name__ in handlers
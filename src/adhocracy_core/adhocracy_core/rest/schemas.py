@@ -7,6 +7,7 @@ from colander import Invalid
 from hypatia.interfaces import IIndexSort
 from multipledispatch import dispatch
 from pyramid.registry import Registry
+from pyramid.settings import asbool
 from pyramid.request import Request
 from pyramid.util import DottedNameResolver
 from substanced.catalog.indexes import SDIndex
@@ -55,6 +56,9 @@ from adhocracy_core.sheets.metadata import IMetadata
 from adhocracy_core.sheets.principal import IPasswordAuthentication
 from adhocracy_core.sheets.principal import IUserExtended
 from adhocracy_core.catalog import ICatalogsService
+from adhocracy_core.catalog.cursor import decode_cursor
+from adhocracy_core.catalog.cursor import decode_index_cursor
+from adhocracy_core.catalog.cursor import supports_cursor
 from adhocracy_core.catalog.index import ReferenceIndex
 from adhocracy_core.utils import get_sheet
 from adhocracy_core.utils import now
@@ -295,6 +299,18 @@ class POSTLoginEmailRequestSchema(colander.Schema):
     password = Password(missing=colander.required)
 
 
+class GETAuditlogRequestSchema(colander.Schema):
+    """GET parameters accepted for auditlog queries."""
+
+    path = AbsolutePath(missing='')
+    user_path = AbsolutePath(missing='')
+    min_date = DateTime(missing=None)
+    max_date = DateTime(missing=None)
+    after = DateTime(missing=None)
+    limit = Integer(missing=100,
+                    validator=colander.Range(min=1, max=1000))
+
+
 class POSTReportAbuseViewRequestSchema(colander.Schema):
     """Schema for abuse reports."""
 
@@ -408,6 +424,52 @@ def deferred_validate_sort(node: SchemaNode, kw: dict):
     return colander.OneOf(valid_indexes)
 
 
+def validate_cursor(node: SchemaNode, value: str):
+    """Validate if `value` is a pagination cursor."""
+    try:
+        decode_cursor(value)
+    except ValueError:
+        raise colander.Invalid(node, 'Invalid cursor')
+
+
+@colander.deferred
+def deferred_validate_cursor_sort(node: SchemaNode, kw: dict):
+    """Validate if the `sort` index supports pagination with `cursor`."""
+    context = kw['context']
+    indexes = dict((x.__name__, x) for x in _get_indexes(context))
+
+    def validate_cursor_sort(node, value):
+        if 'cursor' not in value:
+            return
+        index = indexes.get(value.get('sort', None), None)
+        if index is None or not supports_cursor(index):
+            raise colander.Invalid(node['cursor'],
+                                   'Pagination with cursor requires to sort'
+                                   ' by a field index')
+        try:
+            decode_index_cursor(index, value['cursor'])
+        except ValueError:
+            raise colander.Invalid(node['cursor'],
+                                   'Invalid cursor for the sort index')
+    return validate_cursor_sort
+
+
+@colander.deferred
+def deferred_validate_explain(node: SchemaNode, kw: dict):
+    """Validate if explaining searches is enabled.
+
+    The setting `adhocracy.catalog.explain` enables this debug parameter.
+    """
+    registry = kw.get('registry', None)
+    settings = getattr(registry, 'settings', None) or {}
+    enabled = asbool(settings.get('adhocracy.catalog.explain', False))
+
+    def validate_explain(node, value):
+        if value and not enabled:
+            raise colander.Invalid(node, 'Explaining searches is disabled')
+    return validate_explain
+
+
 def _get_indexes(context) -> list:
     indexes = []
     system = find_catalog(context, 'system') or {}
@@ -421,6 +483,8 @@ class GETPoolRequestSchema(colander.Schema):
 
     """GET parameters accepted for pool queries."""
 
+    validator = deferred_validate_cursor_sort
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Raise if unknown to tell client the query parameters are wrong.
@@ -449,6 +513,12 @@ class GETPoolRequestSchema(colander.Schema):
     # TODO: validate limit, offset to be multiple of 10, 20, 50, 100, 200, 500
     limit = SchemaNode(colander.Int(), missing=colander.drop)
     offset = SchemaNode(colander.Int(), missing=colander.drop)
+    cursor = SchemaNode(colander.String(),
+                        missing=colander.drop,
+                        validator=validate_cursor)
+    explain = SchemaNode(colander.Boolean(),
+                         missing=colander.drop,
+                         validator=deferred_validate_explain)
     aggregateby = SchemaNode(colander.String(),
                              missing=colander.drop,
                              validator=deferred_validate_aggregateby)
@@ -492,6 +562,10 @@ class GETPoolRequestSchema(colander.Schema):
             search_query['limit'] = appstruct['limit']
         if 'offset' in appstruct:
             search_query['offset'] = appstruct['offset']
+        if 'cursor' in appstruct:
+            search_query['cursor'] = appstruct['cursor']
+        if 'explain' in appstruct:
+            search_query['explain'] = appstruct['explain']
         if 'reverse' in appstruct:
             search_query['reverse'] = appstruct['reverse']
         if 'count' in appstruct:
@@ -711,6 +711,57 @@ class TestGETPoolRequestSchema:
         inst.add(node)
         assert inst.deserialize(cstruct) == wanted
 
+    def test_deserialize_cursor(self, inst, context):
+        from hypatia.field import FieldIndex
+        from adhocracy_core.catalog.cursor import encode_cursor
+        context['catalogs']['system']['name'] = FieldIndex('name')
+        inst = inst.bind(context=context)
+        cursor = encode_cursor('name', 1)
+        appstruct = inst.deserialize({'cursor': cursor, 'sort': 'name'})
+        assert appstruct['cursor'] == cursor
+
+    def test_deserialize_cursor_invalid_without_sort(self, inst, context):
+        from adhocracy_core.catalog.cursor import encode_cursor
+        inst = inst.bind(context=context)
+        with raises(colander.Invalid):
+            inst.deserialize({'cursor': encode_cursor('name', 1)})
+
+    def test_deserialize_cursor_invalid_if_sort_not_supported(self, inst,
+                                                              context):
+        from adhocracy_core.catalog.cursor import encode_cursor
+        catalog = context['catalogs']['adhocracy']
+        catalog['index1'] = testing.DummyResource(sort=lambda x: x)
+        inst = inst.bind(context=context)
+        with raises(colander.Invalid):
+            inst.deserialize({'cursor': encode_cursor('name', 1),
+                              'sort': 'index1'})
+
+    def test_deserialize_cursor_invalid_value_type(self, inst, context):
+        from hypatia.field import FieldIndex
+        from adhocracy_core.catalog.cursor import encode_cursor
+        index = FieldIndex('rates')
+        index.index_doc(1, testing.DummyResource(rates=3))
+        context['catalogs']['system']['rates'] = index
+        inst = inst.bind(context=context)
+        with raises(colander.Invalid):
+            inst.deserialize({'cursor': encode_cursor('x', 1),
+                              'sort': 'rates'})
+
+    def test_deserialize_cursor_invalid(self, inst, context):
+        inst = inst.bind(context=context)
+        with raises(colander.Invalid):
+            inst.deserialize({'cursor': 'invalid'})
+
+    def test_deserialize_explain(self, inst, context, registry):
+        registry.settings['adhocracy.catalog.explain'] = 'true'
+        inst = inst.bind(context=context, registry=registry)
+        assert inst.deserialize({'explain': 'true'})['explain'] is True
+
+    def test_deserialize_explain_raise_if_disabled(self, inst, context):
+        inst = inst.bind(context=context)
+        with raises(colander.Invalid):
+            inst.deserialize({'explain': 'true'})
+
     def test_deserialize_valid_elements_path(self, inst, context):
         inst = inst.bind(context=context)
         cstruct = {'elements': 'paths'}
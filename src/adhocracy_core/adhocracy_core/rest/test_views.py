@@ -591,6 +591,31 @@ class TestSimpleRESTView:
         assert mock_sheet.set.call_args[0][0] == {'x': 'y'}
 
 
+class TestStreamJSONResponse:
+
+    def call_fut(self, *args, **kwargs):
+        from adhocracy_core.rest.views import stream_json_response
+        return stream_json_response(*args, **kwargs)
+
+    def test_stream_json_response(self, request_):
+        from json import dumps
+        cstruct = {'a': [1, 'x'], 'b': {'c': None, 'd': iter([{'e': 1}, 2])},
+                   'f': iter([])}
+        response = self.call_fut(cstruct, request_)
+        assert response is request_.response
+        assert response.content_type == 'application/json'
+        assert response.body == dumps({'a': [1, 'x'],
+                                       'b': {'c': None, 'd': [{'e': 1}, 2]},
+                                       'f': []}).encode()
+        assert response.content_length == len(response.body)
+
+    def test_stream_json_response_bigger_than_max_size(self, request_):
+        from json import loads
+        cstruct = {'elements': iter(['x' * 10 for x in range(10)])}
+        response = self.call_fut(cstruct, request_, max_size=10)
+        assert loads(response.text) == {'elements': ['x' * 10] * 10}
+
+
 class TestPoolRESTView:
 
     def make_one(self, context, request_):
@@ -634,7 +659,27 @@ class TestPoolRESTView:
         assert mock_sheet.get_cstruct.call_args[1] == {'params': {'param1': 1,
                                                        'depth': 1,
                                                        'root': context,
-                                                       }}
+                                                       },
+                                                       'lazy': False}
+
+    def test_get_pool_sheet_with_serialization_content(self, request_,
+                                                       context, mock_sheet):
+        from json import loads
+        from adhocracy_core.sheets.pool import IPool
+        mock_sheet.meta = mock_sheet.meta._replace(isheet=IPool)
+        mock_sheet.get_cstruct.return_value = {
+            'elements': iter([{'path': 'http://example.com/child/'}])}
+        request_.registry.content.get_sheets_read.return_value = [mock_sheet]
+        request_.validated['serialization_form'] = 'content'
+
+        inst = self.make_one(context, request_)
+        response = inst.get()
+
+        assert response is request_.response
+        assert response.content_type == 'application/json'
+        assert loads(response.text)['data'] == {IPool.__identifier__: {
+            'elements': [{'path': 'http://example.com/child/'}]}}
+        assert mock_sheet.get_cstruct.call_args[1]['lazy'] is True
 
     def test_post(self, request_, context):
         request_.root = context
@@ -1521,6 +1566,130 @@ class TestMessageUserView:
         assert inst.options() == {}
 
 
+class TestAuditlogView:
+
+    @fixture
+    def mock_query_auditlog(self, monkeypatch):
+        from . import views
+        mock = Mock(spec=views.query_auditlog)
+        mock.return_value = iter([])
+        monkeypatch.setattr(views, 'query_auditlog', mock)
+        return mock
+
+    @fixture
+    def entries(self):
+        from datetime import datetime
+        from adhocracy_core.interfaces import AuditlogAction
+        from adhocracy_core.interfaces import AuditlogEntry
+        entry = AuditlogEntry(AuditlogAction.created, '/proposal', 'god',
+                              '/principals/users/0000000')
+        return [(datetime(2015, 1, 1, 0, 0, x), entry) for x in range(3)]
+
+    def make_one(self, context, request):
+        from adhocracy_core.rest.views import AuditlogView
+        return AuditlogView(context, request)
+
+    def test_create(self, context, request_):
+        from .views import RESTView
+        from .schemas import GETAuditlogRequestSchema
+        inst = self.make_one(context, request_)
+        assert isinstance(inst, RESTView)
+        assert inst.validation_GET == (GETAuditlogRequestSchema, [])
+
+    def test_options_with_permission(self, context, request_):
+        inst = self.make_one(context, request_)
+        assert inst.options() == {'GET': {}}
+
+    def test_options_without_permission(self, context, request_):
+        from pyramid.request import Request
+        request_.has_permission = Mock(spec=Request.has_permission,
+                                       return_value=False)
+        inst = self.make_one(context, request_)
+        assert inst.options() == {}
+
+    def test_get_empty(self, context, request_, mock_query_auditlog):
+        inst = self.make_one(context, request_)
+        assert inst.get() == {'entries': []}
+        mock_query_auditlog.assert_called_with(context, path='',
+                                               user_path='', min=None,
+                                               max=None, excludemin=False)
+
+    def test_get_entries(self, context, request_, mock_query_auditlog,
+                         entries):
+        mock_query_auditlog.return_value = iter(entries[:1])
+        inst = self.make_one(context, request_)
+        assert inst.get() == {'entries': [
+            {'date': '2015-01-01T00:00:00+00:00',
+             'name': 'created',
+             'resource_path': '/proposal',
+             'user_name': 'god',
+             'user_path': '/principals/users/0000000'}]}
+
+    def test_get_entries_with_tuple_name(self, context, request_,
+                                         mock_query_auditlog, entries):
+        key, entry = entries[0]
+        entry = entry._replace(name=(entry.name,))
+        mock_query_auditlog.return_value = iter([(key, entry)])
+        inst = self.make_one(context, request_)
+        assert inst.get()['entries'][0]['name'] == 'created'
+
+    def test_get_entries_with_limit(self, context, request_,
+                                    mock_query_auditlog, entries):
+        mock_query_auditlog.return_value = iter(entries)
+        request_.GET['limit'] = '2'
+        inst = self.make_one(context, request_)
+        result = inst.get()
+        assert len(result['entries']) == 2
+        assert result['next'] == '2015-01-01T00:00:01+00:00'
+
+    def test_get_filters(self, context, request_, mock_query_auditlog):
+        from datetime import datetime
+        request_.GET['path'] = '/organisation'
+        request_.GET['user_path'] = '/principals/users/0000000'
+        request_.GET['min_date'] = '2015-01-01T01:00:00+01:00'
+        request_.GET['max_date'] = '2015-02-01T00:00:00+00:00'
+        inst = self.make_one(context, request_)
+        inst.get()
+        mock_query_auditlog.assert_called_with(
+            context,
+            path='/organisation',
+            user_path='/principals/users/0000000',
+            min=datetime(2015, 1, 1),
+            max=datetime(2015, 2, 1),
+            excludemin=False)
+
+    def test_get_after(self, context, request_, mock_query_auditlog):
+        from datetime import datetime
+        request_.GET['min_date'] = '2014-01-01T00:00:00+00:00'
+        request_.GET['after'] = '2015-01-01T00:00:01.000100+00:00'
+        inst = self.make_one(context, request_)
+        inst.get()
+        assert mock_query_auditlog.call_args[1]['min'] ==\
+            datetime(2015, 1, 1, 0, 0, 1, 100)
+        assert mock_query_auditlog.call_args[1]['excludemin']
+
+    def test_get_after_without_min_date(self, context, request_,
+                                        mock_query_auditlog):
+        from datetime import datetime
+        request_.GET['after'] = '2015-01-01T00:00:01+00:00'
+        inst = self.make_one(context, request_)
+        inst.get()
+        assert mock_query_auditlog.call_args[1]['min'] ==\
+            datetime(2015, 1, 1, 0, 0, 1)
+        assert mock_query_auditlog.call_args[1]['excludemin']
+
+    def test_get_after_before_min_date(self, context, request_,
+                                       mock_query_auditlog):
+        from datetime import datetime
+        request_.GET['min_date'] = '2016-01-01T00:00:00+00:00'
+        request_.GET['after'] = '2015-01-01T00:00:01+00:00'
+        inst = self.make_one(context, request_)
+        inst.get()
+        assert mock_query_auditlog.call_args[1]['min'] ==\
+            datetime(2016, 1, 1)
+        assert not mock_query_auditlog.call_args[1]['excludemin']
+
+
 class TestAssetsServiceRESTView:
 
     def make_one(self, context, request):
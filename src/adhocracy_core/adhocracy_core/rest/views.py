@@ -1,7 +1,13 @@
 """GET/POST/PUT requests processing."""
 from collections import defaultdict
+from collections.abc import Iterator
 from copy import deepcopy
+from datetime import datetime
+from datetime import timezone
+from itertools import islice
+from json import dumps
 from logging import getLogger
+from tempfile import SpooledTemporaryFile
 
 from colander import Invalid
 from colander import MappingSchema
@@ -14,6 +20,8 @@ from pyramid.httpexceptions import HTTPMethodNotAllowed
 from pyramid.httpexceptions import HTTPGone
 from pyramid.httpexceptions import HTTPBadRequest
 from pyramid.request import Request
+from pyramid.response import FileIter
+from pyramid.response import Response
 from pyramid.view import view_config
 from pyramid.view import view_defaults
 from pyramid.security import remember
@@ -21,6 +29,9 @@ from pyramid.traversal import resource_path
 from zope.interface.interfaces import IInterface
 from zope.interface import Interface
 
+from adhocracy_core.auditing import query_auditlog
+from adhocracy_core.caching import get_cached_options_data
+from adhocracy_core.caching import get_cached_response_data
 from adhocracy_core.caching import set_cache_header
 from adhocracy_core.events import ResourceSheetModified
 from adhocracy_core.interfaces import IResource
@@ -30,6 +41,7 @@ from adhocracy_core.interfaces import ISimple
 from adhocracy_core.interfaces import ISheet
 from adhocracy_core.interfaces import IPool
 from adhocracy_core.interfaces import ILocation
+from adhocracy_core.interfaces import AuditlogEntry
 from adhocracy_core.resources.asset import IAsset
 from adhocracy_core.resources.asset import IAssetDownload
 from adhocracy_core.resources.asset import IAssetsService
@@ -48,6 +60,7 @@ from adhocracy_core.rest.schemas import POSTMessageUserViewRequestSchema
 from adhocracy_core.rest.schemas import POSTCreatePasswordResetRequestSchema
 from adhocracy_core.rest.schemas import POSTPasswordResetRequestSchema
 from adhocracy_core.rest.schemas import POSTReportAbuseViewRequestSchema
+from adhocracy_core.rest.schemas import GETAuditlogRequestSchema
 from adhocracy_core.rest.schemas import POSTResourceRequestSchema
 from adhocracy_core.rest.schemas import POSTAssetRequestSchema
 from adhocracy_core.rest.schemas import PUTResourceRequestSchema
@@ -362,6 +375,45 @@ class RESTView:
         return result
 
 
+def stream_json_response(cstruct: dict, request: Request,
+                         max_size: int=1024 * 1024) -> Response:
+    """Return `request.response` with the JSON encoded `cstruct` as body.
+
+    Iterators in `cstruct` are encoded item by item, so the items don't
+    need to be in memory at the same time. The body is written to a
+    temporary file that is kept in memory up to `max_size` bytes.
+    The result is the same as with the pyramid `json` renderer.
+    """
+    body = SpooledTemporaryFile(max_size=max_size)
+    _write_json(cstruct, lambda x: body.write(x.encode()))
+    response = request.response
+    response.content_type = 'application/json'
+    response.content_length = body.tell()
+    body.seek(0)
+    response.app_iter = FileIter(body)
+    return response
+
+
+def _write_json(value: object, write: callable):
+    if isinstance(value, dict):
+        write('{')
+        for index, (key, item) in enumerate(value.items()):
+            if index:
+                write(', ')
+            write(dumps(key) + ': ')
+            _write_json(item, write)
+        write('}')
+    elif isinstance(value, Iterator):
+        write('[')
+        for index, item in enumerate(value):
+            if index:
+                write(', ')
+            write(dumps(item))
+        write(']')
+    else:
+        write(dumps(value))
+
+
 def _get_schema_and_validators(view_class, request: Request) -> tuple:
     http_method = request.method.upper()
     validation_attr = 'validation_' + http_method
@@ -386,7 +438,9 @@ class ResourceRESTView(RESTView):
     def options(self) -> dict:
         """Get possible request/response data structures and http methods."""
         with statsd_timer('process.options', rate=.1, registry=self.registry):
-            cstruct = self._options(self.context, self.request)
+            cstruct = get_cached_options_data(
+                self.context, self.request,
+                lambda: self._options(self.context, self.request))
         return cstruct
 
     def _options(self, context: IResource, request: Request) -> dict:
@@ -473,7 +527,8 @@ class ResourceRESTView(RESTView):
             schema = GETResourceResponseSchema().bind(request=self.request,
                                                       context=self.context)
             cstruct = schema.serialize()
-            cstruct['data'] = self._get_sheets_data_cstruct()
+            cstruct['data'] = get_cached_response_data(
+                self.context, self.request, self._get_sheets_data_cstruct)
         return cstruct
 
     def _get_get_metric_name(self) -> str:
@@ -482,7 +537,7 @@ class ResourceRESTView(RESTView):
         else:
             return 'process.get.query'
 
-    def _get_sheets_data_cstruct(self):
+    def _get_sheets_data_cstruct(self, lazy=False):
         queryparams = self.request.validated if self.request.validated else {}
         sheets_view = self.content.get_sheets_read(self.context,
                                                    self.request)
@@ -490,7 +545,8 @@ class ResourceRESTView(RESTView):
         for sheet in sheets_view:
             key = sheet.meta.isheet.__identifier__
             if sheet.meta.isheet is IPoolSheet:
-                cstruct = sheet.get_cstruct(self.request, params=queryparams)
+                cstruct = sheet.get_cstruct(self.request, params=queryparams,
+                                            lazy=lazy)
             else:
                 cstruct = sheet.get_cstruct(self.request)
             data_cstruct[key] = cstruct
@@ -543,10 +599,23 @@ class PoolRESTView(SimpleRESTView):
     @view_config(request_method='GET',
                  permission='view')
     def get(self) -> dict:
-        """Get resource data."""
-        # This delegation method is necessary since otherwise validation_GET
-        # won't be found.
-        return super().get()
+        """Get resource data.
+
+        If the elements are serialized as content the response body is
+        written element by element, see :func:`stream_json_response`.
+        """
+        if self.request.validated.get('serialization_form') != 'content':
+            # This delegation method is necessary since otherwise
+            # validation_GET won't be found.
+            return super().get()
+        with statsd_timer('process.get.stream', rate=.1,
+                          registry=self.registry):
+            schema = GETResourceResponseSchema().bind(request=self.request,
+                                                      context=self.context)
+            cstruct = schema.serialize()
+            cstruct['data'] = self._get_sheets_data_cstruct(lazy=True)
+            response = stream_json_response(cstruct, self.request)
+        return response
 
     def build_post_response(self, resource) -> dict:
         """Build response data structure for a POST request."""
@@ -628,7 +697,8 @@ class ItemRESTView(PoolRESTView):
             if first_version is not None:
                 appstruct['first_version_path'] = first_version
             cstruct = schema.serialize(appstruct)
-            cstruct['data'] = self._get_sheets_data_cstruct()
+            cstruct['data'] = get_cached_response_data(
+                self.context, self.request, self._get_sheets_data_cstruct)
         return cstruct
 
     @view_config(request_method='POST',
@@ -1262,6 +1332,80 @@ class PasswordResetView(RESTView):
         return _login_user(self.request)
 
 
+@view_defaults(
+    renderer='json',
+    context=IRootPool,
+    name='auditlog',
+)
+class AuditlogView(RESTView):
+    """Query the auditlog."""
+
+    validation_GET = (GETAuditlogRequestSchema, [])
+
+    @view_config(request_method='OPTIONS')
+    def options(self) -> dict:
+        """Return options for view."""
+        result = {}
+        if self.request.has_permission('view_auditlog', self.context):
+            result['GET'] = {}
+        return result
+
+    @view_config(request_method='GET',
+                 permission='view_auditlog')
+    def get(self) -> dict:
+        """Return auditlog entries ordered by date.
+
+        Only `limit` entries are returned, if there are more entries the
+        date of the last one is set as `next`. Pass it as `after` parameter
+        to get the following entries. If `min_date` is later than `after`
+        it is used instead.
+        """
+        data = self.request.validated
+        after = _to_naive_utc(data['after'])
+        min_date = _to_naive_utc(data['min_date'])
+        excludemin = after is not None and (min_date is None or
+                                            after >= min_date)
+        if excludemin:
+            min_date = after
+        entries = query_auditlog(self.context,
+                                 path=data['path'],
+                                 user_path=data['user_path'],
+                                 min=min_date,
+                                 max=_to_naive_utc(data['max_date']),
+                                 excludemin=excludemin)
+        limit = data['limit']
+        page = list(islice(entries, limit + 1))
+        result = {'entries': [_serialize_auditlog_entry(key, entry)
+                              for key, entry in page[:limit]]}
+        if len(page) > limit:
+            last_key = page[limit - 1][0]
+            result['next'] = _to_aware_utc(last_key).isoformat()
+        return result
+
+
+def _to_naive_utc(date: datetime) -> datetime:
+    """Convert to the naive utc datetime used as auditlog key."""
+    if date is None or date.tzinfo is None:
+        return date
+    return date.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _to_aware_utc(date: datetime) -> datetime:
+    return date.replace(tzinfo=timezone.utc)
+
+
+def _serialize_auditlog_entry(key: datetime, entry: AuditlogEntry) -> dict:
+    name = entry.name
+    if isinstance(name, tuple):  # BBB entries stored with tuple name
+        name = name[0]
+    return {'date': _to_aware_utc(key).isoformat(),
+            'name': getattr(name, 'value', name),
+            'resource_path': entry.resource_path,
+            'user_name': entry.user_name,
+            'user_path': entry.user_path,
+            }
+
+
 def includeme(config):
     """Register Views."""
     config.scan('.views')
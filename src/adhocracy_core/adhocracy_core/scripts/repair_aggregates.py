@@ -0,0 +1,66 @@
+"""Verify or repair the stored rates aggregates.
+
+This is registered as console script 'repair_aggregates' in setup.py.
+"""
+import argparse
+import inspect
+import logging
+import transaction
+
+from pyramid.paster import bootstrap
+from pyramid.traversal import resource_path
+from substanced.util import find_service
+
+from adhocracy_core.catalog.aggregate import repair_aggregate
+from adhocracy_core.interfaces import IResource
+from adhocracy_core.interfaces import search_query
+from adhocracy_core.sheets.rate import IRateable
+
+logger = logging.getLogger(__name__)
+
+
+def repair_aggregates():  # pragma: no cover
+    """Recompute the rates aggregates from scratch.
+
+    This adds the missing aggregates of rateables created before the
+    aggregates were introduced.
+
+    usage::
+
+        bin/repair_aggregates etc/development.ini --dry-run
+    """
+    docstring = inspect.getdoc(repair_aggregates)
+    parser = argparse.ArgumentParser(description=docstring)
+    parser.add_argument('ini_file',
+                        help='path to the adhocracy backend ini file')
+    parser.add_argument('-d',
+                        '--dry-run',
+                        help='only verify the aggregates, do not repair',
+                        action='store_true')
+    args = parser.parse_args()
+    env = bootstrap(args.ini_file)
+    _repair_aggregates(env['root'], dry_run=args.dry_run)
+    if not args.dry_run:
+        transaction.commit()
+    env['closer']()
+
+
+def _repair_aggregates(root: IResource, dry_run=False) -> int:
+    """Repair the rates aggregates of all rateables.
+
+    :returns: number of wrong or missing aggregates
+    """
+    catalogs = find_service(root, 'catalogs')
+    count = 0
+    query = search_query._replace(interfaces=IRateable, resolve=True)
+    resources = catalogs.search(query).elements
+    for resource in resources:
+        is_wrong = repair_aggregate(resource, 'rates', dry_run=dry_run)
+        if not is_wrong:
+            continue
+        count += 1
+        logger.warning('Wrong rates aggregate for {0}'
+                       .format(resource_path(resource)))
+        if not dry_run:
+            catalogs.reindex_index(resource, 'rates')
+    return count
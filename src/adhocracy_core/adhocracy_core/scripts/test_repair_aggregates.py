@@ -0,0 +1,50 @@
+from unittest.mock import call
+from pyramid import testing
+from pytest import fixture
+
+
+class TestRepairAggregates:
+
+    @fixture
+    def context(self, pool, mock_catalogs):
+        pool['catalogs'] = mock_catalogs
+        pool['rateable'] = testing.DummyResource()
+        return pool
+
+    @fixture
+    def mock_repair(self, mocker):
+        from . import repair_aggregates
+        return mocker.patch.object(repair_aggregates, 'repair_aggregate')
+
+    def call_fut(self, *args, **kwargs):
+        from .repair_aggregates import _repair_aggregates
+        return _repair_aggregates(*args, **kwargs)
+
+    def test_repair_rates(self, context, mock_catalogs, search_result,
+                          mock_repair):
+        search_result = search_result._replace(elements=[context['rateable']])
+        mock_catalogs.search.return_value = search_result
+        mock_repair.return_value = True
+        assert self.call_fut(context) == 1
+        assert mock_repair.call_args_list == [
+            call(context['rateable'], 'rates', dry_run=False)]
+        assert mock_catalogs.reindex_index.call_args_list == [
+            call(context['rateable'], 'rates')]
+
+    def test_ignore_valid(self, context, mock_catalogs, search_result,
+                          mock_repair):
+        search_result = search_result._replace(elements=[context['rateable']])
+        mock_catalogs.search.return_value = search_result
+        mock_repair.return_value = False
+        assert self.call_fut(context) == 0
+        assert not mock_catalogs.reindex_index.called
+
+    def test_dry_run(self, context, mock_catalogs, search_result,
+                     mock_repair):
+        search_result = search_result._replace(elements=[context['rateable']])
+        mock_catalogs.search.return_value = search_result
+        mock_repair.return_value = True
+        assert self.call_fut(context, dry_run=True) == 1
+        mock_repair.assert_called_with(context['rateable'], 'rates',
+                                       dry_run=True)
+        assert not mock_catalogs.reindex_index.called
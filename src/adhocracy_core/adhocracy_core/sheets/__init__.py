@@ -137,6 +137,8 @@ class BaseResourceSheet:
     def _yield_references(self, catalogs, fields, query, create_ref) -> iter:
         if not catalogs:
             return iter([])  # ease testing
+        fields = list(fields)
+        queries = []
         for field, node in fields:
             reference = create_ref(node)
             is_references_node = isinstance(node, schema.UniqueReferences)\
@@ -146,7 +148,10 @@ class BaseResourceSheet:
                                              sort_by='reference')
             else:  # search single reference or back references
                 query_field = query._replace(references=[reference])
-            elements = self._catalogs.search(query_field).elements
+            queries.append(query_field)
+        results = catalogs.search_many(queries) if queries else []
+        for (field, node), result in zip(fields, results):
+            elements = result.elements
             if len(elements) == 0:
                 continue
             if isinstance(node, schema.Reference):
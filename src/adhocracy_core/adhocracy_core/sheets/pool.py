@@ -68,10 +68,13 @@ class PoolSheet(AnnotationRessourceSheet):
                      'count': result.count,
                      'frequency_of': result.frequency_of,
                      'group_by': result.group_by,
+                     'cursor': result.cursor,
+                     'explain': result.explain,
                      }
         return appstruct
 
-    def get_cstruct(self, request: Request, params: dict=None) -> dict:
+    def get_cstruct(self, request: Request, params: dict=None,
+                    lazy: bool=False) -> dict:
         """Return cstruct data.
 
         Bind `request` and `self.context` to colander schema
@@ -93,6 +96,17 @@ class PoolSheet(AnnotationRessourceSheet):
             add 'count` field, defaults to False.
         show_frequency (bool):
             add 'aggregateby` field. defaults to False.
+
+        If `limit` is set the `cursor` field is added, use it as `cursor`
+        param to get the next page. It is empty if the page is not full or
+        the result is not sorted by a field index.
+
+        If `explain` is set the `explain` field is added with the result
+        sizes and times of the search index queries.
+
+        :param lazy: If True and `serialization_form` is `content` the
+                     `elements` value is an iterator that serializes the
+                     resources one by one.
         """
         params = params or {}
         filter_view_permission = asbool(self.registry.settings.get(
@@ -113,7 +127,14 @@ class PoolSheet(AnnotationRessourceSheet):
             appstruct['aggregateby'] = {index_name: frequency}
         # TODO: rename aggregateby in frequency_of
         schema = self._get_schema_for_cstruct(request, params)
+        is_lazy = lazy and params.get('serialization_form', False) == 'content'
+        if is_lazy:
+            elements = appstruct.get('elements', [])
+            appstruct['elements'] = []
         cstruct = schema.serialize(appstruct)
+        if is_lazy:
+            node = schema['elements'].children[0]
+            cstruct['elements'] = (node.serialize(x) for x in elements)
         return cstruct
 
     def _get_schema_for_cstruct(self, request, params: dict):
@@ -129,6 +150,18 @@ class PoolSheet(AnnotationRessourceSheet):
                                         missing=colander.drop,
                                         name='count')
             schema.add(child)
+        if params.get('limit', False):
+            child = colander.SchemaNode(colander.String(),
+                                        default='',
+                                        missing=colander.drop,
+                                        name='cursor')
+            schema.add(child)
+        if params.get('explain', False):
+            child = colander.SchemaNode(colander.Mapping(unknown='preserve'),
+                                        default={},
+                                        missing=colander.drop,
+                                        name='explain')
+            schema.add(child)
         if params.get('show_frequency', False):
             child = colander.SchemaNode(colander.Mapping(unknown='preserve'),
                                         default={},
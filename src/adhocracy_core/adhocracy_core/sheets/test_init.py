@@ -241,6 +241,17 @@ class TestBaseResourceSheet:
                                       )
         assert sheet_catalogs.search.call_args[0][0] == query
 
+    def test_get_references_search_all_fields_at_once(
+            self, inst, sheet_catalogs, mock_node_unique_references,
+            mock_node_single_reference):
+        inst.schema.children.append(mock_node_unique_references)
+        inst.schema.children.append(mock_node_single_reference)
+        inst.get(add_back_references=False)
+        assert sheet_catalogs.search_many.call_count == 1
+        queries = sheet_catalogs.search_many.call_args[0][0]
+        assert [q.references[0].field for q in queries] == ['references',
+                                                            'reference']
+
     def test_get_back_reference(self, inst, context, sheet_catalogs,
                                 mock_node_single_reference):
         from adhocracy_core.interfaces import ISheet
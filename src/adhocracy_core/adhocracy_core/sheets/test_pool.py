@@ -59,6 +59,8 @@ class TestFilteringPoolSheet:
                              'frequency_of': {},
                              'group_by': {},
                              'count': 0,
+                             'cursor': '',
+                             'explain': {},
                              }
 
     def test_get_with_children(self, inst, context,  sheet_catalogs):
@@ -89,6 +91,8 @@ class TestFilteringPoolSheet:
                              'frequency_of': {'y': 1},
                              'group_by': {'y': [child]},
                              'count': 1,
+                             'cursor': '',
+                             'explain': {},
                              }
 
     def test_get_cstruct(self, inst, request_):
@@ -143,6 +147,28 @@ class TestFilteringPoolSheet:
               'data': {},
               'path': 'http://example.com/'}]
 
+    def test_get_cstruct_with_serialization_content_lazy(self, inst,
+                                                         request_):
+        inst.get = Mock()
+        child = testing.DummyResource()
+        inst.get.return_value = {'elements': [child]}
+        cstruct = inst.get_cstruct(request_,
+                                   params={'serialization_form': 'content'},
+                                   lazy=True)
+        assert not isinstance(cstruct['elements'], list)
+        assert list(cstruct['elements']) == \
+            [{'content_type': 'adhocracy_core.interfaces.IResource',
+              'data': {},
+              'path': 'http://example.com/'}]
+
+    def test_get_cstruct_lazy_without_serialization_content(self, inst,
+                                                            request_):
+        inst.get = Mock()
+        child = testing.DummyResource()
+        inst.get.return_value = {'elements': [child]}
+        cstruct = inst.get_cstruct(request_, lazy=True)
+        assert cstruct['elements'] == ['http://example.com/']
+
     def test_get_cstruct_with_serialization_omit(self, inst, request_):
         inst.get = Mock()
         child = testing.DummyResource()
@@ -159,6 +185,30 @@ class TestFilteringPoolSheet:
                                    params={'show_count': True})
         assert cstruct['count'] == '1'
 
+    def test_get_cstruct_with_limit(self, inst, request_):
+        inst.get = Mock()
+        inst.get.return_value = {'elements': [], 'cursor': 'CURSOR'}
+        cstruct = inst.get_cstruct(request_, params={'limit': 1})
+        assert cstruct['cursor'] == 'CURSOR'
+
+    def test_get_cstruct_without_limit(self, inst, request_):
+        inst.get = Mock()
+        inst.get.return_value = {'elements': [], 'cursor': ''}
+        cstruct = inst.get_cstruct(request_)
+        assert 'cursor' not in cstruct
+
+    def test_get_cstruct_with_explain(self, inst, request_):
+        inst.get = Mock()
+        inst.get.return_value = {'elements': [], 'explain': {'time': 1.0}}
+        cstruct = inst.get_cstruct(request_, params={'explain': True})
+        assert cstruct['explain'] == {'time': 1.0}
+
+    def test_get_cstruct_without_explain(self, inst, request_):
+        inst.get = Mock()
+        inst.get.return_value = {'elements': [], 'explain': {}}
+        cstruct = inst.get_cstruct(request_)
+        assert 'explain' not in cstruct
+
     def test_get_cstruct_with_show_aggregate(self, inst, request_):
         inst.get = Mock()
         child = testing.DummyResource()
@@ -199,6 +249,8 @@ class TestIntegrationPoolSheet:
                               'frequency_of': {},
                               'group_by': {},
                               'count': 0,
+                              'cursor': '',
+                              'explain': {},
                               }
 
     def test_get_custom_search_empty(self, registry, pool):
@@ -170,6 +170,7 @@ def pool_with_catalogs(integration, pool_graph):
 def integration(config) -> Configurator:
     """Include basic resource types and sheets."""
     config.include('adhocracy_core.events')
+    config.include('adhocracy_core.authorization')
     config.include('adhocracy_core.content')
     config.include('adhocracy_core.graph')
     config.include('adhocracy_core.catalog')
@@ -330,6 +331,9 @@ def mock_catalogs(search_result) -> Mock:
     search_mock = Mock(spec=CatalogsServiceAdhocracy.search)
     search_mock.return_value = search_result
     catalogs.search = search_mock
+    search_many_mock = Mock(spec=CatalogsServiceAdhocracy.search_many,
+                            side_effect=lambda x: [search_mock(q) for q in x])
+    catalogs.search_many = search_many_mock
     reindex_index_mock = Mock(spec=CatalogsServiceAdhocracy.reindex_index)
     catalogs.reindex_index = reindex_index_mock
     get_index_mock = Mock(spec=CatalogsServiceAdhocracy.get_index)
@@ -1,10 +1,12 @@
 """Helper functions shared between modules."""
 from collections import namedtuple
+from collections import OrderedDict
 from collections.abc import Iterable
 from collections.abc import Sequence
 from datetime import datetime
 from functools import reduce
 from pytz import UTC
+from threading import Lock
 import os
 import time
 import copy
@@ -485,3 +487,47 @@ def is_created_in_current_transaction(resource: IResource,
     """Check if `resource` is created during the current transaction."""
     changelog = get_changelog_metadata(resource, registry)
     return changelog.created
+
+
+class LRUCache:
+    """Thread safe in-process least recently used cache.
+
+    :param maxsize: maximal number of cached values
+    :param ttl: seconds until cached values expire, None to never expire
+    """
+
+    def __init__(self, maxsize: int, ttl: float=None):
+        """Initialize self."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        """Return the number of cached values."""
+        return len(self._data)
+
+    def get(self, key: tuple) -> object:
+        """Return cached value for `key` or None."""
+        with self._lock:
+            expires, value = self._data.get(key, (None, None))
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return None
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: tuple, value: object):
+        """Cache `value` for `key`, remove the least recently used values."""
+        with self._lock:
+            expires = None if self.ttl is None else time.time() + self.ttl
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached values."""
+        with self._lock:
+            self._data.clear()
@@ -573,3 +573,48 @@ def test_has_annotation_sheet_data_resource_with_data(context):
     from . import has_annotation_sheet_data
     context._sheet_xcv = {}
     assert has_annotation_sheet_data(context) is True
+
+
+class TestLRUCache:
+
+    @fixture
+    def inst(self):
+        from adhocracy_core.utils import LRUCache
+        return LRUCache(2)
+
+    def test_create(self, inst):
+        assert inst.maxsize == 2
+        assert inst.ttl is None
+        assert len(inst) == 0
+
+    def test_get_missing(self, inst):
+        assert inst.get(('/',)) is None
+
+    def test_set_and_get(self, inst):
+        inst.set(('/',), {'data': 1})
+        assert inst.get(('/',)) == {'data': 1}
+
+    def test_set_remove_least_recently_used(self, inst):
+        inst.set(('/a',), 1)
+        inst.set(('/b',), 2)
+        inst.get(('/a',))
+        inst.set(('/c',), 3)
+        assert inst.get(('/a',)) == 1
+        assert inst.get(('/b',)) is None
+        assert len(inst) == 2
+
+    def test_clear(self, inst):
+        inst.set(('/a',), 1)
+        inst.clear()
+        assert len(inst) == 0
+
+    def test_get_with_ttl(self, inst):
+        inst.ttl = 60
+        inst.set(('/a',), 1)
+        assert inst.get(('/a',)) == 1
+
+    def test_get_expired(self, inst):
+        inst.ttl = -1
+        inst.set(('/a',), 1)
+        assert inst.get(('/a',)) is None
+        assert len(inst) == 0
@@ -0,0 +1,195 @@
+"""Share event notifications between several Websocket server processes.
+
+Every Websocket server process tracks only its own clients. Notifications
+from the Pyramid app are published to a :class:`Broker`. The broker
+delivers them to all server processes and each process notifies its
+subscribed clients.
+"""
+from abc import ABCMeta
+from abc import abstractmethod
+from json import dumps
+from json import loads
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class Broker(metaclass=ABCMeta):
+    """Publish notifications to all subscribed callbacks.
+
+    Subclasses must implement :meth:`publish`.
+    """
+
+    def __init__(self):
+        """Initialize self."""
+        self._callbacks = []
+
+    def subscribe(self, callback: callable):
+        """Call `callback` with every published notification."""
+        self._callbacks.append(callback)
+
+    @abstractmethod
+    def publish(self, notification: dict):
+        """Publish `notification` (JSON object) to all server processes."""
+
+    def _deliver(self, notification: dict):
+        for callback in self._callbacks:
+            try:
+                callback(notification)
+            except Exception:
+                logger.exception('Error delivering notification %s',
+                                 notification)
+
+    @asyncio.coroutine
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Start communication, run in the server's event loop."""
+
+    def stop(self):
+        """Stop communication."""
+
+
+class LocalBroker(Broker):
+    """Broker for a single Websocket server process."""
+
+    def publish(self, notification: dict):
+        """Deliver `notification` to the callbacks of this process."""
+        self._deliver(notification)
+
+
+class SocketBroker(Broker):
+    """Broker connected with a :class:`BrokerHub` via TCP.
+
+    Notifications are send as newline separated JSON. If the connection to
+    the hub is broken, notifications are only delivered locally until the
+    connection is established again.
+    """
+
+    reconnect_delay = 1
+
+    def __init__(self, host: str, port: int):
+        """Initialize self."""
+        super().__init__()
+        self._host = host
+        self._port = port
+        self._writer = None
+        self._task = None
+        self._is_stopped = False
+
+    @asyncio.coroutine
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Connect to the hub and start receiving notifications."""
+        self._task = loop.create_task(self._run(loop))
+
+    @asyncio.coroutine
+    def _run(self, loop: asyncio.AbstractEventLoop):
+        while not self._is_stopped:
+            try:
+                reader, self._writer = yield from asyncio.open_connection(
+                    self._host, self._port, loop=loop)
+                logger.debug('Connected to broker hub %s:%s', self._host,
+                             self._port)
+                yield from self._receive(reader)
+            except OSError as err:
+                logger.warning('Problem connecting to broker hub: %s', err)
+            self._writer = None
+            yield from asyncio.sleep(self.reconnect_delay, loop=loop)
+
+    @asyncio.coroutine
+    def _receive(self, reader: asyncio.StreamReader):
+        while True:
+            line = yield from reader.readline()
+            if not line:
+                logger.warning('Broker hub closed the connection')
+                return
+            self._deliver(loads(line.decode()))
+
+    def publish(self, notification: dict):
+        """Send `notification` to the hub."""
+        if self._writer is None:
+            logger.warning('Not connected to broker hub, deliver locally')
+            self._deliver(notification)
+            return
+        self._writer.write(dumps(notification).encode() + b'\n')
+
+    def stop(self):
+        """Close the connection to the hub."""
+        self._is_stopped = True
+        if self._writer is not None:
+            self._writer.close()
+        if self._task is not None:
+            self._task.cancel()
+
+
+class BrokerHub:
+    """Relay every line received from a connection to all connections.
+
+    Connections that do not read fast enough are closed, the
+    :class:`SocketBroker` delivers locally until it is connected again.
+    """
+
+    max_buffer_size = 2 ** 20
+    """Maximal bytes buffered for a connection before it is closed."""
+
+    def __init__(self):
+        """Initialize self."""
+        self._writers = set()
+
+    @asyncio.coroutine
+    def handle_connection(self, reader: asyncio.StreamReader,
+                          writer: asyncio.StreamWriter):
+        """Relay lines from `reader` until the connection is closed."""
+        self._writers.add(writer)
+        try:
+            while True:
+                line = yield from reader.readline()
+                if not line:
+                    break
+                self._relay(line)
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def _relay(self, line: bytes):
+        for other in list(self._writers):
+            buffer_size = other.transport.get_write_buffer_size()
+            if buffer_size > self.max_buffer_size:
+                logger.warning('Broker connection is too slow, close it')
+                self._writers.discard(other)
+                other.close()
+                continue
+            other.write(line)
+
+    @asyncio.coroutine
+    def start(self, loop: asyncio.AbstractEventLoop, host: str, port: int):
+        """Start listening on `host`:`port`, return the asyncio server."""
+        server = yield from asyncio.start_server(self.handle_connection,
+                                                 host, port, loop=loop)
+        logger.debug('Started broker hub listening on %s:%s', host, port)
+        return server
+
+
+def get_broker(broker_url: str) -> Broker:
+    """Return broker for `broker_url`.
+
+    :param broker_url: `tcp://host:port` to use a :class:`SocketBroker`,
+                       empty to use a :class:`LocalBroker`.
+    :raises ValueError: if the url is not valid
+    """
+    if not broker_url:
+        return LocalBroker()
+    host, port = parse_broker_url(broker_url)
+    return SocketBroker(host, port)
+
+
+def parse_broker_url(broker_url: str) -> (str, int):
+    """Return host and port of `broker_url` (`tcp://host:port`).
+
+    :raises ValueError: if the url is not valid
+    """
+    scheme, sep, address = broker_url.partition('://')
+    host, sep_port, port = address.rpartition(':')
+    if scheme != 'tcp' or not sep or not sep_port or not port.isdigit():
+        raise ValueError('Invalid broker url: {}'.format(broker_url))
+    return host, int(port)
@@ -1,4 +1,6 @@
 """Our own Websocket client that notifies the server of changes."""
+from collections import OrderedDict
+from threading import Condition
 from threading import Thread
 import json
 import logging
@@ -8,7 +10,6 @@ from websocket import ABNF
 from websocket import create_connection
 from websocket import WebSocketException
 from websocket import WebSocketConnectionClosedException
-from websocket import WebSocketTimeoutException
 
 from adhocracy_core.interfaces import IResource
 from adhocracy_core.utils import exception_to_str
@@ -20,25 +21,53 @@ logger = logging.getLogger(__name__)
 
 
 class Client:
-    """Websocket Client."""
+    """Websocket Client.
+
+    Messages are handed over to a sender thread that waits
+    :attr:`coalesce_delay` seconds to merge repeated events for the same
+    resource before sending them.
+    """
+
+    coalesce_delay = 0.1
 
     def __init__(self, ws_url):
-        """Create instance with running thread that talks to the server.
+        """Create instance with running threads that talk to the server.
 
         :param ws_url: the URL of the websocket server to connect to;
                if None, no connection will be set up (useful for testing)
         """
-        self.changelog_metadata_messages_to_send = set()
-        """Set with :class:`adhocracy_core.resources.subscriber.ChangelogMetadata`
-        that will be send to the websocket server with
-        :func:`Client.send_messages`."""
+        self.messages_to_send = OrderedDict()
+        """Mapping (resource path, event) to message text that will be
+        send to the websocket server by :func:`Client.send_pending`."""
+        self._condition = Condition()
         self._ws_url = ws_url
         self._ws_connection = None
         self._is_running = False
         self._is_stopped = False
         if ws_url is not None:
+            self._init_sender_thread()
             self._init_listener_thread()
 
+    def _init_sender_thread(self):
+        """Init thread that sends the pending messages."""
+        sender = Thread(target=self._run_sender)
+        sender.daemon = True
+        sender.start()
+
+    def _run_sender(self):
+        while not self._is_stopped:
+            with self._condition:
+                while not self.messages_to_send and not self._is_stopped:
+                    self._condition.wait()
+            time.sleep(self.coalesce_delay)
+            try:
+                self.send_pending()
+            except Exception as err:
+                logger.error('Error sending messages to Websocket server: %s',
+                             exception_to_str(err))
+            if self.messages_to_send and not self._is_connected():
+                time.sleep(1)  # wait for the listener thread to reconnect
+
     def _init_listener_thread(self):
         """Init thread that keeps the connection alive."""
         runner = Thread(target=self._run)
@@ -110,43 +139,67 @@ class Client:
         self._is_running = False
 
     def send_messages(self, changelog_metadata=[]):
-        """Send all changelog messages to the websocket server.
+        """Add all changelog messages to the messages to send.
 
         :param changelog_metadata: list of :class:'ChangelogMetadata',
                                    metadata.resource == None is ignored.
 
-        All websocket exceptions are catched, hoping the problems
-        will be solved when you run this method again.
+        This does not block, the messages are send by the sender thread.
+        A `modified` event is dropped if a `created` event for the same
+        resource is waiting.
         """
         if not self._is_running:
             return
-        try:
-            self._send_messages(changelog_metadata)
-        except WebSocketTimeoutException:  # pragma: no cover
-            logger.warning('Could not send message, connection timeout,'
-                           ' try again later')
-        except OSError:  # pragma: no cover
-            logger.warning('Could not send message, connection is broken,'
-                           ' try again later')
-
-    def _send_messages(self, changelog_metadata: list):
-        self.changelog_metadata_messages_to_send.update(changelog_metadata)
-        while self.changelog_metadata_messages_to_send:
-            meta = self.changelog_metadata_messages_to_send.pop()
-            events = extract_events_from_changelog_metadata(meta)
-            for event in events:
-                self._send_resource_event(meta.resource, event)
-
-    def _send_resource_event(self, resource: IResource, event_type: str):
+        with self._condition:
+            for meta in changelog_metadata:
+                for event in extract_events_from_changelog_metadata(meta):
+                    self._add_message(meta.resource, event)
+            self._condition.notify()
+
+    def _add_message(self, resource: IResource, event_type: str):
         schema = ServerNotification().bind(context=resource)
         message = schema.serialize({'event': event_type, 'resource': resource})
-        message_text = json.dumps(message)
+        path = message['resource']
+        if event_type == 'modified' and \
+                (path, 'created') in self.messages_to_send:
+            return
+        self.messages_to_send[(path, event_type)] = json.dumps(message)
+
+    def send_pending(self):
+        """Send all pending messages to the websocket server.
+
+        All websocket exceptions are catched, the unsent messages are send
+        again with the next messages.
+        """
+        with self._condition:
+            messages = self.messages_to_send
+            self.messages_to_send = OrderedDict()
+        while messages:
+            key, message_text = messages.popitem(last=False)
+            try:
+                self._send_message(message_text)
+            except (WebSocketException, OSError):
+                logger.warning('Could not send message, connection is broken'
+                               ' or timeout, try again later')
+                messages[key] = message_text
+                messages.move_to_end(key, last=False)
+                self._requeue(messages)
+                return
+
+    def _requeue(self, messages: OrderedDict):
+        with self._condition:
+            messages.update(self.messages_to_send)
+            self.messages_to_send = messages
+
+    def _send_message(self, message_text: str):
         logger.debug('Sending message to Websocket server: %s', message_text)
         self._ws_connection.send(message_text)
 
     def stop(self):
         """Stop the client."""
-        self._is_stopped = True
+        with self._condition:
+            self._is_stopped = True
+            self._condition.notify()
         try:
             if self._is_connected():
                 self._close_connection(b'done')
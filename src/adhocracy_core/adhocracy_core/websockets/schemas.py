@@ -9,7 +9,9 @@ class Action(colander.SchemaNode):
     """An action requested by a client."""
 
     schema_type = colander.String
-    validator = colander.OneOf(['subscribe', 'unsubscribe'])
+    validator = colander.OneOf(['subscribe', 'unsubscribe',
+                                'subscribe_descendants',
+                                'unsubscribe_descendants'])
 
 
 class ClientRequestSchema(colander.MappingSchema):
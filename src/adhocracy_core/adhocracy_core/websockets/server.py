@@ -1,14 +1,18 @@
 """Classes used by the standalone Websocket server."""
 import time
+from collections import Counter
 from collections import defaultdict
 from collections import Hashable
 from collections import Iterable
+from collections import OrderedDict
 from json import dumps
 from json import loads
 import logging
 
+from autobahn.asyncio.websocket import WebSocketServerFactory
 from autobahn.asyncio.websocket import WebSocketServerProtocol
 from autobahn.websocket.protocol import ConnectionRequest
+from autobahn.websocket.protocol import PreparedMessage
 from pyramid.traversal import resource_path
 from ZODB import Connection
 import colander
@@ -27,13 +31,35 @@ from adhocracy_core.websockets.schemas import VersionNotification
 logger = logging.getLogger(__name__)
 
 
+class _PathNode:
+    """Node of the path trie used to track descendants subscriptions."""
+
+    __slots__ = ('clients', 'children')
+
+    def __init__(self):
+        self.clients = set()
+        self.children = {}
+
+
+def _split_path(path: str) -> list:
+    return [x for x in path.split('/') if x]
+
+
 class ClientTracker():
-    """Keeps track of the clients that want notifications."""
+    """Keeps track of the clients that want notifications.
+
+    Clients can subscribe to a single resource or to a resource and all its
+    descendants. The descendants subscriptions are stored in a path trie, so
+    finding the subscribers of a resource only needs one lookup per path
+    segment.
+    """
 
     def __init__(self):
         """Initialize self."""
         self._clients2resource_paths = defaultdict(set)
         self._resource_paths2clients = defaultdict(set)
+        self._clients2descendants_paths = defaultdict(set)
+        self._descendants_trie = _PathNode()
 
     def is_subscribed(self, client: Hashable, resource: IResource) -> bool:
         """Check whether a client is subscribed to a resource."""
@@ -86,14 +112,104 @@ class ClientTracker():
         for path in path_set:
             self._discard_from_set_valued_dict(self._resource_paths2clients,
                                                path, client)
+        path_set = self._clients2descendants_paths.pop(client, set())
+        for path in path_set:
+            self._discard_from_trie(path, client)
 
     def delete_subscriptions_to_resource(self, resource: IResource):
-        """Delete all subscriptions to a resource."""
+        """Delete all subscriptions to a resource and its subtree."""
         path = resource_path(resource)
         client_set = self._resource_paths2clients.pop(path, set())
         for client in client_set:
             self._discard_from_set_valued_dict(self._clients2resource_paths,
                                                client, path)
+        self._delete_descendants_subscriptions(path)
+
+    def _delete_descendants_subscriptions(self, path: str):
+        """Delete all subscriptions to the subtrees of `path` or below."""
+        segments = _split_path(path)
+        nodes = self._get_trie_nodes(segments)
+        if len(nodes) <= len(segments):
+            return
+        removed = [(path.rstrip('/'), nodes.pop())]
+        if nodes:
+            del nodes[-1].children[segments[-1]]
+        else:
+            self._descendants_trie = _PathNode()
+        while removed:
+            node_path, node = removed.pop()
+            for client in node.clients:
+                self._discard_from_set_valued_dict(
+                    self._clients2descendants_paths, client, node_path or '/')
+            removed.extend((node_path + '/' + name, child)
+                           for name, child in node.children.items())
+        self._prune_trie(nodes, segments)
+
+    def is_subscribed_descendants(self, client: Hashable,
+                                  resource: IResource) -> bool:
+        """Check whether a client is subscribed to a resource subtree."""
+        path = resource_path(resource)
+        return (client in self._clients2descendants_paths and
+                path in self._clients2descendants_paths[client])
+
+    def subscribe_descendants(self, client: Hashable,
+                              resource: IResource) -> bool:
+        """Subscribe a client to a resource and all its descendants.
+
+        :return: True if the subscription was successful, False if it was
+                 unnecessary (the client was already subscribed).
+        """
+        if self.is_subscribed_descendants(client, resource):
+            return False
+        path = resource_path(resource)
+        node = self._descendants_trie
+        for segment in _split_path(path):
+            node = node.children.setdefault(segment, _PathNode())
+        node.clients.add(client)
+        self._clients2descendants_paths[client].add(path)
+        return True
+
+    def unsubscribe_descendants(self, client: Hashable,
+                                resource: IResource) -> bool:
+        """Unsubscribe a client from a resource subtree, if necessary.
+
+        :return: True if the unsubscription was successful, False if it was
+                 unnecessary (the client was not subscribed).
+        """
+        if not self.is_subscribed_descendants(client, resource):
+            return False
+        path = resource_path(resource)
+        self._discard_from_set_valued_dict(self._clients2descendants_paths,
+                                           client,
+                                           path)
+        self._discard_from_trie(path, client)
+        return True
+
+    def _discard_from_trie(self, path: str, client: Hashable):
+        """Discard `client` from the trie node of `path`."""
+        segments = _split_path(path)
+        nodes = self._get_trie_nodes(segments)
+        if len(nodes) > len(segments):
+            nodes[-1].clients.discard(client)
+        self._prune_trie(nodes, segments)
+
+    def _get_trie_nodes(self, segments: list) -> list:
+        """Return the trie nodes from the root along `segments`."""
+        nodes = [self._descendants_trie]
+        for segment in segments:
+            node = nodes[-1].children.get(segment)
+            if node is None:
+                break
+            nodes.append(node)
+        return nodes
+
+    def _prune_trie(self, nodes: list, segments: list):
+        """Remove trailing `nodes` without clients and children."""
+        for index in range(len(nodes) - 1, 0, -1):
+            node = nodes[index]
+            if node.clients or node.children:
+                break
+            del nodes[index - 1].children[segments[index - 1]]
 
     def iterate_subscribers(self, resource: IResource) -> Iterable:
         """Return an iterator over all clients subscribed to a resource."""
@@ -103,6 +219,18 @@ class ClientTracker():
             for client in self._resource_paths2clients[path]:
                 yield client
 
+    def iterate_descendants_subscribers(self, resource: IResource
+                                        ) -> Iterable:
+        """Return iterator over clients subscribed to a resource subtree.
+
+        This includes the subtrees of all ancestors of `resource`.
+        """
+        nodes = self._get_trie_nodes(_split_path(resource_path(resource)))
+        clients = set()
+        for node in nodes:
+            clients.update(node.clients)
+        yield from clients
+
 
 class DummyRequest:
     """Dummy :term:`request` to create/resolve resource urls.
@@ -124,11 +252,12 @@ class DummyRequest:
         return self.application_url + path + '/'
 
 
-class ClientCommunicator(WebSocketServerProtocol):
-    """Communicates with a client through a WebSocket connection.
+class NotificationDispatcher:
+    """Dispatch event notifications to the subscribed clients.
 
-    Note that the `zodb_connection` attribute **must** be set
-    instances of this class can be used!
+    This does not need a client connection, so a plain instance with the
+    `factory` attribute set can dispatch the notifications published by the
+    :class:`adhocracy_core.websockets.broker.Broker`.
     """
 
     # All instances of this class share the same zodb database object
@@ -139,6 +268,11 @@ class ClientCommunicator(WebSocketServerProtocol):
     # This is used to generate the resource URLs. It is equal to the
     # url the adhocracy frontend is using to communicate with the rest server.
     rest_url = 'http://localhost:6541'
+    # All instances of this class share the notification statistics:
+    # event name mapping to message count, client count and seconds spent
+    broadcast_stats = defaultdict(Counter)
+    # The :class:`ClientCommunicatorFactory` to prepare messages
+    factory = None
 
     def _create_schema(self, schema_class: colander.Schema):
         """Create schema object and bind `context` and `request`."""
@@ -177,6 +311,194 @@ class ClientCommunicator(WebSocketServerProtocol):
         connection.sync()
         return connection
 
+    def dispatch_notification(self, json_object: dict):
+        """Dispatch notification published by the broker to subscribers.
+
+        Errors are logged, there is no client to send them to.
+        """
+        try:
+            notification = self._parse_json_via_schema(json_object,
+                                                       ServerNotification)
+            self._dispatch_event_notification_to_subscribers(notification)
+        except WebSocketError as err:
+            logger.warning('Could not dispatch notification %s: %s',
+                           json_object, err)
+
+    def _parse_json_via_schema(self, json_object, schema_class) -> dict:
+        try:
+            schema = self._create_schema(schema_class)
+            return schema.deserialize(json_object)
+        except colander.Invalid as err:
+            self._raise_if_unknown_field_value('action', err, json_object)
+            self._raise_if_unknown_field_value('resource', err, json_object)
+            self._raise_invalid_json_from_colander_invalid(err)
+        except Exception as err:  # pragma: no cover
+            self._raise_invalid_json_from_exception(err)
+
+    def _dispatch_event_notification_to_subscribers(self, notification: dict):
+        event = notification['event']
+        resource = notification['resource']
+        if event == 'created':
+            self._dispatch_created_event(resource)
+        elif event == 'modified':
+            self._dispatch_modified_event(resource)
+        elif event == 'removed':
+            self._dispatch_removed_event(resource)
+        elif event == 'changed_descendants':
+            self._dispatch_changed_descendants_event(resource)
+        else:
+            self._raise_if_unknown_event(event)
+
+    def _raise_if_unknown_event(self, event: str):
+        if event not in ('created', 'modified', 'removed',
+                         'changed_descendants'):
+            details = 'unknown event: {}'.format(event)
+            raise WebSocketError('invalid_json', details)
+
+    def _raise_if_unknown_field_value(self, field_name: str,
+                                      err: colander.Invalid,
+                                      json_object: dict):
+        """Raise an 'unknown_xxx' WebSocketError error if appropriate."""
+        errdict = err.asdict()
+        if (self._is_only_key(errdict, field_name) and
+                field_name in json_object):
+            field_value = json_object[field_name]
+            raise WebSocketError('unknown_' + field_name, field_value)
+
+    def _is_only_key(self, d: dict, key: str) -> bool:
+        return key in d and len(d) == 1
+
+    def _raise_invalid_json_from_colander_invalid(self, err: colander.Invalid):
+        errdict = err.asdict()
+        errlist = ['{}: {}'.format(k, errdict[k]) for k in errdict.keys()]
+        details = ' / '.join(sorted(errlist))
+        raise WebSocketError('invalid_json', details)
+
+    def _raise_invalid_json_from_exception(self, err: Exception):
+        raise WebSocketError('invalid_json', str(err))  # pragma: no cover
+
+    def _dispatch_created_event(self, resource: IResource):
+        if IItemVersion.providedBy(resource):
+            self._notify_new_version(resource.__parent__, resource)
+        else:
+            self._notify_new_child(resource.__parent__, resource)
+
+    def _dispatch_modified_event(self, resource: IResource):
+        self._notify_resource_modified(resource)
+        self._notify_modified_child(resource.__parent__, resource)
+
+    def _dispatch_removed_event(self, resource: IResource):
+        self._notify_resource_removed(resource)
+        self._tracker.delete_subscriptions_to_resource(resource)
+        self._notify_removed_child(resource.__parent__, resource)
+
+    def _dispatch_changed_descendants_event(self, resource: IResource):
+        self._notify_resource_changed_descendants(resource)
+
+    def _notify_new_version(self, parent: IResource,
+                            new_version: IItemVersion):
+        """Notify subscribers if a new version has been added to an item."""
+        self._broadcast(self._iterate_subscribers(parent),
+                        VersionNotification,
+                        {'event': 'new_version',
+                         'resource': parent,
+                         'version': new_version})
+
+    def _notify_new_child(self, parent: IResource, child: IResource):
+        """Notify subscribers if a child has been added to a pool or item."""
+        self._notify_child(parent, child, 'new')
+
+    def _notify_resource_modified(self, resource: IResource):
+        """Notify subscribers if a resource has been modified."""
+        self._notify(resource, 'modified')
+
+    def _notify_resource_removed(self, resource: IResource):
+        """Notify subscribers if a resource has been removed."""
+        self._notify(resource, 'removed')
+
+    def _notify_resource_changed_descendants(self, resource: IResource):
+        """Notify subscribers if descendants of a resource have changed.
+
+        Subtree subscribers get the notifications for the descendants instead.
+        """
+        self._broadcast(self._tracker.iterate_subscribers(resource),
+                        Notification,
+                        {'event': 'changed_descendants', 'resource': resource})
+
+    def _notify_modified_child(self, parent: IResource, child: IResource):
+        """Notify subscribers if a child in a pool has been modified."""
+        self._notify_child(parent, child, 'modified')
+
+    def _notify_removed_child(self, parent: IResource, child: IResource):
+        """Notify subscribers if a child has been removed from a pool."""
+        self._notify_child(parent, child, 'removed')
+
+    def _iterate_subscribers(self, resource: IResource) -> Iterable:
+        """Return iterator over the resource and subtree subscribers."""
+        clients = set(self._tracker.iterate_subscribers(resource))
+        clients.update(self._tracker.iterate_descendants_subscribers(resource))
+        return iter(clients)
+
+    def _notify(self, resource: IResource, event_type: str):
+        self._broadcast(self._iterate_subscribers(resource),
+                        Notification,
+                        {'event': event_type, 'resource': resource})
+
+    def _notify_child(self, parent: IResource, child: IResource,
+                      status: str):
+        self._broadcast(self._iterate_subscribers(parent),
+                        ChildNotification,
+                        {'event': status + '_child',
+                         'resource': parent,
+                         'child': child})
+
+    def _broadcast(self, clients: Iterable, schema_class: colander.Schema,
+                   appstruct: dict):
+        """Send the same notification message to all `clients`.
+
+        The message is serialized, encoded and framed only once.
+        """
+        clients = list(clients)
+        if not clients:
+            return
+        start = time.perf_counter()
+        schema = self._create_schema(schema_class)
+        text = dumps(schema.serialize(appstruct))
+        message = self.factory.prepareMessage(text.encode())
+        for client in clients:
+            client.send_prepared_message(message)
+        seconds = time.perf_counter() - start
+        stats = self.broadcast_stats[appstruct['event']]
+        stats['messages'] += 1
+        stats['clients'] += len(clients)
+        stats['seconds'] += seconds
+        logger.debug('Sent message to %s clients in %.4f seconds: %s',
+                     len(clients), seconds, text)
+
+
+class ClientCommunicator(NotificationDispatcher, WebSocketServerProtocol):
+    """Communicates with a client through a WebSocket connection.
+
+    Note that the `zodb_connection` attribute **must** be set
+    instances of this class can be used!
+    """
+
+    # All instances of this class share the broker to publish notifications
+    # to the other server processes, if None notifications are dispatched
+    # to the clients of this process only.
+    broker = None
+    # Maximal number of messages queued while the client does not read
+    # fast enough, if exceeded the connection is closed with
+    # `resync_close_code` to make the client reload its resources.
+    max_queue_size = 200
+    resync_close_code = 4000
+
+    def __init__(self):
+        """Initialize self."""
+        super().__init__()
+        self._queue = OrderedDict()
+        self._is_paused = False
+
     def onConnect(self, request: ConnectionRequest):  # noqa
         self._client = request.peer
         self._client_may_send_notifications = self._client_runs_on_localhost()
@@ -228,22 +550,15 @@ class ClientCommunicator(WebSocketServerProtocol):
                 self._looks_like_event_notification(json_object)):
             notification = self._parse_json_via_schema(json_object,
                                                        ServerNotification)
-            self._dispatch_event_notification_to_subscribers(notification)
+            if self.broker is None:
+                self._dispatch_event_notification_to_subscribers(notification)
+            else:
+                self._raise_if_unknown_event(notification['event'])
+                self.broker.publish(json_object)
             return True
         else:
             return False
 
-    def _parse_json_via_schema(self, json_object, schema_class) -> dict:
-        try:
-            schema = self._create_schema(schema_class)
-            return schema.deserialize(json_object)
-        except colander.Invalid as err:
-            self._raise_if_unknown_field_value('action', err, json_object)
-            self._raise_if_unknown_field_value('resource', err, json_object)
-            self._raise_invalid_json_from_colander_invalid(err)
-        except Exception as err:  # pragma: no cover
-            self._raise_invalid_json_from_exception(err)
-
     def _handle_client_request_and_send_response(self, request: dict):
         action = request['action']
         resource = request['resource']
@@ -265,43 +580,6 @@ class ClientCommunicator(WebSocketServerProtocol):
     def _looks_like_event_notification(self, json_object) -> bool:
         return isinstance(json_object, dict) and 'event' in json_object
 
-    def _dispatch_event_notification_to_subscribers(self, notification: dict):
-        event = notification['event']
-        resource = notification['resource']
-        if event == 'created':
-            self._dispatch_created_event(resource)
-        elif event == 'modified':
-            self._dispatch_modified_event(resource)
-        elif event == 'removed':
-            self._dispatch_removed_event(resource)
-        elif event == 'changed_descendants':
-            self._dispatch_changed_descendants_event(resource)
-        else:
-            details = 'unknown event: {}'.format(event)
-            raise WebSocketError('invalid_json', details)
-
-    def _raise_if_unknown_field_value(self, field_name: str,
-                                      err: colander.Invalid,
-                                      json_object: dict):
-        """Raise an 'unknown_xxx' WebSocketError error if appropriate."""
-        errdict = err.asdict()
-        if (self._is_only_key(errdict, field_name) and
-                field_name in json_object):
-            field_value = json_object[field_name]
-            raise WebSocketError('unknown_' + field_name, field_value)
-
-    def _is_only_key(self, d: dict, key: str) -> bool:
-        return key in d and len(d) == 1
-
-    def _raise_invalid_json_from_colander_invalid(self, err: colander.Invalid):
-        errdict = err.asdict()
-        errlist = ['{}: {}'.format(k, errdict[k]) for k in errdict.keys()]
-        details = ' / '.join(sorted(errlist))
-        raise WebSocketError('invalid_json', details)
-
-    def _raise_invalid_json_from_exception(self, err: Exception):
-        raise WebSocketError('invalid_json', str(err))  # pragma: no cover
-
     def _update_resource_subscription(self, action: str,
                                       resource: str) -> bool:
         """(Un)subscribe this instance to/from a resource.
@@ -311,6 +589,10 @@ class ClientCommunicator(WebSocketServerProtocol):
         """
         if action == 'subscribe':
             return self._tracker.subscribe(self, resource)
+        elif action == 'subscribe_descendants':
+            return self._tracker.subscribe_descendants(self, resource)
+        elif action == 'unsubscribe_descendants':
+            return self._tracker.unsubscribe_descendants(self, resource)
         else:
             return self._tracker.unsubscribe(self, resource)
 
@@ -328,61 +610,10 @@ class ClientCommunicator(WebSocketServerProtocol):
         logger.debug('Sending message to client %s: %s', self._client, text)
         self.sendMessage(text.encode())
 
-    def _dispatch_created_event(self, resource: IResource):
-        if IItemVersion.providedBy(resource):
-            self._notify_new_version(resource.__parent__, resource)
-        else:
-            self._notify_new_child(resource.__parent__, resource)
-
-    def _dispatch_modified_event(self, resource: IResource):
-        self._notify_resource_modified(resource)
-        self._notify_modified_child(resource.__parent__, resource)
-
-    def _dispatch_removed_event(self, resource: IResource):
-        self._notify_resource_removed(resource)
-        self._tracker.delete_subscriptions_to_resource(resource)
-        self._notify_removed_child(resource.__parent__, resource)
-
-    def _dispatch_changed_descendants_event(self, resource: IResource):
-        for client in self._tracker.iterate_subscribers(resource):
-            client.send_notification(resource, 'changed_descendants')
-
-    def _notify_new_version(self, parent: IResource,
-                            new_version: IItemVersion):
-        """Notify subscribers if a new version has been added to an item."""
-        for client in self._tracker.iterate_subscribers(parent):
-            client.send_new_version_notification(parent, new_version)
-
-    def _notify_new_child(self, parent: IResource, child: IResource):
-        """Notify subscribers if a child has been added to a pool or item."""
-        for client in self._tracker.iterate_subscribers(parent):
-            client.send_child_notification('new', parent, child)
-
-    def _notify_resource_modified(self, resource: IResource):
-        """Notify subscribers if a resource has been modified."""
-        for client in self._tracker.iterate_subscribers(resource):
-            client.send_notification(resource, 'modified')
-
-    def _notify_resource_removed(self, resource: IResource):
-        """Notify subscribers if a resource has been removed."""
-        for client in self._tracker.iterate_subscribers(resource):
-            client.send_notification(resource, 'removed')
-
-    def _notify_modified_child(self, parent: IResource, child: IResource):
-        """Notify subscribers if a child in a pool has been modified."""
-        for client in self._tracker.iterate_subscribers(parent):
-            client.send_child_notification('modified', parent, child)
-
-    def _notify_removed_child(self, parent: IResource, child: IResource):
-        """Notify subscribers if a child has been removed from a pool."""
-        for client in self._tracker.iterate_subscribers(parent):
-            client.send_child_notification('removed', parent, child)
-
     def send_notification(self, resource: IResource, event_type: str):
         """Send notification about an event affecting a resource."""
-        schema = self._create_schema(Notification)
-        data = schema.serialize({'event': event_type, 'resource': resource})
-        self._send_json_message(data)
+        self._broadcast([self], Notification, {'event': event_type,
+                                               'resource': resource})
 
     def send_child_notification(self, status: str, resource: IResource,
                                 child: IResource):
@@ -390,23 +621,70 @@ class ClientCommunicator(WebSocketServerProtocol):
 
         :param status: should be 'new', 'removed', or 'modified'
         """
-        schema = self._create_schema(ChildNotification)
-        data = schema.serialize({'event': status + '_child',
-                                 'resource': resource,
-                                 'child': child})
-        self._send_json_message(data)
+        self._broadcast([self], ChildNotification, {'event': status + '_child',
+                                                    'resource': resource,
+                                                    'child': child})
 
     def send_new_version_notification(self, resource: IResource,
                                       new_version: IResource):
         """Send notification if a new version has been added."""
-        schema = self._create_schema(VersionNotification)
-        data = schema.serialize({'event': 'new_version',
-                                 'resource': resource,
-                                 'version': new_version})
-        self._send_json_message(data)
+        self._broadcast([self], VersionNotification,
+                        {'event': 'new_version',
+                         'resource': resource,
+                         'version': new_version})
+
+    def send_prepared_message(self, message: PreparedMessage):
+        """Send notification `message` or queue it if the client is slow.
+
+        Identical queued notifications are only send once.
+        """
+        if not self._is_paused:
+            self.sendPreparedMessage(message)
+            return
+        self._queue[message.payload] = message
+        if len(self._queue) > self.max_queue_size:
+            logger.warning('Client %s is too slow, close connection to resync',
+                           self._client)
+            self._queue.clear()
+            self._tracker.delete_subscriptions_for_client(self)
+            self.sendClose(code=self.resync_close_code, reason='resync')
+
+    def pause_writing(self):
+        """Queue notifications until the transport buffer is drained."""
+        self._is_paused = True
+
+    def resume_writing(self):
+        """Send the queued notifications."""
+        self._is_paused = False
+        while self._queue and not self._is_paused:
+            _, message = self._queue.popitem(last=False)
+            self.sendPreparedMessage(message)
 
     def onClose(self, was_clean: bool, code: int, reason: str):  # noqa
+        self._queue.clear()
         self._tracker.delete_subscriptions_for_client(self)
         clean_str = 'Clean' if was_clean else 'Unclean'
         logger.debug('%s close of WebSocket connection to %s; reason: %s',
                      clean_str, self._client, reason)
+
+
+class TextPreparedMessage(PreparedMessage):
+    """Prepared text message with UTF-8 encoded `payload`.
+
+    Autobahn fails to frame encoded payloads for Hixie-76 peers.
+    """
+
+    def _initHixie(self, payload: bytes, binary: bool):  # noqa
+        self.payloadHixie = b'' if binary else b'\x00' + payload + b'\xff'
+
+
+class ClientCommunicatorFactory(WebSocketServerFactory):
+    """Create :class:`ClientCommunicator` and prepare shared messages."""
+
+    protocol = ClientCommunicator
+
+    def prepareMessage(self, payload: bytes, isBinary=False,  # noqa
+                       doNotCompress=False) -> PreparedMessage:
+        """Return message to send the same `payload` to many clients."""
+        return TextPreparedMessage(payload, isBinary, not self.isServer,
+                                   doNotCompress)
@@ -8,9 +8,13 @@ import logging
 import os
 import sys
 
-from autobahn.asyncio.websocket import WebSocketServerFactory
 from ZODB import DB
+from adhocracy_core.websockets.broker import BrokerHub
+from adhocracy_core.websockets.broker import get_broker
+from adhocracy_core.websockets.broker import parse_broker_url
 from adhocracy_core.websockets.server import ClientCommunicator
+from adhocracy_core.websockets.server import ClientCommunicatorFactory
+from adhocracy_core.websockets.server import NotificationDispatcher
 from zodburi import resolve_uri
 import asyncio
 
@@ -85,12 +89,13 @@ def _register_sigterm_handler(pid_file: str):
 def _start_loop(config: ConfigParser, port: int, pid_file: str):
     try:
         database = _get_zodb_database(config)
-        ClientCommunicator.zodb_database = database
+        NotificationDispatcher.zodb_database = database
         rest_url = _get_rest_url(config)
-        ClientCommunicator.rest_url = rest_url
-        factory = WebSocketServerFactory('ws://localhost:{}'.format(port))
-        factory.protocol = ClientCommunicator
+        NotificationDispatcher.rest_url = rest_url
+        factory = ClientCommunicatorFactory(
+            'ws://localhost:{}'.format(port))
         loop = asyncio.get_event_loop()
+        _start_broker(config, loop, factory)
         coro = loop.create_server(factory, port=port)
         logger.debug('Started WebSocket server listening on port %i', port)
         server = loop.run_until_complete(coro)
@@ -100,6 +105,31 @@ def _start_loop(config: ConfigParser, port: int, pid_file: str):
         _remove_pid_file(pid_file)
 
 
+def _start_broker(config: ConfigParser, loop,
+                  factory: ClientCommunicatorFactory):
+    """Start broker to share notifications with other server processes.
+
+    The `broker_url` (tcp://host:port) in the [websockets] section sets the
+    :class:`adhocracy_core.websockets.broker.BrokerHub` to connect to.
+    One of the server processes has to start the hub by setting
+    `broker_hub = true`. Without `broker_url` notifications are only
+    dispatched to the clients of this process.
+    """
+    broker_url = config.get('websockets', 'broker_url', fallback='')
+    if not broker_url:
+        return
+    if config.getboolean('websockets', 'broker_hub', fallback=False):
+        host, port = parse_broker_url(broker_url)
+        loop.run_until_complete(BrokerHub().start(loop, host, port))
+    broker = get_broker(broker_url)
+    dispatcher = NotificationDispatcher()
+    dispatcher.factory = factory
+    broker.subscribe(dispatcher.dispatch_notification)
+    loop.run_until_complete(broker.start(loop))
+    ClientCommunicator.broker = broker
+    logger.info('Sharing notifications with broker %s', broker_url)
+
+
 def _remove_pid_file(pid_file: str):
     if os.path.isfile(pid_file):
         os.unlink(pid_file)
@@ -0,0 +1,168 @@
+from unittest.mock import Mock
+import asyncio
+
+from pytest import fixture
+from pytest import raises
+
+
+class TestLocalBroker:
+
+    @fixture
+    def inst(self):
+        from .broker import LocalBroker
+        return LocalBroker()
+
+    def test_create(self, inst):
+        from .broker import Broker
+        assert isinstance(inst, Broker)
+
+    def test_publish_without_subscribers(self, inst):
+        inst.publish({'event': 'modified'})
+
+    def test_publish(self, inst):
+        callback = Mock()
+        inst.subscribe(callback)
+        inst.publish({'event': 'modified'})
+        callback.assert_called_with({'event': 'modified'})
+
+    def test_publish_log_errors(self, inst, monkeypatch):
+        from . import broker
+        mock_logger = Mock()
+        monkeypatch.setattr(broker, 'logger', mock_logger)
+        callback = Mock(side_effect=ValueError)
+        other_callback = Mock()
+        inst.subscribe(callback)
+        inst.subscribe(other_callback)
+        inst.publish({'event': 'modified'})
+        assert mock_logger.exception.called
+        assert other_callback.called
+
+
+def test_broker_publish_is_abstract():
+    from .broker import Broker
+    with raises(TypeError):
+        Broker()
+
+
+class TestGetBroker:
+
+    def call_fut(self, broker_url):
+        from .broker import get_broker
+        return get_broker(broker_url)
+
+    def test_local_broker_if_no_url(self):
+        from .broker import LocalBroker
+        assert isinstance(self.call_fut(''), LocalBroker)
+
+    def test_socket_broker(self):
+        from .broker import SocketBroker
+        inst = self.call_fut('tcp://localhost:6562')
+        assert isinstance(inst, SocketBroker)
+        assert inst._host == 'localhost'
+        assert inst._port == 6562
+
+    def test_raise_if_invalid_url(self):
+        with raises(ValueError):
+            self.call_fut('localhost:6562')
+
+    def test_raise_if_invalid_port(self):
+        with raises(ValueError):
+            self.call_fut('tcp://localhost:port')
+
+
+class TestBrokerHub:
+
+    @fixture
+    def inst(self):
+        from .broker import BrokerHub
+        return BrokerHub()
+
+    def _make_writer(self, buffer_size=0):
+        writer = Mock()
+        writer.transport.get_write_buffer_size.return_value = buffer_size
+        return writer
+
+    def test_relay(self, inst):
+        writer = self._make_writer()
+        other = self._make_writer()
+        inst._writers.update([writer, other])
+        inst._relay(b'line')
+        writer.write.assert_called_with(b'line')
+        other.write.assert_called_with(b'line')
+
+    def test_relay_close_slow_connection(self, inst):
+        writer = self._make_writer()
+        slow = self._make_writer(buffer_size=inst.max_buffer_size + 1)
+        inst._writers.update([writer, slow])
+        inst._relay(b'line')
+        writer.write.assert_called_with(b'line')
+        assert not slow.write.called
+        assert slow.close.called
+        assert inst._writers == {writer}
+
+
+class TestSocketBroker:
+
+    @fixture
+    def loop(self, request):
+        loop = asyncio.new_event_loop()
+
+        def close():
+            pending = asyncio.Task.all_tasks(loop=loop)
+            loop.run_until_complete(asyncio.gather(*pending, loop=loop,
+                                                   return_exceptions=True))
+            loop.close()
+        request.addfinalizer(close)
+        return loop
+
+    @fixture
+    def hub_port(self, loop, request):
+        from .broker import BrokerHub
+        server = loop.run_until_complete(
+            BrokerHub().start(loop, '127.0.0.1', 0))
+
+        def close():
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+        request.addfinalizer(close)
+        return server.sockets[0].getsockname()[1]
+
+    def _make_broker(self, loop, port, request):
+        from .broker import SocketBroker
+        broker = SocketBroker('127.0.0.1', port)
+        broker.reconnect_delay = 0.01
+        loop.run_until_complete(broker.start(loop))
+        request.addfinalizer(broker.stop)
+        return broker
+
+    def test_stop(self, loop, hub_port, request):
+        inst = self._make_broker(loop, hub_port, request)
+        self._run_until(loop, lambda: inst._writer)
+        inst.stop()
+        self._run_until(loop, lambda: inst._task.done())
+        assert inst._task.cancelled()
+
+    def _run_until(self, loop, condition):
+        for x in range(100):
+            if condition():
+                return
+            loop.run_until_complete(asyncio.sleep(0.01, loop=loop))
+
+    def test_publish_deliver_locally_if_not_connected(self):
+        from .broker import SocketBroker
+        inst = SocketBroker('127.0.0.1', 1)
+        callback = Mock()
+        inst.subscribe(callback)
+        inst.publish({'event': 'modified'})
+        callback.assert_called_with({'event': 'modified'})
+
+    def test_publish_to_all_brokers(self, loop, hub_port, request):
+        sender = self._make_broker(loop, hub_port, request)
+        receiver = self._make_broker(loop, hub_port, request)
+        self._run_until(loop, lambda: sender._writer and receiver._writer)
+        received = []
+        sender.subscribe(received.append)
+        receiver.subscribe(received.append)
+        sender.publish({'event': 'modified', 'resource': '/child'})
+        self._run_until(loop, lambda: len(received) == 2)
+        assert received == [{'event': 'modified', 'resource': '/child'}] * 2
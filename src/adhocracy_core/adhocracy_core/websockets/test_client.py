@@ -136,6 +136,7 @@ class TestClient:
         client = self.make_one(None)
         client._is_running = True
         client.send_messages()
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is True
 
     def test_send_messages_nonempty_queue(self, changelog_meta):
@@ -143,6 +144,7 @@ class TestClient:
         client._is_running = True
         metadata = [changelog_meta._replace(created=True)]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'created' in self._dummy_connection.queue[0]
@@ -152,6 +154,7 @@ class TestClient:
         client._is_running = False
         metadata = [changelog_meta._replace(created=True)]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is True
 
     def test_send_messages_not_modified_or_created(self, changelog_meta):
@@ -159,6 +162,7 @@ class TestClient:
         client._is_running = True
         metadata = [changelog_meta]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is True
         assert len(self._dummy_connection.queue) == 0
 
@@ -168,6 +172,7 @@ class TestClient:
         metadata = [changelog_meta._replace(resource=None,
                                             created=True)]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is True
         assert len(self._dummy_connection.queue) == 0
 
@@ -180,6 +185,7 @@ class TestClient:
         metadata = [changelog_meta._replace(created=True,
                                             modified=True)]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'created' in self._dummy_connection.queue[0]
@@ -193,6 +199,7 @@ class TestClient:
         metadata = [changelog_meta._replace(changed_descendants=True,
                                             modified=True)]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 2
         assert 'modified' in self._dummy_connection.queue[0]
@@ -207,6 +214,7 @@ class TestClient:
         metadata = [changelog_meta._replace(modified=True,
                                             changed_backrefs=True)]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'modified' in self._dummy_connection.queue[0]
@@ -220,6 +228,7 @@ class TestClient:
             modified=True,
             visibility=VisibilityChange.invisible)]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is True
         assert len(self._dummy_connection.queue) == 0
 
@@ -232,6 +241,7 @@ class TestClient:
         metadata = [changelog_meta._replace(
             visibility=VisibilityChange.concealed)]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'removed' in self._dummy_connection.queue[0]
@@ -242,6 +252,7 @@ class TestClient:
         client._is_running = True
         metadata = [changelog_meta._replace(changed_backrefs=True)]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'modified' in self._dummy_connection.queue[0]
@@ -256,10 +267,40 @@ class TestClient:
         metadata = [changelog_meta._replace(created=True,
                                             changed_backrefs=True)]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is False
         assert len(self._dummy_connection.queue) == 1
         assert 'created' in self._dummy_connection.queue[0]
 
+    def test_send_messages_coalesce_repeated_events(self, changelog_meta):
+        """Repeated events for the same resource are send only once."""
+        client = self.make_one(None)
+        client._is_running = True
+        metadata = [changelog_meta._replace(modified=True,
+                                            changed_descendants=True)]
+        client.send_messages(metadata)
+        client.send_messages(metadata)
+        client.send_pending()
+        assert len(self._dummy_connection.queue) == 2
+
+    def test_send_messages_coalesce_created_and_later_modified(
+            self, changelog_meta):
+        """A modified event is dropped if the created event is pending."""
+        client = self.make_one(None)
+        client._is_running = True
+        client.send_messages([changelog_meta._replace(created=True)])
+        client.send_messages([changelog_meta._replace(modified=True)])
+        client.send_pending()
+        assert len(self._dummy_connection.queue) == 1
+        assert 'created' in self._dummy_connection.queue[0]
+
+    def test_send_messages_does_not_send(self, changelog_meta):
+        client = self.make_one(None)
+        client._is_running = True
+        client.send_messages([changelog_meta._replace(created=True)])
+        assert self._dummy_connection.nothing_sent is True
+        assert len(client.messages_to_send) == 1
+
     def test_send_messages_resource_is_blocked(self, changelog_meta):
         """If a resource is blocked, no event should be sent."""
         client = self.make_one(None)
@@ -269,9 +310,34 @@ class TestClient:
         metadata = [changelog_meta._replace(modified=True,
                                             resource=resource)]
         client.send_messages(metadata)
+        client.send_pending()
         assert self._dummy_connection.nothing_sent is True
         assert len(self._dummy_connection.queue) == 0
 
+    def test_send_pending_requeue_if_connection_closed(self, changelog_meta):
+        from websocket import WebSocketConnectionClosedException
+        client = self.make_one(None)
+        client._is_running = True
+        client.send_messages([changelog_meta._replace(created=True)])
+        self._dummy_connection.send = Mock(
+            side_effect=WebSocketConnectionClosedException)
+        client.send_pending()
+        assert len(client.messages_to_send) == 1
+
+    def test_run_sender_continue_after_error(self, changelog_meta):
+        client = self.make_one(None)
+        client._is_running = True
+        client.coalesce_delay = 0
+        client.send_messages([changelog_meta._replace(created=True)])
+
+        def send_pending():
+            if client.send_pending.call_count == 1:
+                raise ValueError
+            client._is_stopped = True
+        client.send_pending = Mock(side_effect=send_pending)
+        client._run_sender()
+        assert client.send_pending.call_count == 2
+
 
 @mark.websocket
 class TestFunctionalClient:
@@ -299,8 +365,9 @@ class TestFunctionalClient:
         child = DummyResource()
         context['child'] = child
         metadata = [changelog_meta._replace(resource=child)]
-        websocket_client._send_messages(metadata)
-        assert websocket_client.changelog_metadata_messages_to_send == set()
+        websocket_client.send_messages(metadata)
+        websocket_client.send_pending()
+        assert websocket_client.messages_to_send == {}
 
     def test_includeme_without_ws_url_setting(self, config):
         from adhocracy_core.websockets.client import includeme
@@ -7,6 +7,7 @@ from zope.interface import alsoProvides
 import pytest
 
 from adhocracy_core.websockets.server import ClientCommunicator
+from adhocracy_core.websockets.server import ClientCommunicatorFactory
 
 
 def build_message(json_message: dict) -> bytes:
@@ -42,6 +43,8 @@ class QueueingClientCommunicator(ClientCommunicator):
 
     """ClientCommunicator that adds outgoing messages to an internal queue."""
 
+    factory = ClientCommunicatorFactory()
+
     def __init__(self):
         super().__init__()
         self.queue = []
@@ -51,6 +54,10 @@ class QueueingClientCommunicator(ClientCommunicator):
         json_message = loads(payload.decode())
         self.queue.append(json_message)
 
+    def sendPreparedMessage(self, message):
+        """Add the prepared message to the queue."""
+        self.sendMessage(message.payload)
+
 
 class ClientCommunicatorUnitTests(unittest.TestCase):
 
@@ -357,6 +364,136 @@ class EventDispatchUnitTests(unittest.TestCase):
             'event': 'changed_descendants',
             'resource': self.request.application_url + '/child/'}
 
+    def test_dispatch_notification_serialize_once(self):
+        from unittest.mock import patch
+        other = QueueingClientCommunicator()
+        other.onConnect(DummyConnectionRequest('other peer'))
+        msg = build_message({'action': 'subscribe',
+                             'resource': self.request.application_url + '/child/'})
+        other.onMessage(msg, False)
+        msg = build_message({'event': 'modified', 'resource': '/child'})
+        factory = QueueingClientCommunicator.factory
+        with patch('adhocracy_core.websockets.server.dumps',
+                   wraps=dumps) as mock_dumps,\
+                patch.object(factory, 'prepareMessage',
+                             wraps=factory.prepareMessage) as mock_prepare:
+            self._dispatcher.onMessage(msg, False)
+        other.onClose(True, 0, 'teardown')
+        assert mock_dumps.call_count == 1
+        assert mock_prepare.call_count == 1
+        assert other.queue[-1] == self._subscriber.queue[-1]
+
+    def test_dispatch_notification_without_subscribers(self):
+        from unittest.mock import patch
+        msg = build_message({'event': 'modified',
+                             'resource': '/child/grandchild'})
+        with patch('adhocracy_core.websockets.server.dumps',
+                   wraps=dumps) as mock_dumps:
+            self._dispatcher.onMessage(msg, False)
+        assert mock_dumps.call_count == 1  # only modified_child for /child
+
+    def test_dispatch_notification_broadcast_stats(self):
+        stats = self._dispatcher.broadcast_stats['changed_descendants']
+        messages = stats['messages']
+        clients = stats['clients']
+        msg = build_message({'event': 'changed_descendants',
+                             'resource': '/child'})
+        self._dispatcher.onMessage(msg, False)
+        assert stats['messages'] == messages + 1
+        assert stats['clients'] == clients + 1
+        assert stats['seconds'] > 0
+
+    def test_dispatch_notification_to_descendants_subscriber(self):
+        self._subscriber.onClose(True, 0, 'resubscribe')
+        msg = build_message({'action': 'subscribe_descendants',
+                             'resource': self.request.application_url + '/'})
+        self._subscriber.onMessage(msg, False)
+        assert self._subscriber.queue[-1]['status'] == 'ok'
+        queue = list(self._subscriber.queue)
+        for event in ['modified', 'changed_descendants']:
+            msg = build_message({'event': event,
+                                 'resource': '/child/grandchild'})
+            self._dispatcher.onMessage(msg, False)
+        assert self._subscriber.queue[len(queue):] == [
+            {'event': 'modified',
+             'resource': self.request.application_url + '/child/grandchild/'},
+            {'event': 'modified_child',
+             'resource': self.request.application_url + '/child/',
+             'child': self.request.application_url + '/child/grandchild/'}]
+
+    def test_dispatch_notification_to_paused_client(self):
+        msg = build_message({'event': 'changed_descendants',
+                             'resource': '/child'})
+        queue = list(self._subscriber.queue)
+        self._subscriber.pause_writing()
+        self._dispatcher.onMessage(msg, False)
+        self._dispatcher.onMessage(msg, False)
+        assert self._subscriber.queue == queue
+        self._subscriber.resume_writing()
+        assert self._subscriber.queue[len(queue):] == [
+            {'event': 'changed_descendants',
+             'resource': self.request.application_url + '/child/'}]
+
+    def test_dispatch_notification_to_paused_client_queue_full(self):
+        from unittest.mock import Mock
+        self._subscriber.max_queue_size = 1
+        self._subscriber.sendClose = Mock()
+        queue = list(self._subscriber.queue)
+        self._subscriber.pause_writing()
+        for event in ['changed_descendants', 'modified']:
+            msg = build_message({'event': event, 'resource': '/child'})
+            self._dispatcher.onMessage(msg, False)
+        self._subscriber.sendClose.assert_called_with(code=4000,
+                                                      reason='resync')
+        assert not self._subscriber._tracker.is_subscribed(self._subscriber,
+                                                           self._child)
+        self._subscriber.resume_writing()
+        assert self._subscriber.queue == queue
+
+    def test_dispatch_notification_publish_to_broker(self):
+        from unittest.mock import Mock
+        from .broker import LocalBroker
+        broker = Mock(spec=LocalBroker)
+        self._dispatcher.broker = broker
+        queue = list(self._subscriber.queue)
+        json_object = {'event': 'modified', 'resource': '/child'}
+        self._dispatcher.onMessage(build_message(json_object), False)
+        broker.publish.assert_called_with(json_object)
+        assert self._subscriber.queue == queue
+
+    def test_dispatch_notification_publish_to_broker_if_valid(self):
+        from unittest.mock import Mock
+        from .broker import LocalBroker
+        broker = Mock(spec=LocalBroker)
+        self._dispatcher.broker = broker
+        msg = build_message({'event': 'new_child',
+                             'resource': '/child/grandchild'})
+        self._dispatcher.onMessage(msg, False)
+        assert not broker.publish.called
+        assert self._dispatcher.queue[0]['error'] == 'invalid_json'
+
+    def test_dispatch_notification_from_broker(self):
+        from .broker import LocalBroker
+        from .server import NotificationDispatcher
+        dispatcher = NotificationDispatcher()
+        dispatcher.zodb_database = QueueingClientCommunicator.zodb_database
+        dispatcher.rest_url = QueueingClientCommunicator.rest_url
+        dispatcher.factory = ClientCommunicatorFactory()
+        broker = LocalBroker()
+        broker.subscribe(dispatcher.dispatch_notification)
+        broker.publish({'event': 'modified', 'resource': '/child'})
+        assert self._subscriber.queue[-1] == {
+            'event': 'modified',
+            'resource': self.request.application_url + '/child/'}
+
+    def test_dispatch_notification_from_broker_invalid(self):
+        from unittest.mock import patch
+        with patch('adhocracy_core.websockets.server.logger') as mock_logger:
+            self._dispatcher.dispatch_notification({'event': 'new_child',
+                                                    'resource': '/child'})
+        assert mock_logger.warning.called
+        assert len(self._dispatcher.queue) == 0
+
     def test_dispatch_invalid_event_notification(self):
         msg = build_message({'event': 'new_child',
                              'resource': '/child/grandchild'})
@@ -538,6 +675,76 @@ class ClientTrackerUnitTests(unittest.TestCase):
         assert client1 in result
         assert client2 in result
 
+    def _make_grandchild(self):
+        result = self._child['grandchild'] = testing.DummyResource()
+        return result
+
+    def test_subscribe_descendants(self):
+        client = self._make_client()
+        result = self._tracker.subscribe_descendants(client, self._child)
+        assert result is True
+        assert self._tracker.is_subscribed_descendants(client, self._child)
+        assert not self._tracker.is_subscribed(client, self._child)
+        assert self._tracker._clients2descendants_paths[client] == {'/child'}
+
+    def test_subscribe_descendants_redundant(self):
+        client = self._make_client()
+        self._tracker.subscribe_descendants(client, self._child)
+        result = self._tracker.subscribe_descendants(client, self._child)
+        assert result is False
+
+    def test_unsubscribe_descendants(self):
+        client = self._make_client()
+        self._tracker.subscribe_descendants(client, self._child)
+        result = self._tracker.unsubscribe_descendants(client, self._child)
+        assert result is True
+        assert len(self._tracker._clients2descendants_paths) == 0
+        assert self._tracker._descendants_trie.children == {}
+
+    def test_unsubscribe_descendants_redundant(self):
+        client = self._make_client()
+        result = self._tracker.unsubscribe_descendants(client, self._child)
+        assert result is False
+
+    def test_iterate_descendants_subscribers(self):
+        client1 = self._make_client()
+        client2 = self._make_client()
+        grandchild = self._make_grandchild()
+        self._tracker.subscribe_descendants(client1, self._child)
+        self._tracker.subscribe_descendants(client2, grandchild)
+        assert set(self._tracker.iterate_descendants_subscribers(grandchild))\
+            == {client1, client2}
+        assert set(self._tracker.iterate_descendants_subscribers(self._child))\
+            == {client1}
+        assert list(self._tracker.iterate_descendants_subscribers(
+            self._make_child2())) == []
+
+    def test_iterate_descendants_subscribers_root(self):
+        client = self._make_client()
+        self._tracker.subscribe_descendants(client, self._child.__parent__)
+        assert list(self._tracker.iterate_descendants_subscribers(
+            self._make_grandchild())) == [client]
+
+    def test_delete_subscriptions_for_client_with_descendants(self):
+        client = self._make_client()
+        self._tracker.subscribe_descendants(client, self._make_grandchild())
+        self._tracker.subscribe_descendants(client, self._child)
+        self._tracker.delete_subscriptions_for_client(client)
+        assert len(self._tracker._clients2descendants_paths) == 0
+        assert self._tracker._descendants_trie.children == {}
+
+    def test_delete_subscriptions_to_resource_with_descendants(self):
+        client1 = self._make_client()
+        client2 = self._make_client()
+        child2 = self._make_child2()
+        self._tracker.subscribe_descendants(client1, self._make_grandchild())
+        self._tracker.subscribe_descendants(client2, child2)
+        self._tracker.delete_subscriptions_to_resource(self._child)
+        assert not self._tracker.is_subscribed_descendants(
+            client1, self._child['grandchild'])
+        assert self._tracker.is_subscribed_descendants(client2, child2)
+        assert list(self._tracker._descendants_trie.children) == ['child2']
+
 
 @pytest.mark.websocket
 @pytest.mark.functional
@@ -580,3 +787,12 @@ class TestFunctionalClientCommunicator:
         self._add_pool(rest_url, '/', 'Proposals')
         response = connection.recv()
         assert 'Proposals' in response
+
+
+def test_client_communicator_factory_prepare_message():
+    factory = ClientCommunicatorFactory()
+    payload = b'{"event": "modified"}'
+    message = factory.prepareMessage(payload)
+    assert message.payload == payload
+    assert message.payloadHybi == bytes([0x81, len(payload)]) + payload
+    assert message.payloadHixie == b'\x00' + payload + b'\xff'
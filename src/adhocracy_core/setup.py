@@ -102,6 +102,8 @@ setup(name='adhocracy_core',
           adhocracy_core.scripts.delete_stale_login_data:delete_stale_login_data
       delete_not_referenced_images =\
           adhocracy_core.scripts.delete_images:delete_not_referenced_images
+      repair_aggregates =\
+          adhocracy_core.scripts.repair_aggregates:repair_aggregates
       [pyramid.scaffold]
       adhocracy=adhocracy_core.scaffolds:AdhocracyExtensionTemplate
       """,